@@ -0,0 +1,67 @@
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import authentication, exceptions
+
+from main.models import ApiKey, hash_api_key
+
+
+class ApiKeyAuthentication(authentication.BaseAuthentication):
+    """Authenticates machine clients with `Authorization: Api-Key <key>`.
+
+    Verified keys are cached in-process for `API_KEY_CACHE_TIMEOUT` seconds, so most
+    requests are authenticated without a query (and without the password hashing of
+    basic auth). Deactivating or deleting a key (or its user) takes effect after that
+    timeout at the latest.
+    """
+
+    keyword = "Api-Key"
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Invalid API key header.")
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("Invalid API key header.")
+        return self.authenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        key_hash = hash_api_key(key)
+        now = time.monotonic()
+        cached = self._cache.get(key_hash)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        api_key = (
+            ApiKey.objects.select_related("user")
+            .filter(key_hash=key_hash, is_active=True, user__is_active=True)
+            .first()
+        )
+        if api_key is None:
+            with self._lock:
+                self._cache.pop(key_hash, None)
+            raise exceptions.AuthenticationFailed("Invalid API key.")
+
+        result = (api_key.user, api_key)
+        with self._lock:
+            # Expired entries are dropped here, there are only a few keys per process
+            for expired in [k for k, v in self._cache.items() if v[1] <= now]:
+                del self._cache[expired]
+            self._cache[key_hash] = (result, now + settings.API_KEY_CACHE_TIMEOUT)
+        return result
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._lock:
+            cls._cache.clear()
+
+    def authenticate_header(self, request):
+        return self.keyword
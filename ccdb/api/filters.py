@@ -0,0 +1,30 @@
+from rest_framework.filters import SearchFilter
+
+from contracting.utils.search import SearchDocumentModel
+
+
+def is_searchable(model):
+    return model is not None and issubclass(model, SearchDocumentModel)
+
+
+class SearchDocumentFilter(SearchFilter):
+    """`?q=` finds the objects containing all words in their search document, for the
+    models that have one (see SearchDocumentModel)."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not is_searchable(queryset.model):
+            return queryset
+        return queryset.model.search(queryset, " ".join(terms))
+
+    def get_schema_fields(self, view):
+        queryset = getattr(view, "queryset", None)
+        if not is_searchable(getattr(queryset, "model", None)):
+            return []
+        return super().get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        queryset = getattr(view, "queryset", None)
+        if not is_searchable(getattr(queryset, "model", None)):
+            return []
+        return super().get_schema_operation_parameters(view)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from drf_yasg.renderers import SwaggerJSONRenderer, SwaggerYAMLRenderer
+
+from api.schema import generate_schema, get_code_version, get_rendered_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the API schema of the current code version into the cache (e.g. on deployment)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            help="Also write the schema to this file, e.g. for client generators",
+        )
+        parser.add_argument("--format", choices=["json", "yaml"], default="json")
+
+    def handle(self, *args, **options):
+        renderer = {"json": SwaggerJSONRenderer, "yaml": SwaggerYAMLRenderer}[
+            options["format"]
+        ]()
+        rendered = get_rendered_schema(renderer, generate_schema())
+        if options["output"]:
+            with open(options["output"], "wb") as f:
+                f.write(rendered["content"])
+        self.stdout.write(f"Generated the API schema of version {get_code_version()}")
@@ -0,0 +1,68 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+
+
+class ViewCursorPagination(CursorPagination):
+    page_size_query_param = "limit"
+    max_page_size = 1000
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+class ApiPagination(LimitOffsetPagination):
+    """Limit/offset pagination with two opt-ins per request:
+
+    * `?pagination=cursor` switches to cursor pagination over the view's
+      `cursor_ordering` (the primary key by default). Only its first field is the
+      cursor, it needs to be unique: rows sharing a value are skipped by offset, at most
+      `offset_cutoff` of them. Deep pages cost the same as the first one, and there is
+      no count. Follow the `next` links, they contain the `cursor`.
+    * `?count=false` skips the total count of limit/offset pagination, `count` is null
+      then.
+    """
+
+    cursor_query_param = "cursor"
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get("pagination") == "cursor"
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_pagination = None
+        if self.use_cursor(request):
+            self.cursor_pagination = ViewCursorPagination(
+                getattr(view, "cursor_ordering", ("pk",))
+            )
+            return self.cursor_pagination.paginate_queryset(queryset, request, view)
+
+        self.with_count = request.query_params.get("count") not in ("false", "0")
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.request = request
+        # One more row tells if there is a next page
+        results = list(queryset[self.offset : self.offset + self.limit + 1])
+        # Just enough for the next and previous links
+        self.count = self.offset + len(results)
+        return results[: self.limit]
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination:
+            return self.cursor_pagination.get_paginated_response(data)
+        if not self.with_count:
+            return Response(
+                {
+                    "count": None,
+                    "next": self.get_next_link(),
+                    "previous": self.get_previous_link(),
+                    "results": data,
+                }
+            )
+        return super().get_paginated_response(data)
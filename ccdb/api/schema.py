@@ -0,0 +1,96 @@
+import hashlib
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import SPEC_RENDERERS, get_schema_view
+from rest_framework import permissions
+
+SOURCE_DIRS = ("api", "ccdb", "contracting", "globalways", "main")
+
+api_info = openapi.Info(
+    title="CCDB API",
+    default_version="v1",
+)
+
+
+@lru_cache(maxsize=None)
+def get_code_version():
+    """`CCDB_VERSION` (set by the deployment), otherwise a digest of the python sources."""
+    if settings.CCDB_VERSION:
+        return settings.CCDB_VERSION
+    digest = hashlib.md5()
+    for directory in SOURCE_DIRS:
+        for root, _, files in sorted(
+            os.walk(os.path.join(settings.BASE_DIR, directory))
+        ):
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    with open(os.path.join(root, name), "rb") as f:
+                        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def generate_schema():
+    # Without a request, the schema doesn't depend on the host of the first client
+    generator = OpenAPISchemaGenerator(api_info, urlconf="ccdb.urls")
+    return generator.get_schema(request=None, public=True)
+
+
+def get_schema_cache_key(format):
+    # The compat renderers have formats like ".json"
+    return f"api:schema:{get_code_version()}:{format.lstrip('.')}"
+
+
+def get_rendered_schema(renderer, schema=None):
+    """The schema rendered by the spec renderer, and its ETag. Generated (unless given)
+    and rendered in all formats once per code version, the cache keys contain it."""
+    rendered = cache.get(get_schema_cache_key(renderer.format))
+    if rendered is None:
+        schema = schema or generate_schema()
+        formats = {}
+        for renderer_class in SPEC_RENDERERS:
+            content = renderer_class().render(schema)
+            formats[get_schema_cache_key(renderer_class.format)] = {
+                "content": content,
+                "etag": hashlib.md5(content).hexdigest(),
+            }
+        cache.set_many(formats, None)
+        rendered = formats[get_schema_cache_key(renderer.format)]
+    return rendered
+
+
+_SchemaView = get_schema_view(
+    api_info,
+    public=True,
+    permission_classes=[permissions.AllowAny],
+    urlconf="ccdb.urls",
+)
+
+
+class SchemaView(_SchemaView):
+    """Serves the precomputed schema (see `generate_openapi_schema`) with an ETag."""
+
+    def get(self, request, version="", format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            # The UI views only render a page which loads the schema
+            return super().get(request, version, format)
+
+        rendered = get_rendered_schema(renderer)
+        etag = quote_etag(rendered["etag"])
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                rendered["content"],
+                content_type=f"{renderer.media_type}; charset={renderer.charset}",
+            )
+        response["ETag"] = etag
+        return response
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 
+from api.serializers.mixins import SparseFieldsMixin
 from contracting.models import BookingAccount, BookingAccountSepa, Customer
 
 
-class BookingAccountSepaSerializer(serializers.ModelSerializer):
+class BookingAccountSepaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = BookingAccountSepa
         fields = [
@@ -23,7 +24,7 @@ class BookingAccountSepaSerializer(serializers.ModelSerializer):
         ]
 
 
-class NestedBookingAccountSerializer(serializers.ModelSerializer):
+class NestedBookingAccountSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sepa = BookingAccountSepaSerializer(read_only=False, required=False)
 
     def create(self, validated_data):
@@ -0,0 +1,278 @@
+from collections import namedtuple
+
+from crum import get_current_user
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers
+
+from api.serializers.contract import ContractSerializer
+from contracting.models import Contract, ContractItem
+from contracting.models.contract import ContractValidator, allocate_numbers
+from contracting.models.contract_item import ContractItemValidator
+from contracting.models.customer import invalidate_customer_overviews
+from contracting.utils.search import update_search_documents_on_commit
+from globalways.utils.decorators import (
+    bulk_create_with_history,
+    bulk_update_with_history,
+)
+
+
+def _numbers(values):
+    numbers = set()
+    for value in values:
+        try:
+            numbers.add(int(value))
+        except (TypeError, ValueError):
+            pass  # reported by the field validation
+    return numbers
+
+
+def _model_errors(instance, validator, exclude):
+    """Field and model validation of an unsaved instance, without the queries of
+    `full_clean` (unique checks, related objects)."""
+    errors = {}
+    try:
+        instance.clean_fields(exclude=exclude)
+    except DjangoValidationError as e:
+        errors.update(e.message_dict)
+    validator.validate()
+    for field, messages in validator.errors.items():
+        if messages:
+            key = "non_field_errors" if field == "__all__" else field
+            errors.setdefault(key, []).extend(messages)
+    return errors
+
+
+BulkContract = namedtuple("BulkContract", ["contract", "fields", "items"])
+BulkItem = namedtuple("BulkItem", ["item", "fields", "children", "successor"])
+
+
+class BulkContractValidator(ContractValidator):
+    def validate(self):
+        # The items are validated one by one, they are not saved yet
+        self.validate_sepa()
+        self.validate_dates()
+
+
+class ContractBulkSerializer(serializers.Serializer):
+    """Creates and updates many contracts with their items at once.
+
+    Every entry of `contracts` has the format of the contracts endpoint. Contracts and items
+    with a number are updated, all others are created. All entries are validated together,
+    and either all of them are saved (in one transaction, with bulk inserts and updates) or
+    none. Numbers of new contracts and items are allocated in one block.
+    """
+
+    contracts = ContractSerializer(many=True, allow_empty=False)
+
+    def to_internal_value(self, data):
+        self._preload(data)
+        return super().to_internal_value(data)
+
+    def _preload(self, data):
+        """Loads all contracts and items referenced by number with two queries."""
+        contracts = data.get("contracts") if isinstance(data, dict) else None
+        contracts = [c for c in contracts or [] if isinstance(c, dict)]
+        items = [
+            item
+            for contract in contracts
+            for item in contract.get("items") or []
+            if isinstance(item, dict)
+        ]
+        item_numbers = [
+            item.get(key)
+            for item in items
+            for key in ("number", "predecessor", "successor", "parent_item")
+        ]
+        for item in items:
+            if isinstance(item.get("child_items"), list):
+                item_numbers += item["child_items"]
+        self.context["contract_lookup"] = Contract.objects.in_bulk(
+            _numbers(contract.get("number") for contract in contracts),
+            field_name="number",
+        )
+        self.context["item_lookup"] = ContractItem.objects.in_bulk(
+            _numbers(item_numbers), field_name="number"
+        )
+
+    def validate(self, attrs):
+        contract_lookup = self.context["contract_lookup"]
+        item_lookup = self.context["item_lookup"]
+        rows, errors, seen = [], [], set()
+        for contract_data in attrs["contracts"]:
+            contract_data = dict(contract_data)
+            items_data = contract_data.pop("items", None) or []
+            number = contract_data.get("number")
+            if number and number not in contract_lookup:
+                errors.append({"number": [f"Unknown contract {number}"]})
+                continue
+            if number and number in seen:
+                errors.append({"number": [f"Contract {number} is given twice"]})
+                continue
+            seen.add(number)
+            contract = contract_lookup[number] if number else Contract()
+            for field, value in contract_data.items():
+                setattr(contract, field, value)
+            row_errors = _model_errors(
+                contract, BulkContractValidator(contract), exclude=["number"]
+            )
+
+            items, item_errors = [], []
+            for item_data in items_data:
+                item_data = dict(item_data)
+                item_number = item_data.get("number")
+                item = item_lookup.get(item_number) if item_number else ContractItem()
+                if item is None or (item.pk and item.contract_id != contract.pk):
+                    item_errors.append(
+                        {"number": [f"Unknown contract item {item_number}"]}
+                    )
+                    continue
+                children = item_data.pop("child_items", None)
+                successor = item_data.pop("successor", None)
+                for field, value in item_data.items():
+                    setattr(item, field, value)
+                item.contract = contract
+                item_errors.append(
+                    _model_errors(
+                        item,
+                        ContractItemValidator(item),
+                        exclude=["number", "contract"],
+                    )
+                )
+                items.append(BulkItem(item, item_data.keys(), children, successor))
+            if any(item_errors):
+                row_errors["items"] = item_errors
+            errors.append(row_errors)
+            rows.append(BulkContract(contract, contract_data.keys(), items))
+
+        if any(errors):
+            raise serializers.ValidationError({"contracts": errors})
+        return {"rows": rows}
+
+    @staticmethod
+    def _allocate_numbers(model, objs):
+        if not objs:
+            return
+        start = allocate_numbers(model)
+        for offset, obj in enumerate(objs):
+            obj.number = start + offset
+
+    def _related_changes(self, rows):
+        """Items referenced as child items or successors are changed as well."""
+        item_lookup = self.context["item_lookup"]
+        related = {}
+        children = {
+            row.item.pk: {child.pk for child in row.children}
+            for contract in rows
+            for row in contract.items
+            if row.children is not None and row.item.pk
+        }
+        # Like child_items.set(), children not given anymore are removed
+        for child in ContractItem.objects.filter(parent_item__in=list(children)):
+            if child.pk not in children[child.parent_item_id]:
+                child = item_lookup.get(child.number, child)
+                child.parent_item = None
+                related[child.pk] = child
+        for contract in rows:
+            for row in contract.items:
+                for child in row.children or []:
+                    child.parent_item = row.item
+                    related[child.pk] = child
+                if row.successor is not None:
+                    row.successor.predecessor = row.item
+                    related[row.successor.pk] = row.successor
+        return related
+
+    def create(self, validated_data):
+        rows = validated_data["rows"]
+        user = get_current_user()
+        if not isinstance(user, get_user_model()):
+            user = None
+
+        contracts = [row.contract for row in rows]
+        items = [item.item for row in rows for item in row.items]
+        contract_fields = {"modified_by"}.union(*(row.fields for row in rows))
+        item_fields = {"modified_by"}.union(
+            *(item.fields for row in rows for item in row.items)
+        )
+        related = self._related_changes(rows)
+        if related:
+            item_fields.update(["parent_item", "predecessor"])
+
+        new_contracts = [contract for contract in contracts if not contract.pk]
+        new_items = [item for item in items if not item.pk]
+        created = {id(obj) for obj in new_contracts + new_items}
+        changed_contracts = [contract for contract in contracts if contract.pk]
+        changed_items = list(
+            ({item.pk: item for item in items if item.pk} | related).values()
+        )
+        for obj in new_contracts + new_items:
+            obj.created_by = user
+        for obj in contracts + items + list(related.values()):
+            if user:
+                obj.modified_by = user
+
+        # Computed before saving, as they depend on the tracked changes
+        update_messages = [
+            (obj, obj.get_queue_update_payload())
+            for obj in changed_contracts + changed_items
+        ]
+        # Customers the changed contracts are moved away from
+        previous_accounts = [
+            contract.initial_value("booking_account")
+            for contract in changed_contracts
+            if contract.has_changed("booking_account")
+        ]
+        with transaction.atomic():
+            self._allocate_numbers(Contract, new_contracts)
+            self._allocate_numbers(ContractItem, new_items)
+            bulk_create_with_history(new_contracts)
+            bulk_create_with_history(new_items)
+            bulk_update_with_history(changed_contracts, contract_fields)
+            bulk_update_with_history(changed_items, item_fields)
+            transaction.on_commit(
+                lambda: self._send_queue(new_contracts, new_items, update_messages)
+            )
+            # The bulk saves skip the lifecycle hooks
+            contract_pks = [
+                contract.pk for contract in new_contracts + changed_contracts
+            ] + [item.contract_id for item in new_items + changed_items]
+            update_search_documents_on_commit(Contract, contract_pks)
+            transaction.on_commit(
+                lambda: invalidate_customer_overviews(
+                    booking_accounts__contracts__in=contract_pks
+                )
+            )
+            if previous_accounts:
+                transaction.on_commit(
+                    lambda: invalidate_customer_overviews(
+                        booking_accounts__in=previous_accounts
+                    )
+                )
+
+        return [
+            {
+                "number": row.contract.number,
+                "created": id(row.contract) in created,
+                "items": [
+                    {"number": item.item.number, "created": id(item.item) in created}
+                    for item in row.items
+                ],
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _send_queue(new_contracts, new_items, update_messages):
+        """Sends the messages the lifecycle hooks send for single saves."""
+        for contract in new_contracts:
+            contract.send_queue_create()  # includes its items
+        for item in new_items:
+            if item.contract not in new_contracts:
+                item.send_queue_create()
+        for obj, payload in update_messages:
+            if payload is not None:
+                obj.send_queue_update_payload(payload)
+        cache.delete_many({*Contract.queue_cache_keys, *ContractItem.queue_cache_keys})
@@ -1,12 +1,13 @@
 from rest_framework import serializers
 
 from api.serializers.contract_item import ContractItemInlineSerializer
+from api.serializers.mixins import SparseFieldsMixin
 from contracting.models import Contract, ContractItem
 
 from django.core.exceptions import ObjectDoesNotExist
 
 
-class ContractSerializer(serializers.ModelSerializer):
+class ContractSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = ContractItemInlineSerializer(many=True)
     number = serializers.IntegerField(required=False)
     valid_till = serializers.DateField(required=False, allow_null=True)
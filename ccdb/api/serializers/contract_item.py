@@ -1,8 +1,17 @@
 from rest_framework import serializers
 
+from api.serializers.mixins import SparseFieldsMixin
 from contracting.models import Contract, ContractItem
 
 
+def get_preloaded_item(lookup, number):
+    """Items referenced in bulk requests are loaded in advance, see ContractBulkSerializer."""
+    try:
+        return lookup[int(number)]
+    except (KeyError, TypeError, ValueError):
+        raise serializers.ValidationError(f"Unknown contract item {number}")
+
+
 class ItemNumberSerializer(serializers.Field):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -11,6 +20,9 @@ class ItemNumberSerializer(serializers.Field):
         return getattr(obj, "number", None)
 
     def to_internal_value(self, data):
+        lookup = self.context.get("item_lookup")
+        if lookup is not None:
+            return get_preloaded_item(lookup, data)
         return ContractItem.objects.get(number=data)
 
 
@@ -19,13 +31,17 @@ class ManyItemNumberSerializer(serializers.Field):
         super().__init__(*args, **kwargs)
 
     def to_representation(self, obj):
-        return [getattr(o, "number", None) for o in obj.all() if o] if obj.all() else []
+        # A single .all(), so prefetched items are used
+        return [getattr(o, "number", None) for o in obj.all() if o]
 
     def to_internal_value(self, data):
+        lookup = self.context.get("item_lookup")
+        if lookup is not None:
+            return [get_preloaded_item(lookup, number) for number in data]
         return ContractItem.objects.filter(number__in=data)
 
 
-class ContractItemInlineSerializer(serializers.ModelSerializer):
+class ContractItemInlineSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     status = serializers.SerializerMethodField(allow_null=True)
     successor = ItemNumberSerializer(required=False, allow_null=True)
     predecessor = ItemNumberSerializer(required=False, allow_null=True)
@@ -35,7 +51,8 @@ class ContractItemInlineSerializer(serializers.ModelSerializer):
 
 
     def get_status(self, obj):
-        return obj.status
+        # Querysets annotated with ContractItemQuerySet.with_status() don't need the contract
+        return getattr(obj, "annotated_status", None) or obj.status
 
     def validate(self, data):
         valid_from = data.get("valid_from")
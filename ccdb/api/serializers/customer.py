@@ -4,10 +4,11 @@ from api.serializers.account import (
     BookingAccountSerializer,
     NestedBookingAccountSerializer,
 )
+from api.serializers.mixins import SparseFieldsMixin
 from contracting.models import Customer
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     booking_accounts = NestedBookingAccountSerializer(many=True)
 
     def create(self, validated_data):
@@ -0,0 +1,20 @@
+from rest_framework import serializers
+
+
+class HistoryRecordSerializer(serializers.Serializer):
+    """A history record of any historified model, see `MultiModelHistoryIterator`."""
+
+    model = serializers.SerializerMethodField()
+    id = serializers.IntegerField()
+    number = serializers.SerializerMethodField()
+    history_id = serializers.IntegerField()
+    history_date = serializers.DateTimeField()
+    history_type = serializers.CharField()
+    history_change_reason = serializers.CharField()
+    history_user = serializers.StringRelatedField()
+
+    def get_model(self, obj):
+        return obj.instance_type._meta.model_name
+
+    def get_number(self, obj):
+        return getattr(obj, "number", None)
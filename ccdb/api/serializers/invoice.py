@@ -1,10 +1,11 @@
 from rest_framework import serializers
 
 from api.serializers.account import BookingAccountSerializer
+from api.serializers.mixins import SparseFieldsMixin
 from contracting.models import Invoice, InvoiceItem
 
 
-class InvoiceItemInlineSerializer(serializers.ModelSerializer):
+class InvoiceItemInlineSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = InvoiceItem
         fields = [
@@ -30,10 +31,21 @@ class InvoiceItemSerializer(InvoiceItemInlineSerializer):
         fields = InvoiceItemInlineSerializer.Meta.fields + ["invoice"]
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = InvoiceItemInlineSerializer(many=True)
     booking_account = BookingAccountSerializer()
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if "booking_account" in fields and "booking_accounts" in self.context.get(
+            "include", ()
+        ):
+            # Only the id, the accounts are side-loaded (see InvoiceViewSet.list)
+            fields["booking_account"] = serializers.PrimaryKeyRelatedField(
+                read_only=True
+            )
+        return fields
+
     class Meta:
         model = Invoice
         fields = [
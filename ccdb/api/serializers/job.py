@@ -0,0 +1,39 @@
+from rest_framework import serializers
+
+from main.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(view_name="api:job-detail")
+    target_type = serializers.SlugRelatedField(
+        source="content_type", slug_field="model", read_only=True
+    )
+    percent = serializers.FloatField(read_only=True)
+    throughput = serializers.FloatField(read_only=True)
+    eta = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "url",
+            "name",
+            "state",
+            "target_type",
+            "object_id",
+            "created",
+            "started",
+            "finished",
+            "result",
+            "error",
+            "phase",
+            "phase_started",
+            "processed",
+            "total",
+            "percent",
+            "throughput",
+            "eta",
+            "error_count",
+            "errors",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,70 @@
+from rest_framework.permissions import SAFE_METHODS
+
+
+def is_reading(request):
+    """Safe requests, and the POST requests of the view's `read_only_actions` (like lookups
+    with many numbers in the body, see BatchLookupMixin)."""
+    if request.method in SAFE_METHODS:
+        return True
+    view = getattr(request, "parser_context", {}).get("view")
+    return getattr(view, "action", None) in getattr(view, "read_only_actions", ())
+
+
+def get_sparse_fieldset(request):
+    """The dotted field paths of `?fields=` and `?omit=` (comma separated or repeated),
+    e.g. `?fields=number,booking_account.name`. Only used for reading requests."""
+    if request is None or not is_reading(request):
+        return set(), set()
+
+    def paths(param):
+        return {
+            path.strip()
+            for value in request.query_params.getlist(param)
+            for path in value.split(",")
+            if path.strip()
+        }
+
+    return paths("fields"), paths("omit")
+
+
+def is_path_included(path, fields, omit):
+    parts = path.split(".")
+    prefixes = {".".join(parts[: i + 1]) for i in range(len(parts))}
+    if prefixes & omit:
+        return False
+    if not fields:
+        return True
+    # Either the field itself (or a parent) was asked for, or some of its nested fields
+    return bool(prefixes & fields) or any(f.startswith(path + ".") for f in fields)
+
+
+class SparseFieldsMixin:
+    """Leaves out the fields not asked for with `?fields=`/`?omit=`, see `get_sparse_fieldset`.
+    Nested serializers need the mixin as well to be trimmed. Pass `sparse_fields=False` in
+    the context for complete data regardless of the request (e.g. to cache it)."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get("sparse_fields", True):
+            return fields
+        include, omit = get_sparse_fieldset(self.context.get("request"))
+        if not (include or omit):
+            return fields
+        prefix = self.get_field_path_prefix()
+        return {
+            name: field
+            for name, field in fields.items()
+            if is_path_included(prefix + name, include, omit)
+        }
+
+    def get_field_path_prefix(self):
+        # Side-loaded objects are serialized separately, but with the path they are included at
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return self.context.get("field_path_prefix", "") + "".join(
+            f"{name}." for name in reversed(names)
+        )
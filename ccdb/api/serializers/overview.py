@@ -0,0 +1,48 @@
+from rest_framework import serializers
+
+from api.serializers.account import NestedBookingAccountSerializer
+from api.serializers.contract import ContractSerializer
+from contracting.models import Invoice
+
+
+class InvoiceSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Invoice
+        fields = [
+            "id",
+            "number",
+            "document_url",
+            "booking_account",
+            "date",
+            "billing_start",
+            "billing_end",
+            "total_net",
+            "total_gross",
+            "approved",
+            "canceled",
+        ]
+
+
+class CustomerTotalsSerializer(serializers.Serializer):
+    invoice_count = serializers.IntegerField()
+    invoiced_net = serializers.DecimalField(max_digits=15, decimal_places=2)
+    invoiced_gross = serializers.DecimalField(max_digits=15, decimal_places=2)
+    outstanding_count = serializers.IntegerField(
+        help_text="Invoices not issued by easybill yet"
+    )
+    outstanding_net = serializers.DecimalField(max_digits=15, decimal_places=2)
+    outstanding_gross = serializers.DecimalField(max_digits=15, decimal_places=2)
+    unapproved_count = serializers.IntegerField(
+        help_text="Invoices blocked from being pushed to easybill"
+    )
+
+
+class CustomerOverviewSerializer(serializers.Serializer):
+    """Serializes the dict built by `get_customer_overview`."""
+
+    number = serializers.IntegerField()
+    name = serializers.CharField(allow_null=True)
+    booking_accounts = NestedBookingAccountSerializer(many=True)
+    contracts = ContractSerializer(many=True, help_text="Contracts that haven't ended")
+    invoices = InvoiceSummarySerializer(many=True, help_text="The most recent invoices")
+    totals = CustomerTotalsSerializer(help_text="Of all invoices that aren't canceled")
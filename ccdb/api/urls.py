@@ -1,12 +1,12 @@
 from django.urls import include, path, re_path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions, routers
+from rest_framework import routers
 
+from api.schema import SchemaView
 from api.viewsets import gnom
 from api.viewsets.contract import ContractItemViewSet, ContractViewSet
 from api.viewsets.customer import BookingAccountViewSet, CustomerViewSet
 from api.viewsets.invoice import InvoiceItemViewSet, InvoiceViewSet
+from api.viewsets.job import JobViewSet
 
 app_name = "api"
 router = routers.DefaultRouter()
@@ -16,34 +16,29 @@ router.register(r"customers", CustomerViewSet)
 router.register(r"booking-accounts", BookingAccountViewSet)
 router.register(r"invoices", InvoiceViewSet)
 router.register(r"invoice-items", InvoiceItemViewSet)
+router.register(r"jobs", JobViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
     path("gnom/contracts/", gnom.contract_view),
 ]
 
-api_info = openapi.Info(
-    title="CCDB API",
-    default_version="v1",
-)
-schema_view = get_schema_view(
-    api_info,
-    public=True,
-    permission_classes=[permissions.AllowAny],
-    urlconf="ccdb.urls",
-)
+# The schema is cached per code version and has an ETag (see api.schema). The UI pages
+# don't contain the endpoints, they load the schema with ?format=openapi.
 urlpatterns += [
     re_path(
         r"swagger(?P<format>\.json|\.yaml)$",
-        schema_view.without_ui(cache_timeout=0),
+        SchemaView.without_ui(cache_timeout=0),
         name="schema-json",
     ),
     re_path(
         r"swagger/$",
-        schema_view.with_ui("swagger", cache_timeout=0),
+        SchemaView.with_ui("swagger", cache_timeout=0),
         name="schema-swagger-ui",
     ),
     re_path(
-        r"redoc/$", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"
+        r"redoc/$",
+        SchemaView.with_ui("redoc", cache_timeout=0),
+        name="schema-redoc",
     ),
 ]
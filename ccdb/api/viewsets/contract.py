@@ -1,37 +1,179 @@
+import base64
+import json
+
 from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_datetime
 from django_filters import rest_framework as filters
+from drf_yasg import openapi
 from drf_yasg.utils import no_body, swagger_auto_schema
 from rest_framework import serializers, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from api.serializers.bulk import ContractBulkSerializer
 from api.serializers.contract import ContractSerializer
 from api.serializers.contract_item import ContractItemSerializer
-from contracting.models import Contract, ContractItem
+from api.serializers.history import HistoryRecordSerializer
+from api.viewsets.mixins import (
+    BatchLookupMixin,
+    ModifiedSinceFilterSet,
+    ModifiedSinceMixin,
+    SparseFieldsViewSetMixin,
+    exists_filter,
+)
+from contracting.models import (
+    BookingAccount,
+    BookingAccountSepa,
+    Contract,
+    ContractItem,
+)
+from contracting.utils.history import MultiModelHistoryIterator
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+
+def encode_history_cursor(cursor):
+    history_date, label, history_id = cursor
+    data = json.dumps([history_date.isoformat(), label, history_id])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_history_cursor(value):
+    try:
+        history_date, label, history_id = json.loads(base64.urlsafe_b64decode(value))
+        history_date = parse_datetime(history_date)
+        history_id = int(history_id)
+    except (TypeError, ValueError):
+        history_date = None
+    if history_date is None:
+        raise serializers.ValidationError({"cursor": "Invalid cursor."})
+    return history_date, str(label), history_id
 
 
 class TerminationDateSerializer(serializers.Serializer):
     date = serializers.DateField(required=False)
 
 
-class ContractFilterSet(filters.FilterSet):
+def filter_item_status(queryset, status):
+    if "annotated_status" not in queryset.query.annotations:
+        queryset = queryset.with_status()
+    return queryset.filter(annotated_status=status)
+
+
+class ContractFilterSet(ModifiedSinceFilterSet):
     customer = filters.NumberFilter(field_name="booking_account__customer__number")
-    paused = filters.BooleanFilter(field_name="items__paused")
+    paused = filters.BooleanFilter(
+        method=exists_filter("items", "paused"),
+        help_text="Contracts with at least one (un)paused item",
+    )
+    status = filters.ChoiceFilter(
+        choices=ContractItem.Status.choices,
+        method="filter_status",
+        help_text="Contracts with at least one item in this status",
+    )
 
     class Meta:
         model = Contract
-        fields = ["booking_account", "customer", "paused"]
+        fields = ["booking_account", "customer", "paused", "status", "modified_since"]
 
+    def filter_status(self, queryset, name, value):
+        items = filter_item_status(
+            ContractItem.objects.filter(contract=OuterRef("pk")), value
+        )
+        return queryset.filter(Exists(items))
 
-class ContractViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Contract.objects.all()
-        .prefetch_related("items", "items__successor", "items__predecessor")
-        .select_related("booking_account", "booking_account__customer")
-    )
+
+class ContractViewSet(
+    BatchLookupMixin,
+    SparseFieldsViewSetMixin,
+    ModifiedSinceMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Contract.objects.all()
     serializer_class = ContractSerializer
     lookup_field = "number"
     filterset_class = ContractFilterSet
+    cursor_ordering = ("number",)
+    deferrable_fields = ("billing_data", "imported_data")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve", "lookup"):
+            # Other actions change the contract or don't show the items, their
+            # prefetched items and status would be stale or unused
+            return queryset
+        # Built per request, the item status depends on the current date
+        return queryset.with_items().select_related(
+            "booking_account", "booking_account__customer"
+        )
+
+    @swagger_auto_schema(request_body=ContractBulkSerializer, method="post")
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Creates and updates many contracts and their items in one transaction.
+        Pass {"contracts": [...]} with entries like the ones of this endpoint. Entries with a
+        number are updated, the others created. Returns the numbers of all entries in order.
+        """
+        serializer = ContractBulkSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response({"results": serializer.save()})
+
+    @swagger_auto_schema(
+        method="get",
+        manual_parameters=[
+            openapi.Parameter("cursor", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: HistoryRecordSerializer(many=True)},
+    )
+    @action(detail=True, methods=["get"])
+    def history(self, request, number=None):
+        """Combined history of the contract, its items and its booking account, newest first.
+        Follow the `next` link for older entries."""
+        contract = self.get_object()
+        try:
+            limit = int(request.query_params.get("limit", HISTORY_PAGE_SIZE))
+        except ValueError:
+            limit = HISTORY_PAGE_SIZE
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            cursor = decode_history_cursor(cursor)
+
+        querysets = [
+            Contract.history.filter(id=contract.pk),
+            ContractItem.history.filter(contract_id=contract.pk),
+            BookingAccount.history.filter(id=contract.booking_account_id),
+            BookingAccountSepa.history.filter(account_id=contract.booking_account_id),
+        ]
+        # One more than needed, to know if there is a next page
+        records = list(
+            MultiModelHistoryIterator(
+                *(queryset.select_related("history_user") for queryset in querysets),
+                max_iterations=limit + 1,
+                cursor=cursor,
+            )
+        )
+        next_url = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = MultiModelHistoryIterator.cursor_for(records[-1])
+            next_url = replace_query_param(
+                request.build_absolute_uri(),
+                "cursor",
+                encode_history_cursor(next_cursor),
+            )
+        return Response(
+            {
+                "next": next_url,
+                "results": HistoryRecordSerializer(records, many=True).data,
+            }
+        )
 
     @swagger_auto_schema(request_body=TerminationDateSerializer, method="post")
     @action(detail=True, methods=["post"])
@@ -67,23 +209,51 @@ class ContractViewSet(viewsets.ModelViewSet):
         return Response(self.serializer_class(item).data)
 
 
-class ContractItemFilterSet(filters.FilterSet):
+class ContractItemFilterSet(ModifiedSinceFilterSet):
     customer = filters.NumberFilter(
         field_name="contract__booking_account__customer__number"
     )
     booking_account = filters.NumberFilter(field_name="contract__booking_account")
     contract = filters.NumberFilter(field_name="contract__number")
+    status = filters.ChoiceFilter(
+        choices=ContractItem.Status.choices, method="filter_status"
+    )
 
     class Meta:
         model = ContractItem
-        fields = ["booking_account", "customer", "contract", "paused"]
+        fields = [
+            "booking_account",
+            "customer",
+            "contract",
+            "paused",
+            "status",
+            "modified_since",
+        ]
 
+    def filter_status(self, queryset, name, value):
+        return filter_item_status(queryset, value)
 
-class ContractItemViewSet(viewsets.ModelViewSet):
-    queryset = ContractItem.objects.all().select_related("successor", "predecessor")
+
+class ContractItemViewSet(
+    BatchLookupMixin,
+    SparseFieldsViewSetMixin,
+    ModifiedSinceMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = ContractItem.objects.all()
     serializer_class = ContractItemSerializer
     lookup_field = "number"
     filterset_class = ContractItemFilterSet
+    cursor_ordering = ("number",)
+    deferrable_fields = ("billing_data", "imported_data")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve", "lookup"):
+            # The annotated status would be stale after changing the item
+            return queryset
+        # Built per request, the status depends on the current date
+        return queryset.with_item_relations().with_status().select_related("contract")
 
     @swagger_auto_schema(request_body=TerminationDateSerializer, method="post")
     @action(detail=True, methods=["post"])
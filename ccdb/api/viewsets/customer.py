@@ -1,10 +1,56 @@
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.http import Http404
 from django_filters import rest_framework as filters
+from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
 from api.serializers.account import BookingAccountSerializer
 from api.serializers.customer import CustomerSerializer
-from api.viewsets.mixins import EasybillMixin
-from contracting.models import BookingAccount, Customer
+from api.serializers.overview import CustomerOverviewSerializer
+from api.viewsets.mixins import (
+    BatchLookupMixin,
+    EasybillMixin,
+    ModifiedSinceFilterSet,
+    ModifiedSinceMixin,
+    SparseFieldsViewSetMixin,
+)
+from contracting.models import BookingAccount, Contract, Customer, Invoice
+from contracting.models.customer import CUSTOMER_OVERVIEW_CACHE_KEY
+from globalways.middlewares.replica import read_from_primary
+
+# Saves of the shown objects drop the cached overview (see invalidate_customer_overviews),
+# the timeout covers SEPA mandates.
+CUSTOMER_OVERVIEW_CACHE_TIMEOUT = 300
+RECENT_INVOICES = 10
+
+
+def get_customer_overview(customer):
+    """The data of `CustomerOverviewSerializer`, loaded with a fixed number of queries.
+    The accounts need to be prefetched with their SEPA mandates."""
+    invoices = Invoice.objects.filter(booking_account__customer=customer)
+    outstanding = Q(number__isnull=True)
+    totals = invoices.filter(canceled=False).aggregate(
+        invoice_count=Count("pk"),
+        invoiced_net=Sum("total_net", default=0),
+        invoiced_gross=Sum("total_gross", default=0),
+        outstanding_count=Count("pk", filter=outstanding),
+        outstanding_net=Sum("total_net", filter=outstanding, default=0),
+        outstanding_gross=Sum("total_gross", filter=outstanding, default=0),
+        unapproved_count=Count("pk", filter=Q(approved=False)),
+    )
+    return {
+        "number": customer.number,
+        "name": customer.name,
+        "booking_accounts": customer.booking_accounts.all(),
+        "contracts": Contract.objects.filter(booking_account__customer=customer)
+        .not_expired()
+        .with_items(),
+        "invoices": invoices.order_by("-date", "-pk")[:RECENT_INVOICES],
+        "totals": totals,
+    }
 
 
 class BookingAccountFilterSet(filters.FilterSet):
@@ -15,15 +61,54 @@ class BookingAccountFilterSet(filters.FilterSet):
         fields = ["customer"]
 
 
-class BookingAccountViewSet(EasybillMixin, viewsets.ModelViewSet):
+class BookingAccountViewSet(
+    SparseFieldsViewSetMixin, EasybillMixin, viewsets.ModelViewSet
+):
     queryset = BookingAccount.objects.all().select_related("customer", "sepa")
     serializer_class = BookingAccountSerializer
     filterset_class = BookingAccountFilterSet
+    deferrable_fields = ("easybill_data",)
 
 
-class CustomerViewSet(EasybillMixin, viewsets.ModelViewSet):
+class CustomerFilterSet(ModifiedSinceFilterSet):
+    class Meta:
+        model = Customer
+        fields = ["modified_since"]
+
+
+class CustomerViewSet(
+    BatchLookupMixin,
+    SparseFieldsViewSetMixin,
+    ModifiedSinceMixin,
+    EasybillMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Customer.objects.all().prefetch_related(
         "booking_accounts", "booking_accounts__sepa"
     )
     serializer_class = CustomerSerializer
     lookup_field = "number"
+    filterset_class = CustomerFilterSet
+    cursor_ordering = ("number",)
+    deferrable_fields = ("crm_data", "easybill_data")
+
+    @swagger_auto_schema(method="get", responses={200: CustomerOverviewSerializer})
+    @action(detail=True, methods=["get"])
+    @read_from_primary
+    def overview(self, request, number=None):
+        """The booking accounts, the contracts that haven't ended with their items, the
+        most recent invoices and the invoice totals of the customer. Outstanding invoices
+        are the ones easybill hasn't issued yet. Cached until one of them changes, so
+        `?fields=`/`?omit=` don't apply, and read from the primary."""
+        if not number.isdigit():
+            raise Http404
+        key = CUSTOMER_OVERVIEW_CACHE_KEY.format(int(number))
+        data = cache.get(key)
+        if data is None:
+            serializer = CustomerOverviewSerializer(
+                get_customer_overview(self.get_object()),
+                context={**self.get_serializer_context(), "sparse_fields": False},
+            )
+            data = serializer.data
+            cache.set(key, data, CUSTOMER_OVERVIEW_CACHE_TIMEOUT)
+        return Response(data)
@@ -1,46 +1,110 @@
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
-from rest_framework.response import Response
+import hashlib
+import json
 
-from contracting.models import Contract
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, F, Max, OuterRef, Q, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import condition, require_GET
 
+from contracting.models import BookingAccount, Contract, ContractItem, Customer
+from contracting.models.contract import GNOM_FEED_CACHE_KEY
+from globalways.middlewares.replica import read_from_primary
 
-@api_view()
-@permission_classes([AllowAny])
+# Contracts and items drop the cached state when saved (see QueueModelMixin.queue_cache_keys),
+# the timeout covers changes of customer and account names, and bulk updates.
+FEED_CACHE_TIMEOUT = 300
+
+
+def get_feed_state():
+    """Newest modification and an ETag of everything the feed contains."""
+    state = cache.get(GNOM_FEED_CACHE_KEY)
+    if state is None:
+        timestamps = [
+            model.objects.aggregate(last_modified=Max("modified"))["last_modified"]
+            for model in (Contract, ContractItem, BookingAccount, Customer)
+        ]
+        last_modified = max(filter(None, timestamps), default=None)
+        # The counts catch deletions, which don't leave a newer timestamp behind
+        version = "{}:{}:{}".format(
+            Contract.objects.count(),
+            ContractItem.objects.count(),
+            last_modified.isoformat() if last_modified else "",
+        )
+        state = {
+            "last_modified": last_modified,
+            "etag": hashlib.md5(version.encode()).hexdigest(),
+        }
+        cache.set(GNOM_FEED_CACHE_KEY, state, FEED_CACHE_TIMEOUT)
+    return state
+
+
+def get_feed_rows():
+    ready_items = ContractItem.objects.filter(contract=OuterRef("pk")).filter(
+        ~Q(ready_for_service=""), ready_for_service__isnull=False
+    )
+    contracts = Contract.objects.all()
+    # The rows are read while streaming, after the request's database routing ended
+    return (
+        contracts.using(contracts.db)
+        .annotate(
+            customer_number=F("booking_account__customer__number"),
+            customer_name=Coalesce(
+                NullIf("booking_account__customer__name", Value("")),
+                "booking_account__address_company",
+            ),
+            contract_id=F("number"),
+            product=F("name"),
+            start_date=F("valid_from"),
+            end_date=F("valid_till"),
+            is_ready_for_service=Exists(ready_items),
+        )
+        .values(
+            "customer_number",
+            "customer_name",
+            "contract_id",
+            "product",
+            "start_date",
+            "end_date",
+            "is_ready_for_service",
+        )
+        .iterator(chunk_size=2000)
+    )
+
+
+def stream_feed(rows):
+    yield "["
+    for i, row in enumerate(rows):
+        row["ready_for_service"] = row.pop("is_ready_for_service")
+        yield ("," if i else "") + json.dumps(row, cls=DjangoJSONEncoder)
+    yield "]"
+
+
+# The cached state has to be read from the primary, the replica may lag behind
+@read_from_primary
+@require_GET
+@condition(
+    etag_func=lambda request: get_feed_state()["etag"],
+    last_modified_func=lambda request: get_feed_state()["last_modified"],
+)
 def contract_view(request):
     """Response structure is a plain, unpaginated list with one entry per contract of the form:
 
     {
         "customer_number": 123,
         "customer_name": "test",
-        "contract_number": 123,
+        "contract_id": 123,
         "product": "CCDB import",
         "start_date": "2020-01-01",
         "end_date": "2032-01-01":
         "ready_for_service": True/False,
     }
-    """
 
-    return Response(
-        [
-            {
-                "customer_number": contract.booking_account.customer.number,
-                "customer_name": contract.booking_account.customer.name
-                or contract.booking_account.address_company,
-                "contract_id": contract.number,
-                "product": contract.name,
-                "start_date": (
-                    contract.valid_from.isoformat() if contract.valid_from else None
-                ),
-                "end_date": (
-                    contract.valid_till.isoformat() if contract.valid_till else None
-                ),
-                "ready_for_service": any(
-                    item.ready_for_service for item in contract.items.all()
-                ),
-            }
-            for contract in Contract.objects.all().select_related(
-                "booking_account", "booking_account__customer"
-            )
-        ]
+    The list is streamed from a single query. Clients should poll with If-None-Match or
+    If-Modified-Since, unchanged feeds are answered with 304 without touching the contracts.
+    No authentication is required.
+    """
+    return StreamingHttpResponse(
+        stream_feed(get_feed_rows()), content_type="application/json"
     )
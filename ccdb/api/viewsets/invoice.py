@@ -1,29 +1,87 @@
 from django_filters import rest_framework as filters
 from rest_framework import viewsets
+from rest_framework.response import Response
 
+from api.serializers.account import BookingAccountSerializer
 from api.serializers.invoice import InvoiceItemSerializer, InvoiceSerializer
-from api.viewsets.mixins import EasybillMixin
+from api.viewsets.mixins import EasybillMixin, SparseFieldsViewSetMixin, exists_filter
 from contracting.models import Invoice, InvoiceItem
 
 
 class InvoiceFilterSet(filters.FilterSet):
     customer = filters.NumberFilter(field_name="booking_account__customer__number")
-    contract = filters.NumberFilter(field_name="items__contract_item__contract__number")
+    contract = filters.NumberFilter(
+        method=exists_filter("items", "contract_item__contract__number"),
+        help_text="Invoices with at least one item of this contract",
+    )
 
     class Meta:
         model = Invoice
         fields = ("booking_account", "customer", "contract", "approved", "number")
 
 
-class InvoiceViewSet(EasybillMixin, viewsets.ModelViewSet):
+class InvoiceViewSet(SparseFieldsViewSetMixin, EasybillMixin, viewsets.ModelViewSet):
     queryset = (
         Invoice.objects.all()
         .select_related("booking_account")
         .select_related("booking_account__customer")
+        .select_related("booking_account__sepa")
         .prefetch_related("items")
     )
     serializer_class = InvoiceSerializer
     filterset_class = InvoiceFilterSet
+    # The cursor is the first field only, invoices of one run share their date
+    cursor_ordering = ("id",)
+    deferrable_fields = (
+        "easybill_data",
+        "billing_data",
+        "booking_account.easybill_data",
+    )
+
+    def get_includes(self):
+        # No request during schema generation
+        if self.action != "list" or self.request is None:
+            return set()
+        return set(
+            filter(None, self.request.query_params.get("include", "").split(","))
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["include"] = self.get_includes()
+        return context
+
+    def list(self, request, *args, **kwargs):
+        """With `?include=booking_accounts`, invoices only contain the id of their booking
+        account, and every account of the page is returned once in `included`, keyed by id.
+        """
+        if "booking_accounts" not in self.get_includes():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        invoices = page if page is not None else list(queryset)
+        data = self.get_serializer(invoices, many=True).data
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response({"results": data})
+
+        # Already joined, see queryset
+        accounts = {
+            invoice.booking_account_id: invoice.booking_account for invoice in invoices
+        }
+        context = {
+            **self.get_serializer_context(),
+            "field_path_prefix": "booking_account.",
+        }
+        response.data["included"] = {
+            "booking_accounts": {
+                str(pk): BookingAccountSerializer(account, context=context).data
+                for pk, account in accounts.items()
+            }
+        }
+        return response
 
 
 class InvoiceItemFilterSet(filters.FilterSet):
@@ -47,8 +105,10 @@ class InvoiceItemFilterSet(filters.FilterSet):
         ]
 
 
-class InvoiceItemViewSet(viewsets.ModelViewSet):
+class InvoiceItemViewSet(SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = InvoiceItem.objects.all().select_related("invoice")
     serializer_class = InvoiceItemSerializer
     lookup_field = "number"
     filterset_class = InvoiceItemFilterSet
+    cursor_ordering = ("id",)
+    deferrable_fields = ("easybill_data",)
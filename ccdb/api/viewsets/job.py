@@ -0,0 +1,31 @@
+import time
+
+from rest_framework import serializers, viewsets
+from rest_framework.response import Response
+
+from api.serializers.job import JobSerializer
+from main.models import Job
+
+# Longest time a request may wait for a job, it blocks a worker process meanwhile
+MAX_JOB_WAIT = 30
+JOB_POLL_INTERVAL = 0.5
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all().select_related("content_type")
+    serializer_class = JobSerializer
+    filterset_fields = ["name", "state"]
+
+    def retrieve(self, request, *args, **kwargs):
+        """With `?wait=<seconds>` (at most 30), responds when the job is finished or the
+        time is up, whichever comes first."""
+        job = self.get_object()
+        try:
+            wait = min(float(request.query_params.get("wait") or 0), MAX_JOB_WAIT)
+        except ValueError:
+            raise serializers.ValidationError({"wait": ["A number is required."]})
+        deadline = time.monotonic() + wait
+        while not job.is_finished and time.monotonic() < deadline:
+            time.sleep(JOB_POLL_INTERVAL)
+            job.refresh_from_db()
+        return Response(self.get_serializer(job).data)
@@ -1,13 +1,194 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils.timezone import now
+from django_filters import rest_framework as filters
+from django_filters.fields import IsoDateTimeField
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from api.serializers.job import JobSerializer
+from api.serializers.mixins import get_sparse_fieldset, is_path_included
+from contracting import tasks
+from contracting.utils.easybill import EASYBILL_SYNC_JOB_TIMEOUT
+from main.models import Job
+
+# Most numbers of one batch lookup
+MAX_BATCH_LOOKUP = 5000
 
 
 class EasybillMixin:
     @action(detail=True, methods=["post"], url_path="easybill-sync")
-    def easybill_sync(self):
+    def easybill_sync(self, request, *args, **kwargs):
+        """Pushes the object to easybill in the background. Responds with 202 and the job,
+        which can be polled (see JobViewSet). While a sync of the object is running,
+        the running job is returned instead of starting another one."""
         item = self.get_object()
+        with transaction.atomic():
+            # Concurrent requests for the same object wait for each other here
+            type(item)._base_manager.select_for_update().filter(pk=item.pk).exists()
+            running = (
+                Job.objects.filter(
+                    name="easybill_sync",
+                    content_type=ContentType.objects.get_for_model(item),
+                    object_id=str(item.pk),
+                    created__gte=now()
+                    - datetime.timedelta(seconds=EASYBILL_SYNC_JOB_TIMEOUT),
+                )
+                .exclude(state__in=Job.FINISHED_STATES)
+                .order_by("-created")
+                .first()
+            )
+            if running is not None:
+                return self.job_response(running)
+            job = Job.objects.create(
+                name="easybill_sync",
+                target=item,
+                created_by=request.user if request.user.is_authenticated else None,
+            )
+            transaction.on_commit(lambda: tasks.easybill_sync.delay(str(job.pk)))
+        return self.job_response(job)
+
+    def job_response(self, job):
+        data = JobSerializer(job, context=self.get_serializer_context()).data
+        return Response(
+            data, status=status.HTTP_202_ACCEPTED, headers={"Location": data["url"]}
+        )
+
+
+def exists_filter(relation, lookup):
+    """Filter method for the objects with at least one related object (through the reverse
+    relation `relation`) whose `lookup` matches the value. Filtering across the relation
+    directly would return an object once per matching related object."""
+
+    def filter_exists(queryset, name, value):
+        related_field = queryset.model._meta.get_field(relation).field
+        related = related_field.model._default_manager.filter(
+            **{related_field.name: OuterRef("pk"), lookup: value}
+        )
+        return queryset.filter(Exists(related))
+
+    return filter_exists
+
+
+class BatchLookupSerializer(serializers.Serializer):
+    numbers = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_BATCH_LOOKUP,
+    )
+
+
+class BatchLookupMixin:
+    """`POST .../lookup/` with {"numbers": [...]} returns the objects with these numbers
+    (the `lookup_field`) in one response: {"results": {number: object}, "missing": [...]}.
+    They are fetched with one IN query and the queryset of the list. `?fields=`/`?omit=`
+    work like for the list."""
+
+    read_only_actions = ("lookup",)
+
+    @swagger_auto_schema(request_body=BatchLookupSerializer, method="post")
+    @action(detail=False, methods=["post"])
+    def lookup(self, request, *args, **kwargs):
+        serializer = BatchLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        numbers = set(serializer.validated_data["numbers"])
+        objects = list(
+            self.get_queryset().filter(**{f"{self.lookup_field}__in": numbers})
+        )
+        data = self.get_serializer(objects, many=True).data
+        results = {
+            str(getattr(obj, self.lookup_field)): row for obj, row in zip(objects, data)
+        }
+        return Response(
+            {
+                "results": results,
+                "missing": sorted(n for n in numbers if str(n) not in results),
+            }
+        )
+
+
+class ModifiedSinceFilterSet(filters.FilterSet):
+    modified_since = filters.IsoDateTimeFilter(
+        field_name="modified",
+        lookup_expr="gte",
+        help_text="Only objects changed since this time, see ModifiedSinceMixin",
+    )
+
+
+class ModifiedSinceMixin:
+    """Delta sync for list endpoints whose filterset has a `modified_since` filter.
+
+    With `?modified_since=<timestamp>`, the list only contains objects changed since then,
+    and the response has two more keys: `deleted`, the lookup values (numbers) of the objects
+    deleted since then, taken from the history, and `sync_timestamp`, the value to pass as
+    `modified_since` for the next poll.
+
+    `sync_timestamp` lies `MODIFIED_SINCE_OVERLAP_SECONDS` before the first page was read,
+    so changes committed by transactions that were still running then are part of the
+    next poll. The pages of one poll share it (the `next` links carry it along), so changes
+    to pages already read are part of the next poll as well. Objects can therefore show up
+    in consecutive polls, clients need to de-duplicate them (by number)."""
+
+    def list(self, request, *args, **kwargs):
+        if "modified_since" not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        sync_timestamp = self.get_sync_timestamp(request)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code != 200 or not isinstance(response.data, dict):
+            return response
+        for link in ("next", "previous"):
+            if response.data.get(link):
+                response.data[link] = replace_query_param(
+                    response.data[link], "sync_timestamp", sync_timestamp.isoformat()
+                )
+        since = IsoDateTimeField().clean(request.query_params["modified_since"])
+        response.data["deleted"] = list(
+            self.queryset.model.history.filter(
+                history_type="-", history_date__gte=since
+            )
+            .values_list(self.lookup_field, flat=True)
+            .distinct()
+        )
+        response.data["sync_timestamp"] = sync_timestamp
+        return response
+
+    def get_sync_timestamp(self, request):
+        """The `sync_timestamp` of the first page, passed on to the following ones."""
+        value = request.query_params.get("sync_timestamp")
+        if value is None:
+            overlap = datetime.timedelta(
+                seconds=settings.MODIFIED_SINCE_OVERLAP_SECONDS
+            )
+            return now() - overlap
         try:
-            item.easybill_sync()
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
-        return Response(self.serializer_class(item).data)
+            return IsoDateTimeField().clean(value)
+        except DjangoValidationError:
+            raise serializers.ValidationError({"sync_timestamp": "Invalid timestamp."})
+
+
+class SparseFieldsViewSetMixin:
+    """Defers the large columns in `deferrable_fields` (dotted paths, like the serializer
+    fields) that are left out with `?fields=`/`?omit=`, see `SparseFieldsMixin`."""
+
+    deferrable_fields = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        include, omit = get_sparse_fieldset(self.request)
+        if include or omit:
+            deferred = [
+                path.replace(".", "__")
+                for path in self.deferrable_fields
+                if not is_path_included(path, include, omit)
+            ]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+        return queryset
@@ -61,11 +61,15 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.BasicAuthentication",
+        "api.authentication.ApiKeyAuthentication",
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.TokenAuthentication",
     ),
-    "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_FILTER_BACKENDS": (
+        "django_filters.rest_framework.DjangoFilterBackend",
+        "api.filters.SearchDocumentFilter",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.ApiPagination",
     "SEARCH_PARAM": "q",
     "ORDERING_PARAM": "o",
     "VERSIONING_PARAM": "v",
@@ -112,8 +116,11 @@ DEBUG_ALLOWED_CELERY_TASKS = [
     "contracting.tasks.task_update_contract_status",
     "contracting.tasks.run_invoicing",
     "contracting.tasks.easybill_sync_invoices",
+    "contracting.tasks.easybill_sync",
+    "contracting.tasks.bulk_action",
     "contracting.tasks.create_test_log",
     "main.tasks.send_queue_task",
+    "main.tasks.send_queue_messages_task",
 ]
 
 CELERY_BEAT_SCHEDULE = {
@@ -156,6 +163,8 @@ INSTALLED_APPS = [
 AUTHENTICATION_BACKENDS = ("django.contrib.auth.backends.ModelBackend",)
 
 MIDDLEWARE = [
+    "globalways.middlewares.performance.ServerTimingMiddleware",
+    "globalways.middlewares.replica.ReadReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -204,6 +213,27 @@ DATABASES = {
     # The configuration is not part of the deployment
 }
 
+# Optional read replica of the default database, e.g. a streaming replication standby
+# (see globalways.routers and globalways.middlewares.replica)
+READ_REPLICA_DATABASE = None
+if os.environ.get("POSTGRES_REPLICA_HOST"):
+    READ_REPLICA_DATABASE = "replica"
+    DATABASES[READ_REPLICA_DATABASE] = {
+        **DATABASES["default"],
+        "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+        "PORT": os.environ.get("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["globalways.routers.ReplicaRouter"]
+READ_REPLICA_PATH_PREFIX = "/api/v1/"
+# Seconds the reads of a client go to the primary after it sent a write request
+READ_REPLICA_PIN_SECONDS = int(os.environ.get("READ_REPLICA_PIN_SECONDS", 10))
+# The sync_timestamp of `?modified_since` lists lies this far in the past, so changes of
+# transactions that were still running when the list was read are not missed
+MODIFIED_SINCE_OVERLAP_SECONDS = int(
+    os.environ.get("MODIFIED_SINCE_OVERLAP_SECONDS", 60)
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
 
@@ -321,6 +351,24 @@ ALLOWED_HOSTS = ["*"]
 TOKEN_AUTH_MAP = {}
 TOKEN_AUTH_IP_HTTP_HEADER_FIELD = "HTTP_X_FORWARDED_FOR"
 
+# Version of the deployed code, e.g. the git commit. The cached API schema is regenerated
+# when it changes. Without it, a digest of the sources is used.
+CCDB_VERSION = os.environ.get("CCDB_VERSION")
+
+# Server-Timing headers and logging of slow API requests
+# (see globalways.middlewares.performance)
+PERFORMANCE_MONITORING = os.environ.get("PERFORMANCE_MONITORING") in ("1", 1)
+PERFORMANCE_PATH_PREFIX = "/api/v1/"
+PERFORMANCE_SLOW_REQUEST_MS = int(os.environ.get("PERFORMANCE_SLOW_REQUEST_MS", 1000))
+PERFORMANCE_SLOW_REQUEST_QUERIES = int(
+    os.environ.get("PERFORMANCE_SLOW_REQUEST_QUERIES", 50)
+)
+# Number of repeated statements logged with a slow request
+PERFORMANCE_REPEATED_QUERIES = 5
+
+# Seconds a verified API key is trusted without asking the database again
+API_KEY_CACHE_TIMEOUT = 60
+
 CSP_DEFAULT_SRC = ["'self'"]
 CSP_STYLE_SRC = ["'self'", "'unsafe-inline'"]
 CSP_SCRIPT_SRC = ["'self'"]
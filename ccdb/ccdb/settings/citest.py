@@ -19,6 +19,15 @@ else:
         }
     }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# There is no broker in CI, run tasks (like sending queue messages) in-process
+CELERY_TASK_ALWAYS_EAGER = True
+
 SECRET_KEY = "viziv%r0_&srs51f583$evb2a58g#v8iczcov*6p9%ywxau!%-"
 DEBUG = True
 SECURE_SSL_REDIRECT = False
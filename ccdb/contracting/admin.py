@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.db.models import JSONField, TextField
 from django.forms import Textarea
-from django.utils.html import mark_safe
+from django.urls import reverse
+from django.utils.html import format_html, mark_safe
 from django.utils.translation import gettext_lazy as _
 from import_export.admin import ImportExportModelAdmin
 from jsoneditor.forms import JSONEditor
@@ -10,10 +11,44 @@ from contracting.resources import BookingAccountResource
 from contracting.resources import ContractResource
 
 from contracting import models, tasks
+from contracting.utils.bulk_actions import start_bulk_action
+from globalways.utils.admin import (
+    EstimatedCountPaginator,
+    PaginatedInlineMixin,
+    page_links,
+)
+from globalways.utils.decorators import update_with_history
+from main.models import Job
+
+
+class BulkActionAdminMixin:
+    def run_bulk_action(self, request, queryset, action):
+        """Runs the action set-based, large selections in a background job."""
+        result = start_bulk_action(action, queryset, user=request.user)
+        if isinstance(result, Job):
+            url = reverse("admin:main_job_change", args=[result.pk])
+            self.message_user(
+                request,
+                format_html(_('Action started, see <a href="{}">its progress</a>'), url),
+            )
+        else:
+            self.message_user(
+                request, _("%(count)s objects changed") % {"count": result}
+            )
+
+
+class SearchDocumentAdminMixin:
+    """Searches the model's search document (see SearchDocumentModel) instead of joining
+    the search_fields, which are kept for the search box and the autocomplete views."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return self.model.search(queryset, search_term), False
 
 
 @admin.register(models.ContractItem)
-class ContractItemAdmin(admin.ModelAdmin):
+class ContractItemAdmin(BulkActionAdminMixin, admin.ModelAdmin):
     model = models.ContractItem
     permission_group_required = ()
     list_filter = [
@@ -28,6 +63,10 @@ class ContractItemAdmin(admin.ModelAdmin):
     ]
     actions = ["pause", "unpause", "cancel"]
 
+    def get_queryset(self, request):
+        # __str__ shows the contract number, also in the autocomplete results
+        return super().get_queryset(request).select_related("contract")
+
     def get_search_results(self, request, queryset, search_term):
 
         # Check if search term matches "Vertrag <number>" pattern
@@ -43,22 +82,20 @@ class ContractItemAdmin(admin.ModelAdmin):
 
     @admin.action(description=_("Pause all items in selected contracts"))
     def pause(self, request, queryset):
-        for item in queryset:
-            item.pause()
+        self.run_bulk_action(request, queryset, "pause_items")
 
     @admin.action(description=_("Unpause all items in selected contracts"))
     def unpause(self, request, queryset):
-        for item in queryset:
-            item.unpause()
+        self.run_bulk_action(request, queryset, "unpause_items")
 
     @admin.action(description=_("Cancel all items in selected contracts"))
     def cancel(self, request, queryset):
-        for item in queryset:
-            item.cancel()
+        self.run_bulk_action(request, queryset, "cancel_items")
 
 
-class ContractItemInlineAdmin(admin.StackedInline):
+class ContractItemInlineAdmin(PaginatedInlineMixin, admin.StackedInline):
     model = models.ContractItem
+    per_page = 20
     autocomplete_fields = [
         "predecessor",
         "parent_item",
@@ -69,6 +106,15 @@ class ContractItemInlineAdmin(admin.StackedInline):
     readonly_fields = ["number"]
     extra = 0
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("contract")
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.autocomplete_fields:
+            # Their labels (__str__) show the contract number
+            kwargs["queryset"] = models.ContractItem.objects.select_related("contract")
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
     def get_readonly_fields(self, request, obj):
         r = list(super().get_readonly_fields(request, obj))
         if obj and obj.ready_for_service:
@@ -81,7 +127,12 @@ class ContractItemInlineAdmin(admin.StackedInline):
 
 
 @admin.register(models.Contract)
-class ContractAdmin(ImportExportModelAdmin, admin.ModelAdmin):
+class ContractAdmin(
+    BulkActionAdminMixin,
+    SearchDocumentAdminMixin,
+    ImportExportModelAdmin,
+    admin.ModelAdmin,
+):
     resource_class = ContractResource
     permission_group_required = ()
     formfield_overrides = {
@@ -115,6 +166,7 @@ class ContractAdmin(ImportExportModelAdmin, admin.ModelAdmin):
     autocomplete_fields = [
         "booking_account",
     ]
+    readonly_fields = ["item_pages"]
 
     # Number is not readonly anymore to allow manual assignment
     # Uniqueness is still guaranteed by the database
@@ -124,31 +176,43 @@ class ContractAdmin(ImportExportModelAdmin, admin.ModelAdmin):
 
     @admin.action(description=_("Pause all items in selected contracts"))
     def pause(self, request, queryset):
-        for item in queryset:
-            item.pause()
+        self.run_bulk_action(request, queryset, "pause_contracts")
 
     @admin.action(
         description=_("Run invoicing (for all contracts, not just selected ones)")
     )
     def run_invoicing(self, request, queryset):
-        tasks.run_invoicing.apply_async()
+        job = Job.objects.create(name="run_invoicing", created_by=request.user)
+        tasks.run_invoicing.apply_async(kwargs={"job_id": str(job.pk)})
+        url = reverse("admin:main_job_change", args=[job.pk])
+        self.message_user(
+            request,
+            format_html(_('Invoicing started, see <a href="{}">its progress</a>'), url),
+        )
 
     @admin.action(description=_("Unpause all items in selected contracts"))
     def unpause(self, request, queryset):
-        for item in queryset:
-            item.unpause()
+        self.run_bulk_action(request, queryset, "unpause_contracts")
 
     @admin.action(description=_("Cancel all items in selected contracts"))
     def cancel(self, request, queryset):
-        for item in queryset:
-            item.cancel()
+        self.run_bulk_action(request, queryset, "cancel_contracts")
+
+    @admin.display(description=_("Item pages"))
+    def item_pages(self, obj):
+        # The items inline shows a page of them, see PaginatedInlineMixin
+        if not obj.pk:
+            return ""
+        return page_links(
+            obj.items.all(), ContractItemInlineAdmin.per_page, "items_page"
+        )
 
     def get_queryset(self, *args, **kwargs):
+        # The items are loaded page by page by their inline
         return (
             super()
             .get_queryset(*args, **kwargs)
             .select_related("booking_account", "booking_account__customer")
-            .prefetch_related("items", "items__predecessor", "items__parent_item")
         )
 
 
@@ -159,7 +223,7 @@ class SepaAdmin(admin.StackedInline):
 
 
 @admin.register(models.BookingAccount)
-class BookingAccountAdmin(ImportExportModelAdmin): 
+class BookingAccountAdmin(SearchDocumentAdminMixin, ImportExportModelAdmin): 
     resource_class = BookingAccountResource
 
     search_fields = [
@@ -183,7 +247,7 @@ class BookingAccountAdmin(ImportExportModelAdmin):
 
 
 @admin.register(models.Customer)
-class CustomerAdmin(ImportExportModelAdmin):
+class CustomerAdmin(SearchDocumentAdminMixin, ImportExportModelAdmin):
     resource_class = CustomerResource
 
     list_display = ["number", "name"]
@@ -266,7 +330,9 @@ class InvoiceHasNumberFilter(admin.SimpleListFilter):
 
 
 @admin.register(models.Invoice)
-class InvoiceAdmin(ImportExportModelAdmin, admin.ModelAdmin):
+class InvoiceAdmin(
+    SearchDocumentAdminMixin, ImportExportModelAdmin, admin.ModelAdmin
+):
     permission_group_required = ()
     formfield_overrides = {
         JSONField: {"widget": JSONEditor},
@@ -318,6 +384,8 @@ class InvoiceAdmin(ImportExportModelAdmin, admin.ModelAdmin):
         "easybill_id",
     ]
     ordering = ("-number",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (
             "Basics",
@@ -358,7 +426,7 @@ class InvoiceAdmin(ImportExportModelAdmin, admin.ModelAdmin):
 
     @admin.action(description=_("Approve invoice"))
     def approve(self, request, queryset):
-        queryset.update(approved=True)
+        update_with_history(queryset, approved=True)
 
     def document_link(self, obj):
         if obj.document_url:
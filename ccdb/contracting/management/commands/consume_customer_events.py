@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from contracting.utils.crm import CustomerEventConsumer
+
+
+class Command(BaseCommand):
+    """This command subscribes to the customers exchange and applies customer changes
+    as they happen, instead of waiting for the nightly pull_customer_data run."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefetch",
+            type=int,
+            help=f"Number of unacknowledged messages to fetch (default {CustomerEventConsumer.prefetch_count})",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help=f"Number of messages written in one transaction (default {CustomerEventConsumer.batch_size})",
+        )
+        parser.add_argument(
+            "--batch-timeout",
+            type=float,
+            help=f"Seconds to wait for a batch to fill up (default {CustomerEventConsumer.batch_timeout})",
+        )
+
+    def handle(self, *args, **options):
+        consumer = CustomerEventConsumer(
+            prefetch_count=options.get("prefetch"),
+            batch_size=options.get("batch_size"),
+            batch_timeout=options.get("batch_timeout"),
+        )
+        consumer.run()
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from contracting.utils import cbs_import
+from main.jobs import run_job
 
 
 class Command(BaseCommand):
@@ -72,4 +73,10 @@ class Command(BaseCommand):
                 BookingAccount.objects.all().delete()
                 Customer.objects.all().delete()
 
-        cbs_import.import_all(invoices=invoices, contracts=contracts, accounts=accounts)
+        with run_job("import_cbs", console=True) as progress:
+            cbs_import.import_all(
+                invoices=invoices,
+                contracts=contracts,
+                accounts=accounts,
+                progress=progress,
+            )
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from contracting.utils.crm import pull_customer_data
+from main.jobs import run_job
 
 BATCH_SIZE = 100
 
@@ -18,6 +19,9 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         customer = options.get("customer")
-        pull_customer_data(
-            customers=[customer] if customer else None, batch_size=BATCH_SIZE
-        )
+        with run_job("pull_customer_data") as progress:
+            pull_customer_data(
+                customers=[customer] if customer else None,
+                batch_size=BATCH_SIZE,
+                progress=progress,
+            )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from contracting.models import BookingAccount, Contract, Customer, Invoice
+
+SEARCHABLE_MODELS = {
+    "customer": Customer,
+    "bookingaccount": BookingAccount,
+    "contract": Contract,
+    "invoice": Invoice,
+}
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search documents, e.g. after changing search_document_fields"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            help=f"Only rebuild the documents of these models ({', '.join(SEARCHABLE_MODELS)})",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["models"]) - set(SEARCHABLE_MODELS)
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(sorted(unknown))}")
+        for name in options["models"] or SEARCHABLE_MODELS:
+            count = SEARCHABLE_MODELS[name].update_search_documents()
+            self.stdout.write(f"{name}: {count} documents")
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from contracting.utils.invoicing import run_invoicing
+from main.jobs import run_job
 
 
 class Command(BaseCommand):
@@ -14,4 +15,6 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         dry_run = options.get("dry_run")
 
-        run_invoicing(dry_run=dry_run, console_output=True)
+        name = "run_invoicing (dry run)" if dry_run else "run_invoicing"
+        with run_job(name, console=True) as progress:
+            run_invoicing(dry_run=dry_run, console_output=True, progress=progress)
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contracting", "0027_easybill_invoice_type_change"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contract",
+            index=models.Index(fields=["modified"], name="contract_modified_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="contractitem",
+            index=models.Index(fields=["modified"], name="contractitem_modified_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(fields=["modified"], name="customer_modified_idx"),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contracting", "0028_modified_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contractitem",
+            index=models.Index(
+                fields=["contract", "paused"], name="contractitem_paused_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoiceitem",
+            index=models.Index(
+                fields=["contract_item", "invoice"],
+                name="invoiceitem_contract_idx",
+            ),
+        ),
+    ]
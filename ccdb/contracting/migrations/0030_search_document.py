@@ -0,0 +1,111 @@
+from django.db import migrations, models
+
+from contracting.utils.search import update_search_documents
+
+# Trigram indexes make the `LIKE '%word%'` queries of SearchDocumentModel.search fast
+SEARCH_DOCUMENT_TABLES = [
+    "contracting_bookingaccount",
+    "contracting_contract",
+    "contracting_customer",
+    "contracting_invoice",
+]
+
+# The search_document_fields of the models at the time of this migration
+SEARCH_DOCUMENT_FIELDS = {
+    "BookingAccount": [
+        "id",
+        "customer__number",
+        "payment_type",
+        "address_name",
+        "address_email",
+        "address_city",
+        "address_company",
+        "easybill_sync_state",
+    ],
+    "Contract": [
+        "number",
+        "name",
+        "booking_account_id",
+        "booking_account__address_name",
+        "booking_account__address_company",
+        "booking_account__customer__number",
+        "items__number",
+        "items__product_name",
+        "items__product_description",
+    ],
+    "Customer": [
+        "number",
+        "name",
+        "booking_accounts__id",
+        "booking_accounts__address_name",
+        "booking_accounts__address_company",
+    ],
+    "Invoice": [
+        "number",
+        "easybill_id",
+        "booking_account_id",
+        "booking_account__address_name",
+        "booking_account__address_company",
+        "booking_account__customer__number",
+        "items__id",
+        "items__name",
+        "items__description",
+        "items__contract_item__contract__number",
+    ],
+}
+
+
+def fill_search_documents(apps, schema_editor):
+    # The searches only look at the documents, existing objects need theirs right away
+    for name, fields in SEARCH_DOCUMENT_FIELDS.items():
+        update_search_documents(apps.get_model("contracting", name), fields)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in SEARCH_DOCUMENT_TABLES:
+        schema_editor.execute(
+            f"CREATE INDEX {table}_search_trgm ON {table} "
+            "USING gin (search_document gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in SEARCH_DOCUMENT_TABLES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contracting", "0029_exists_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookingaccount",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="contract",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
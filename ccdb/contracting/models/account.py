@@ -4,20 +4,40 @@ from django.db import models
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
+from django_lifecycle import AFTER_DELETE, AFTER_SAVE, hook
 
+from contracting.models.customer import Customer, invalidate_customer_overviews
 from contracting.utils.easybill import EasybillModel, easybill_request
+from contracting.utils.search import (
+    SearchDocumentModel,
+    update_search_documents_on_commit,
+)
 from globalways.models import GlobalwaysCreatedUpdatedBy, GlobalwaysTool
 from globalways.utils.decorators import historify
 
 
 @historify
 class BookingAccount(
-    GlobalwaysTool, GlobalwaysCreatedUpdatedBy, TimeStampedModel, EasybillModel
+    GlobalwaysTool,
+    GlobalwaysCreatedUpdatedBy,
+    TimeStampedModel,
+    EasybillModel,
+    SearchDocumentModel,
 ):
     """Buchungskonto.
     Named like this because just 'account' is too ambiguous."""
 
     model_icon = "fa-plug"
+    search_document_fields = [
+        "id",
+        "customer__number",
+        "payment_type",
+        "address_name",
+        "address_email",
+        "address_city",
+        "address_company",
+        "easybill_sync_state",
+    ]
 
     easybill_keys = [
         "first_name",
@@ -127,6 +147,29 @@ class BookingAccount(
             + f" ({self.id}, Kunde {self.customer.number})"
         )
 
+    @hook("after_save", on_commit=True)
+    @hook("after_delete", on_commit=True)
+    def invalidate_customer_overview(self):
+        invalidate_customer_overviews(
+            pk__in=[self.customer_id, self.initial_value("customer")]
+        )
+
+    @hook(AFTER_SAVE)
+    @hook(AFTER_DELETE)
+    def update_related_search_documents(self):
+        from .contract import Contract
+        from .invoice import Invoice
+
+        update_search_documents_on_commit(
+            Customer, [self.customer_id, self.initial_value("customer")]
+        )
+        if any(
+            self.has_changed(field)
+            for field in ("customer", "address_name", "address_company")
+        ):
+            update_search_documents_on_commit(Contract, booking_account=self.pk)
+            update_search_documents_on_commit(Invoice, booking_account=self.pk)
+
     def get_easybill_data(self):
         name = []
         if self.address_name:
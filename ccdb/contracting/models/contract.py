@@ -5,23 +5,47 @@ from dateutil.relativedelta import relativedelta
 from dateutil.rrule import MONTHLY, rrule
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models, transaction
-from django.db.models import JSONField, Max, Q
+from django.db import connections, models, router, transaction
+from django.db.models import JSONField, Max, Prefetch, Q
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
+from django_lifecycle import AFTER_UPDATE, hook
 
+from contracting.models.customer import invalidate_customer_overviews
+from contracting.utils.search import (
+    SearchDocumentModel,
+    update_search_documents_on_commit,
+)
 from globalways.model_validator import ModelValidator
 from globalways.models import GlobalwaysCreatedUpdatedBy, GlobalwaysTool
-from globalways.utils.decorators import historify
+from globalways.utils.decorators import historify, update_with_history
 from main.queue import QueueModelMixin
 
 __all__ = ["Contract"]
 
 logger = logging.getLogger(__name__)
 
+GNOM_FEED_CACHE_KEY = "api:gnom:contracts"
+
+
+def allocate_numbers(model):
+    """The next number of the model (the highest number + 1), the ones after it are free
+    as well. Call it in the transaction that saves the objects: on PostgreSQL, concurrent
+    allocations wait for it to finish (an advisory lock per table), so they don't hand
+    out the same numbers."""
+    using = router.db_for_write(model)
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext(%s))", [model._meta.db_table]
+            )
+    numbers = model._base_manager.using(using).aggregate(max_number=Max("number"))
+    return (numbers["max_number"] or 0) + 1
+
 
 class DateFromTillQuerySet(models.QuerySet):
     def valid_before(self, datestamp):
@@ -81,6 +105,15 @@ class ContractQuerySet(DateFromTillQuerySet):
         )
         return qs.distinct()
 
+    def with_items(self):
+        """Prefetches the items together with their related items and status, see
+        `ContractItemQuerySet.with_item_relations` and `ContractItemQuerySet.with_status`.
+        """
+        items = self.model._meta.get_field("items").related_model.objects
+        return self.prefetch_related(
+            Prefetch("items", queryset=items.with_item_relations().with_status())
+        )
+
 
 class ContractValidator(ModelValidator):
     def validate_sepa(self):
@@ -95,13 +128,14 @@ class ContractValidator(ModelValidator):
                     ),
                 )
 
-    def validate(self):
-        self.validate_sepa()
+    def validate_dates(self):
         if (
             self.instance.valid_till
             and self.instance.valid_from > self.instance.valid_till
         ):
             self.add_error(_("contract valid from date must before valid till"))
+
+    def validate_items(self):
         for ci in self.instance.items.all():
             try:
                 ci.full_clean()
@@ -112,10 +146,19 @@ class ContractValidator(ModelValidator):
                     ).format(ci, ci.pk, list(e.error_dict.values()))
                 )
 
+    def validate(self):
+        self.validate_sepa()
+        self.validate_dates()
+        self.validate_items()
+
 
 @historify
 class Contract(
-    GlobalwaysTool, QueueModelMixin, GlobalwaysCreatedUpdatedBy, TimeStampedModel
+    GlobalwaysTool,
+    QueueModelMixin,
+    SearchDocumentModel,
+    GlobalwaysCreatedUpdatedBy,
+    TimeStampedModel,
 ):
 
     name = models.CharField(max_length=200)
@@ -190,6 +233,18 @@ class Contract(
     queue_exchange = "contracts"
     queue_source = "contract"
     queue_message_type = "contract"
+    queue_cache_keys = (GNOM_FEED_CACHE_KEY,)
+    search_document_fields = [
+        "number",
+        "name",
+        "booking_account_id",
+        "booking_account__address_name",
+        "booking_account__address_company",
+        "booking_account__customer__number",
+        "items__number",
+        "items__product_name",
+        "items__product_description",
+    ]
     queue_fields = [
         "number",
         "name",
@@ -218,6 +273,7 @@ class Contract(
         verbose_name = _("contract")
         verbose_name_plural = _("contracts")
         base_manager_name = "objects"
+        indexes = [models.Index(fields=["modified"], name="contract_modified_idx")]
 
     @cached_property
     def sepa_enabled(self):
@@ -232,6 +288,25 @@ class Contract(
     def customer_number(self):
         return self.booking_account.customer.number
 
+    @hook("after_save", on_commit=True)
+    @hook("after_delete", on_commit=True)
+    def invalidate_customer_overview(self):
+        # The previous customer's as well when the contract moved to another account
+        invalidate_customer_overviews(
+            booking_accounts__in=[
+                self.booking_account_id,
+                self.initial_value("booking_account"),
+            ]
+        )
+
+    @hook(AFTER_UPDATE, when="number", has_changed=True)
+    def update_invoice_search_documents(self):
+        from .invoice import Invoice
+
+        update_search_documents_on_commit(
+            Invoice, items__contract_item__contract=self.pk
+        )
+
     def invoices(self):
         from .invoice import Invoice
 
@@ -245,6 +320,14 @@ class Contract(
             - relativedelta(day=31)
         )
 
+    @property
+    def termination_end(self):
+        """The end of the contract (and its items) if it's terminated today."""
+        end = self.next_possible_contract_end
+        if now().date() > self.next_cancelation_date and self.automatic_extension:
+            end += relativedelta(months=self.automatic_extension)
+        return end
+
     @property
     def next_possible_contract_end(self):
         today = datetime.date.today()
@@ -255,15 +338,9 @@ class Contract(
         return end_date - relativedelta(days=1) - relativedelta(day=31)
 
     def save(self, **kwargs):
-        if not self.number:
-            max_number = (
-                Contract.objects.all()
-                .aggregate(max_number=Max("number"))
-                .get("max_number")
-                or 0
-            )
-            self.number = max_number + 1
         with transaction.atomic():
+            if not self.number:
+                self.number = allocate_numbers(Contract)
             super().save(**kwargs)
             self.full_clean()
 
@@ -283,19 +360,20 @@ class Contract(
                 )
             self.valid_till = date
         else:
-            self.valid_till = self.next_possible_contract_end
-            if now().date() > self.next_cancelation_date and self.automatic_extension:
-                self.valid_till += relativedelta(months=self.automatic_extension)
+            self.valid_till = self.termination_end
         self.save()
-        self.items.all().filter(
-            valid_till__isnull=True, next_invoice__gte=self.valid_till
-        ).update(next_invoice=None)
+        update_with_history(
+            self.items.all().filter(
+                valid_till__isnull=True, next_invoice__gte=self.valid_till
+            ),
+            next_invoice=None,
+        )
 
     def unpause(self):
-        self.items.all().update(paused=False)
+        update_with_history(self.items.all(), paused=False)
 
     def pause(self):
-        self.items.all().update(paused=True)
+        update_with_history(self.items.all(), paused=True)
 
     def collective_invoice_contracts(self):
         return Contract.objects.accounted_together_with(self)
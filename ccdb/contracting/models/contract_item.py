@@ -1,17 +1,25 @@
 import datetime
 import logging
 
-from dateutil.relativedelta import relativedelta
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import JSONField, Max, Q
+from django.db import models, transaction
+from django.db.models import Case, JSONField, Q, Value, When
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
-
-from contracting.models.contract import DateFromTillQuerySet
+from django_lifecycle import AFTER_DELETE, AFTER_SAVE, hook
+
+from contracting.models.contract import (
+    GNOM_FEED_CACHE_KEY,
+    Contract,
+    DateFromTillQuerySet,
+    allocate_numbers,
+)
+from contracting.models.customer import invalidate_customer_overviews
+from contracting.utils.search import update_search_documents_on_commit
 from globalways.model_validator import ModelValidator
 from globalways.models import GlobalwaysCreatedUpdatedBy, GlobalwaysTool
 from globalways.utils.decorators import historify
@@ -50,6 +58,38 @@ class ContractItemQuerySet(DateFromTillQuerySet):
             )
         )
 
+    def with_status(self, today=None):
+        """Annotates `annotated_status`, the same as `ContractItem.status` but computed in SQL,
+        so it can be used for filtering."""
+        today = today or now().date()
+        Status = self.model.Status
+        running = Q(status_valid_till__isnull=True) | Q(status_valid_till__gte=today)
+        return self.alias(
+            status_valid_from=Coalesce("valid_from", "contract__valid_from"),
+            status_valid_till=Coalesce("valid_till", "contract__valid_till"),
+        ).annotate(
+            annotated_status=Case(
+                When(
+                    Q(ready_for_service__isnull=True) | Q(ready_for_service=""),
+                    then=Value(Status.IN_DELIVERY),
+                ),
+                When(
+                    Q(status_valid_from__isnull=True) | Q(status_valid_from__gt=today),
+                    then=Value(Status.IN_DELIVERY),
+                ),
+                When(running & Q(paused=True), then=Value(Status.PAUSED)),
+                When(running, then=Value(Status.ACTIVE)),
+                default=Value(Status.ENDED),
+                output_field=models.CharField(),
+            )
+        )
+
+    def with_item_relations(self):
+        """Loads the related items the API serializers show with a fixed number of queries."""
+        return self.select_related(
+            "predecessor", "successor", "parent_item"
+        ).prefetch_related("child_items")
+
 
 class ContractItemValidator(ModelValidator):
     def validate_contract(self):
@@ -245,6 +285,23 @@ class ContractItem(
     def __str__(self):
         return f"{self.number} – {self.product_name} (Vertrag {self.contract.number})"
 
+    @hook("after_save", on_commit=True)
+    @hook("after_delete", on_commit=True)
+    def invalidate_customer_overview(self):
+        invalidate_customer_overviews(
+            booking_accounts__contracts__in=[
+                self.contract_id,
+                self.initial_value("contract"),
+            ]
+        )
+
+    @hook(AFTER_SAVE)
+    @hook(AFTER_DELETE)
+    def update_contract_search_document(self):
+        update_search_documents_on_commit(
+            Contract, [self.contract_id, self.initial_value("contract")]
+        )
+
     model_icon = "fa-clone"
     queue_id_field = "number"
     queue_exchange = "contracts"
@@ -252,6 +309,7 @@ class ContractItem(
     queue_message_type = "contract"
     queue_create_type = "update"
     queue_delete_type = "update"
+    queue_cache_keys = (GNOM_FEED_CACHE_KEY,)
     queue_fields = (
         "number",
         "product_code",
@@ -313,18 +371,18 @@ class ContractItem(
         verbose_name = _("Contract Item")
         verbose_name_plural = _("Contract Items")
         base_manager_name = "objects"
+        indexes = [
+            models.Index(fields=["modified"], name="contractitem_modified_idx"),
+            # EXISTS filters of contracts by their items
+            models.Index(fields=["contract", "paused"], name="contractitem_paused_idx"),
+        ]
 
     def save(self, **kwargs):
-        if not self.number:
-            max_number = (
-                ContractItem.objects.all()
-                .aggregate(max_number=Max("number"))
-                .get("max_number")
-                or 0
-            )
-            self.number = max_number + 1
-        self.full_clean()
-        super().save(**kwargs)
+        with transaction.atomic():
+            if not self.number:
+                self.number = allocate_numbers(ContractItem)
+            self.full_clean()
+            super().save(**kwargs)
 
     def clean(self):
         super().clean()
@@ -378,15 +436,8 @@ class ContractItem(
         if date:
             self.valid_till = date
         else:
-            self.valid_till = self.contract.next_possible_contract_end
-            if (
-                now() > self.contract.next_cancelation_date
-                and self.contract.automatic_extension
-            ):
-                self.valid_till += relativedelta(
-                    months=self.contract.automatic_extension
-                )
-        if self.next_invoice >= self.valid_till:
+            self.valid_till = self.contract.termination_end
+        if self.next_invoice and self.next_invoice >= self.valid_till:
             self.next_invoice = None
         self.save()
 
@@ -1,12 +1,30 @@
+from django.core.cache import cache
 from django.db import models
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
+from django_lifecycle import AFTER_UPDATE, hook
 
 from contracting.utils.easybill import EasybillModel, easybill_request
+from contracting.utils.search import (
+    SearchDocumentModel,
+    update_search_documents_on_commit,
+)
 from globalways.models import GlobalwaysCreatedUpdatedBy, GlobalwaysTool
 from globalways.utils.decorators import historify
 
+# The cached API overview of a customer (see CustomerViewSet.overview), by customer number
+CUSTOMER_OVERVIEW_CACHE_KEY = "api:customer-overview:{}"
+
+
+def invalidate_customer_overviews(**lookup):
+    """Drops the cached overviews of the customers matching the lookup. Called by the
+    models the overview shows when they are saved or deleted."""
+    numbers = Customer.objects.filter(**lookup).values_list("number", flat=True)
+    cache.delete_many(
+        [CUSTOMER_OVERVIEW_CACHE_KEY.format(number) for number in numbers]
+    )
+
 
 def get_default_data():
     return {"synced_data": {}}
@@ -14,7 +32,11 @@ def get_default_data():
 
 @historify
 class Customer(
-    GlobalwaysTool, GlobalwaysCreatedUpdatedBy, TimeStampedModel, EasybillModel
+    GlobalwaysTool,
+    GlobalwaysCreatedUpdatedBy,
+    TimeStampedModel,
+    EasybillModel,
+    SearchDocumentModel,
 ):
     name = models.CharField(max_length=200, null=True, blank=True)
     number = models.PositiveIntegerField(unique=True, verbose_name=_("customer number"))
@@ -23,10 +45,18 @@ class Customer(
     crm_last_sync = models.DateTimeField(null=True, blank=True)
 
     model_icon = "fa-plug"
+    search_document_fields = [
+        "number",
+        "name",
+        "booking_accounts__id",
+        "booking_accounts__address_name",
+        "booking_accounts__address_company",
+    ]
 
     easybill_attributes = [
         "crm_data"
     ]  # If this changes, the easybill sync state is set to "dirty"
+    history_volatile_fields = EasybillModel.history_volatile_fields + ["crm_last_sync"]
     easybill_keys = [
         "company_name",
         "display_name",
@@ -44,10 +74,31 @@ class Customer(
 
     class Meta:
         abstract = False
+        indexes = [models.Index(fields=["modified"], name="customer_modified_idx")]
 
     def __str__(self):
         return f"{self.name or _('Customer')} ({self.number})"
 
+    @hook("after_save", on_commit=True)
+    @hook("after_delete", on_commit=True)
+    def invalidate_customer_overview(self):
+        cache.delete_many(
+            {
+                CUSTOMER_OVERVIEW_CACHE_KEY.format(number)
+                for number in (self.number, self.initial_value("number"))
+            }
+        )
+
+    @hook(AFTER_UPDATE, when="number", has_changed=True)
+    def update_related_search_documents(self):
+        from .account import BookingAccount
+        from .contract import Contract
+        from .invoice import Invoice
+
+        update_search_documents_on_commit(BookingAccount, customer=self.pk)
+        update_search_documents_on_commit(Contract, booking_account__customer=self.pk)
+        update_search_documents_on_commit(Invoice, booking_account__customer=self.pk)
+
     def crm_sync(self):
         from contracting.utils.crm import pull_customer_data
 
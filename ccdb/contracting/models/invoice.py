@@ -8,8 +8,14 @@ from django.db import models
 from django.utils.crypto import get_random_string
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
+from django_lifecycle import AFTER_DELETE, AFTER_SAVE, hook
 
+from contracting.models.customer import invalidate_customer_overviews
 from contracting.utils.easybill import EasybillModel, easybill_request
+from contracting.utils.search import (
+    SearchDocumentModel,
+    update_search_documents_on_commit,
+)
 from globalways.models import GlobalwaysModel
 
 
@@ -69,8 +75,19 @@ class Transaction(GlobalwaysModel, EasybillModel):
             return None
         return f"/downloads/invoice/{self.number}/"
 
+    @hook("after_save", on_commit=True)
+    @hook("after_delete", on_commit=True)
+    def invalidate_customer_overview(self):
+        # The previous customer's as well when it moved to another account
+        invalidate_customer_overviews(
+            booking_accounts__in=[
+                self.booking_account_id,
+                self.initial_value("booking_account"),
+            ]
+        )
+
 
-class Invoice(Transaction):
+class Invoice(Transaction, SearchDocumentModel):
     class SepaTypes(models.TextChoices):
         FIRST = "FRST", _("first SEPA transaction")
         RCUR = "RCUR", _("recurring SEPA transaction")
@@ -83,6 +100,19 @@ class Invoice(Transaction):
         default=True
     )  # False blocks pushes to EasyBill until resolved
 
+    search_document_fields = [
+        "number",
+        "easybill_id",
+        "booking_account_id",
+        "booking_account__address_name",
+        "booking_account__address_company",
+        "booking_account__customer__number",
+        "items__id",
+        "items__name",
+        "items__description",
+        "items__contract_item__contract__number",
+    ]
+
     sepa_transaction_type = models.CharField(
         null=True, blank=True, choices=SepaTypes.choices, max_length=4
     )
@@ -400,6 +430,13 @@ class InvoiceItem(GlobalwaysModel, EasybillModel):
             "invoice",
             "order",
         )
+        indexes = [
+            # EXISTS filters of invoices by their contract items
+            models.Index(
+                fields=["contract_item", "invoice"],
+                name="invoiceitem_contract_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         self.price_total_net = self.price_single_net * self.amount
@@ -408,6 +445,13 @@ class InvoiceItem(GlobalwaysModel, EasybillModel):
         self.invoice.update_totals()
         return result
 
+    @hook(AFTER_SAVE)
+    @hook(AFTER_DELETE)
+    def update_invoice_search_document(self):
+        update_search_documents_on_commit(
+            Invoice, [self.invoice_id, self.initial_value("invoice")]
+        )
+
     @property
     def tax_rate_factor(self):
         return 1 + (self.tax_rate / 100)
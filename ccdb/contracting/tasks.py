@@ -2,7 +2,10 @@ import logging
 
 from contracting.models import Contract
 from contracting.utils import invoicing
+from contracting.utils.bulk_actions import BULK_ACTIONS
 from globalways.utils.celery import get_celery_app
+from main.jobs import run_job
+from main.models import Job
 
 logger = logging.getLogger(__name__)
 
@@ -33,15 +36,43 @@ def task_update_contract_status():
 
 
 @app.task
-def run_invoicing():
+def run_invoicing(job_id=None):
     """Daily task creating new invoices"""
-    invoicing.run_invoicing()
+    with run_job("run_invoicing", job_id) as progress:
+        invoicing.run_invoicing(progress=progress)
 
 
 @app.task
-def easybill_sync_invoices():
+def easybill_sync_invoices(job_id=None):
     """Daily task creating new invoices"""
-    invoicing.easybill_sync_invoices()
+    with run_job("easybill_sync_invoices", job_id) as progress:
+        invoicing.easybill_sync_invoices(progress=progress)
+
+
+@app.task
+def easybill_sync(job_id):
+    """Pushes the target of the job to easybill, see EasybillMixin.easybill_sync"""
+    job = Job.objects.get(pk=job_id)
+    job.start()
+    obj = job.target
+    if obj is None:
+        job.fail("The object doesn't exist anymore")
+        return
+    try:
+        obj.easybill_sync()
+        obj.refresh_from_db()
+    except Exception as e:
+        logger.exception("easybill sync of %s failed", obj)
+        job.fail(e)
+    else:
+        job.succeed({"easybill_sync_state": obj.easybill_sync_state})
+
+
+@app.task
+def bulk_action(job_id, action, pks):
+    """Runs an admin action on a large selection, see start_bulk_action"""
+    with run_job(action, job_id) as progress:
+        progress.result = {"changed": BULK_ACTIONS[action](pks, progress=progress)}
 
 
 @app.task
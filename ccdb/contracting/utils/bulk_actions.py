@@ -0,0 +1,196 @@
+"""Set-based versions of the admin actions on contracts and items.
+
+Saving every object runs its validation, history, hooks and queue message one by one.
+Here the objects are changed in batches with `update_with_history` (one history INSERT per
+batch), and the queue messages of a batch are sent together, one per contract.
+"""
+
+import datetime
+from collections import defaultdict
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+from contracting.models import Contract, ContractItem
+from contracting.models.customer import invalidate_customer_overviews
+from globalways.utils.decorators import update_with_history
+from main.jobs import JobProgress
+from main.models import Job
+
+BULK_ACTION_BATCH_SIZE = 500
+# Larger selections are changed by a background job, see `start_bulk_action`
+BULK_ACTION_JOB_THRESHOLD = 200
+
+
+def _batches(pks):
+    pks = list(pks)
+    for start in range(0, len(pks), BULK_ACTION_BATCH_SIZE):
+        yield pks[start : start + BULK_ACTION_BATCH_SIZE]
+
+
+def _on_commit(model, payloads, contract_pks):
+    """Sends the update messages and drops the data derived from the contracts (what the
+    skipped lifecycle hooks would have done) once the batch is committed."""
+
+    def changed():
+        model.send_queue_update_payloads(payloads)
+        cache.delete_many(model.queue_cache_keys)
+        invalidate_customer_overviews(booking_accounts__contracts__in=contract_pks)
+
+    transaction.on_commit(changed)
+
+
+def _send_item_updates(rows, contract_pks):
+    """Sends one message per contract with all its changed items, `rows` are pairs of
+    the contract number and the item payload."""
+    items = defaultdict(list)
+    for contract_number, payload in rows:
+        items[contract_number].append(payload)
+    payloads = [{"number": number, "items": items} for number, items in items.items()]
+    _on_commit(ContractItem, payloads, contract_pks)
+
+
+def pause_items(item_pks, paused=True, progress=None):
+    """(Un)pauses the items, returns the number of changed items."""
+    progress = progress or JobProgress()
+    item_pks = list(item_pks)
+    progress.phase("Pausing" if paused else "Unpausing", total=len(item_pks))
+    changed = 0
+    for batch in _batches(item_pks):
+        with transaction.atomic():
+            items = ContractItem.objects.filter(pk__in=batch).exclude(paused=paused)
+            rows = list(items.values_list("number", "contract_id", "contract__number"))
+            changed += update_with_history(items, paused=paused)
+            _send_item_updates(
+                [
+                    (contract_number, {"number": number, "paused": paused})
+                    for number, _, contract_number in rows
+                ],
+                {contract_pk for _, contract_pk, _ in rows},
+            )
+        progress.advance(len(batch))
+    return changed
+
+
+def pause_contracts(contract_pks, paused=True, progress=None):
+    """(Un)pauses all items of the contracts, returns the number of changed items."""
+    item_pks = ContractItem.objects.filter(contract__in=list(contract_pks)).values_list(
+        "pk", flat=True
+    )
+    return pause_items(item_pks, paused=paused, progress=progress)
+
+
+def cancel_items(item_pks, progress=None):
+    """Terminates the items today, they end with their contract (see
+    `Contract.termination_end`). Returns the number of changed items."""
+    progress = progress or JobProgress()
+    item_pks = list(item_pks)
+    progress.phase("Canceling", total=len(item_pks))
+    today = datetime.date.today()
+    changed = 0
+    for batch in _batches(item_pks):
+        with transaction.atomic():
+            items = ContractItem.objects.filter(pk__in=batch).select_related("contract")
+            by_end = defaultdict(list)
+            ends = {}
+            for item in items:
+                if item.contract_id not in ends:
+                    ends[item.contract_id] = item.contract.termination_end
+                by_end[ends[item.contract_id]].append(item)
+            for end, group in by_end.items():
+                pks = [item.pk for item in group]
+                changed += update_with_history(
+                    ContractItem.objects.filter(pk__in=pks),
+                    termination_date=today,
+                    valid_till=end,
+                )
+                update_with_history(
+                    ContractItem.objects.filter(pk__in=pks, next_invoice__gte=end),
+                    next_invoice=None,
+                )
+            _send_item_updates(
+                [
+                    (
+                        item.contract.number,
+                        {
+                            "number": item.number,
+                            "termination_date": today.isoformat(),
+                            "valid_till": ends[item.contract_id].isoformat(),
+                        },
+                    )
+                    for group in by_end.values()
+                    for item in group
+                ],
+                set(ends),
+            )
+        progress.advance(len(batch))
+    return changed
+
+
+def cancel_contracts(contract_pks, progress=None):
+    """Terminates the contracts today like `Contract.cancel`, without validation.
+    Returns the number of changed contracts."""
+    progress = progress or JobProgress()
+    contract_pks = list(contract_pks)
+    progress.phase("Canceling", total=len(contract_pks))
+    today = datetime.date.today()
+    changed = 0
+    for batch in _batches(contract_pks):
+        with transaction.atomic():
+            by_end = defaultdict(list)
+            for contract in Contract.objects.filter(pk__in=batch):
+                by_end[contract.termination_end].append(contract)
+            for end, group in by_end.items():
+                pks = [contract.pk for contract in group]
+                changed += update_with_history(
+                    Contract.objects.filter(pk__in=pks),
+                    termination_date=today,
+                    valid_till=end,
+                )
+                update_with_history(
+                    ContractItem.objects.filter(
+                        contract__in=pks, valid_till__isnull=True, next_invoice__gte=end
+                    ),
+                    next_invoice=None,
+                )
+            payloads = [
+                {
+                    "number": contract.number,
+                    "termination_date": today.isoformat(),
+                    "valid_till": end.isoformat(),
+                }
+                for end, group in by_end.items()
+                for contract in group
+            ]
+            _on_commit(Contract, payloads, batch)
+        progress.advance(len(batch))
+    return changed
+
+
+BULK_ACTIONS = {
+    "pause_items": partial(pause_items, paused=True),
+    "unpause_items": partial(pause_items, paused=False),
+    "cancel_items": cancel_items,
+    "pause_contracts": partial(pause_contracts, paused=True),
+    "unpause_contracts": partial(pause_contracts, paused=False),
+    "cancel_contracts": cancel_contracts,
+}
+
+
+def start_bulk_action(action, queryset, user=None):
+    """Runs the action (see `BULK_ACTIONS`) on the objects of the queryset. Selections
+    larger than `BULK_ACTION_JOB_THRESHOLD` are changed by a background job.
+    Returns the job, or the number of changed objects."""
+    from contracting import tasks
+
+    pks = list(queryset.order_by().values_list("pk", flat=True))
+    if len(pks) <= BULK_ACTION_JOB_THRESHOLD:
+        return BULK_ACTIONS[action](pks)
+    job = Job.objects.create(name=action, created_by=user)
+    transaction.on_commit(
+        lambda: tasks.bulk_action.apply_async(
+            kwargs={"job_id": str(job.pk), "action": action, "pks": pks}
+        )
+    )
+    return job
@@ -17,7 +17,6 @@ from django.db import transaction
 from django.db.models import F, OuterRef, Subquery
 from django.db.models.functions import Coalesce
 from django.utils.timezone import now
-from tqdm import tqdm
 
 from contracting.models import (
     BookingAccount,
@@ -32,6 +31,7 @@ from contracting.models import (
     Invoice,
     InvoiceItem,
 )
+from main.jobs import JobProgress
 
 
 def get_postal_address(account):
@@ -123,8 +123,9 @@ def get_address_data():
     }
 
 
-def import_accounts():
+def import_accounts(progress=None):
     """Transforms GwCbsBuchungskonto to BookingAccount objects."""
+    progress = progress or JobProgress(console=True)
     address_data = get_address_data()
     total_created = 0
     total = 0
@@ -141,7 +142,7 @@ def import_accounts():
         .filter(imported__isnull=True)
         .select_related("zustellung", "gwcbsbuchungskontosepaelv")
     )
-    for old_account in tqdm(accounts, "Buchungskonten"):
+    for old_account in progress.iterate(accounts, "Buchungskonten"):
         customer, _ = Customer.objects.get_or_create(number=old_account.kundeid)
         payment_type = type_map[old_account.zahlungsart]
         address_email = None
@@ -247,7 +248,8 @@ def import_accounts():
     return total, total_created
 
 
-def import_contracts():
+def import_contracts(progress=None):
+    progress = progress or JobProgress(console=True)
     total_created = 0
     total = 0
     billing_types = defaultdict(lambda: None)
@@ -273,7 +275,7 @@ def import_contracts():
     )
     _now = now().date()
     IMPORT_DISABLE = (2196,)
-    for old_contract in tqdm(contracts, "Verträge"):
+    for old_contract in progress.iterate(contracts, "Verträge"):
         with transaction.atomic():
             if (
                 old_contract.ausgelaufen
@@ -405,7 +407,8 @@ def import_contracts():
     return total, total_created
 
 
-def import_invoices():
+def import_invoices(progress=None):
+    progress = progress or JobProgress(console=True)
     total_created = 0
     failures = 0
 
@@ -417,13 +420,14 @@ def import_invoices():
             "gwcbsrechnungenpositionen_set__buchungskonto",
         )
     )
-    for old_invoice in tqdm(old_invoices, "Vertragsdaten"):
+    for old_invoice in progress.iterate(old_invoices, "Vertragsdaten"):
         try:
             with transaction.atomic():
                 total_created += _import_invoice(old_invoice)
         except Exception as e:
             failures += 1
             print(e)
+            progress.error(e)
     return failures, total_created
 
 
@@ -488,19 +492,28 @@ def _import_invoice(old_invoice):
     return created
 
 
-def import_all(accounts=True, contracts=True, invoices=True, delete=False):
+def import_all(
+    accounts=True, contracts=True, invoices=True, delete=False, progress=None
+):
     """Main entrypoint for the big data importer."""
+    result = {}
     if accounts:
-        total, total_created = import_accounts()
+        total, total_created = import_accounts(progress)
         print(f"Created {total_created} new accounts.")
+        result["accounts"] = total_created
 
     if contracts:
-        total, total_created = import_contracts()
+        total, total_created = import_contracts(progress)
         print(f"Created {total_created} new contracts.")
+        result["contracts"] = total_created
 
     if invoices:
-        failures, total_created = import_invoices()
+        failures, total_created = import_invoices(progress)
         print(f"Created {total_created} new invoices, failed to create {failures}")
+        result["invoices"] = total_created
+        result["failed_invoices"] = failures
+    if progress:
+        progress.result = result
 
 
 # export
@@ -1,9 +1,18 @@
+import logging
+
 import requests
 from django.conf import settings
+from django.db import transaction
 from django.utils.timezone import now
-from tqdm import tqdm
 
 from contracting.models import Customer
+from contracting.models.customer import invalidate_customer_overviews
+from contracting.utils.search import update_search_documents_on_commit
+from globalways.utils.decorators import bulk_update_with_history
+from main.jobs import JobProgress
+from main.queue import BatchConsumer
+
+logger = logging.getLogger(__name__)
 
 CRM_URL = "https://backend.globalways.net/v1/graphql"
 
@@ -39,14 +48,81 @@ def _get_data(customer_ids):
     return response.json()
 
 
-def apply_batch_data(data):
+def apply_customer_data(customer_data, merge=False):
+    """Takes a dict of customer number -> CRM data and saves it to the matching customers,
+    which are loaded in a single query and written back with one bulk update (including
+    their history). Unknown customer numbers are ignored.
+    With merge=True, the data is merged into the existing CRM data (for partial updates).
+    """
     _now = now()
-    for customer_data in tqdm(data["data"]["customer"], "Saving data"):
-        customer = Customer.objects.get(number=customer_data["customerno"])
-        customer.crm_data["synced_data"] = customer_data
+    customers = Customer.objects.in_bulk(list(customer_data), field_name="number")
+    for number, data in customer_data.items():
+        customer = customers.get(number)
+        if not customer:
+            logger.debug("Got CRM data for unknown customer %s", number)
+            continue
+        if merge:
+            data = {**customer.crm_data.get("synced_data", {}), **data}
+        # Assign a new dict, so that the change is visible to the model's change tracking
+        customer.crm_data = {**customer.crm_data, "synced_data": data}
         customer.crm_last_sync = _now
-        customer.name = customer_data["company_name"]
-        customer.save()
+        customer.name = data.get("company_name", customer.name)
+        # bulk updates skip the lifecycle hooks
+        customer.set_dirty()
+    bulk_update_with_history(
+        customers.values(),
+        ["crm_data", "crm_last_sync", "name", "easybill_sync_state"],
+    )
+    customer_pks = [customer.pk for customer in customers.values()]
+    update_search_documents_on_commit(Customer, customer_pks)
+    transaction.on_commit(lambda: invalidate_customer_overviews(pk__in=customer_pks))
+    return len(customers)
+
+
+def apply_batch_data(data):
+    apply_customer_data(
+        {
+            int(customer_data["customerno"]): customer_data
+            for customer_data in data["data"]["customer"]
+        }
+    )
+
+
+def apply_customer_events(messages):
+    """Applies a batch of messages from the customers exchange. Only the latest event per
+    customer number is applied, as every event carries the customer's current data."""
+    latest = {}
+    for message in messages:
+        if message.get("type", "").endswith(".delete"):
+            # Customers are never deleted from CCDB, they are referenced by accounts and invoices
+            continue
+        payload = message.get("payload") or {}
+        number = payload.get("customerno", payload.get("number"))
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            logger.warning(
+                "Ignoring customer event without customer number: %s", message
+            )
+            continue
+        payload = {key: value for key, value in payload.items() if key != "number"}
+        payload["customerno"] = number
+        latest.setdefault(number, {}).update(payload)
+    if not latest:
+        return 0
+    return apply_customer_data(latest, merge=True)
+
+
+class CustomerEventConsumer(BatchConsumer):
+    """Subscribes to the customers exchange and keeps our CRM data up to date."""
+
+    exchange = "customers"
+
+    def handle_batch(self, messages):
+        updated = apply_customer_events(messages)
+        logger.info(
+            "Applied %s customer events to %s customers", len(messages), updated
+        )
 
 
 def pull_batch_data(batch):
@@ -54,15 +130,19 @@ def pull_batch_data(batch):
     apply_batch_data(data)
 
 
-def pull_customer_data(customers=None, batch_size=100):
+def pull_customer_data(customers=None, batch_size=100, progress=None):
     batch_size = batch_size or 100
+    progress = progress or JobProgress()
     customers = customers or list(
         Customer.objects.all().values_list("number", flat=True)
     )
 
+    progress.phase("Pulling customer data", total=len(customers))
     i = 0
     for i in range(0, len(customers), batch_size):
         print(f"Pulling customer data, step {i + 1}")
         batch = customers[i : i + batch_size]
         if batch:
             pull_batch_data(batch)
+            progress.advance(len(batch))
+    progress.flush()
@@ -9,6 +9,8 @@ from django_lifecycle import BEFORE_UPDATE, LifecycleModel, hook
 EASYBILL_SECONDS = 6 if settings.TEST_MODE else 1  #
 EASYBILL_CACHE_KEY = "easybill_last_request"
 EASYBILL_MAX_ATTEMPTS = 10
+# A sync job is considered lost (e.g. worker restarted) after this many seconds
+EASYBILL_SYNC_JOB_TIMEOUT = 30 * 60
 
 
 def easybill_request(path, method="GET", data=None, attempt=0):
@@ -61,6 +63,12 @@ class EasybillModel(LifecycleModel):
 
     easybill_attributes = None
     easybill_url = None
+    # Sync bookkeeping, changes to these alone don't need a history entry
+    history_volatile_fields = [
+        "easybill_sync_state",
+        "easybill_data",
+        "easybill_last_sync",
+    ]
 
     class Meta:
         abstract = True
@@ -1,6 +1,6 @@
-from datetime import datetime
+import heapq
 
-from django.utils import timezone
+from django.db.models import Q
 
 
 class MultiModelHistoryIterator:
@@ -8,21 +8,48 @@ class MultiModelHistoryIterator:
     This iterator take any numbers of querysets of models which have a attribute `history_date` (like all
     history models generated by `django-simple-history`.
     On each iteration it returns the latest object until all items from all querysets are returned or the
-    max_iteration is passed
+    max_iterations is passed.
+
+    The querysets are merged with a heap, ordered by the key `(history_date, model label, history_id)`,
+    so records with the same timestamp have a stable order as well. To continue after a record (e.g. for
+    the next page), pass its `cursor_for()` key as `cursor`.
     """
 
-    # Future improvement: Add some kind of slicing and/or pagination (eg. with itertools.isslice)
-    def __init__(self, *args, max_iterations=None):
+    def __init__(self, *args, max_iterations=None, cursor=None):
         """
-        We use a dict of the iterators from the queryset together with the latest value.
-        We treat a `history_date = self.min_ts` as value for no more items in the queryset.
+        With max_iterations, no queryset needs to return more than that many rows, so they are sliced
+        accordingly. Otherwise the rows are streamed with `.iterator()`.
         """
         self.left_iterations = max_iterations
-        self.min_ts = timezone.make_aware(datetime.min, timezone.utc)
-        self.resultmap = {
-            i.order_by("-history_date").iterator(): i.model(history_date=self.min_ts)
-            for i in args
-        }
+        iterators = []
+        for queryset in args:
+            queryset = self.after(queryset, cursor).order_by(
+                "-history_date", "-history_id"
+            )
+            if max_iterations is not None:
+                queryset = queryset[:max_iterations]
+            iterators.append(queryset.iterator())
+        self.merged = heapq.merge(*iterators, key=self.cursor_for, reverse=True)
+
+    @staticmethod
+    def cursor_for(item):
+        return (item.history_date, item._meta.label, item.history_id)
+
+    @staticmethod
+    def after(queryset, cursor):
+        """Filters the queryset to the records that come after the cursor (i.e. are older)."""
+        if cursor is None:
+            return queryset
+        history_date, label, history_id = cursor
+        own_label = queryset.model._meta.label
+        if own_label < label:
+            return queryset.filter(history_date__lte=history_date)
+        if own_label > label:
+            return queryset.filter(history_date__lt=history_date)
+        return queryset.filter(
+            Q(history_date__lt=history_date)
+            | Q(history_date=history_date, history_id__lt=history_id)
+        )
 
     def __iter__(self):
         return self
@@ -31,25 +58,7 @@ class MultiModelHistoryIterator:
         if self.left_iterations is not None and self.left_iterations <= 0:
             raise StopIteration
 
-        # We try to fill the dict with the last values
-        for queryset_iterator, item in self.resultmap.items():
-            if item.history_date == self.min_ts:
-                self.resultmap[queryset_iterator] = next(queryset_iterator, item)
-
-        # If all values are equal to our None value there are no more items to return
-        if all(i.history_date == self.min_ts for i in self.resultmap.values()):
-            raise StopIteration
-
-        # From out latest values we chose the newest one, remove it from the datastructure and return it
-        latest_item = max(self.resultmap.values(), key=lambda x: x.history_date)
-        self.resultmap = {
-            queryset_iterator: (
-                item
-                if item != latest_item
-                else item._meta.model(history_date=self.min_ts)
-            )
-            for queryset_iterator, item in self.resultmap.items()
-        }
+        item = next(self.merged)
         if self.left_iterations is not None:
             self.left_iterations -= 1
-        return latest_item
+        return item
@@ -6,9 +6,9 @@ from dateutil.relativedelta import relativedelta
 from django.db import transaction
 from django.db.models import Q
 from django.utils.timezone import now
-from tqdm import tqdm
 
 from contracting.models import BookingAccount, ContractItem, Invoice, InvoiceItem
+from main.jobs import JobProgress
 from main.models import LogEntry, LogLevels
 
 
@@ -56,8 +56,9 @@ def get_month_amount(start, end):
     return total_amount
 
 
-def run_invoicing(_timestamp=None, dry_run=False, console_output=False):
+def run_invoicing(_timestamp=None, dry_run=False, console_output=False, progress=None):
     """_timestamp will only be used with dry_run=True!"""
+    progress = progress or JobProgress(console=True)
     # Step 1: find all contract items that are due a new invoice
     timestamp = _timestamp if (_timestamp and dry_run) else now().date()
     if not dry_run:
@@ -91,7 +92,7 @@ def run_invoicing(_timestamp=None, dry_run=False, console_output=False):
     # Step 2: validate items and sort into groups
     item_groups = defaultdict(list)
 
-    for item in tqdm(contract_items, "Sorting"):
+    for item in progress.iterate(contract_items, "Sorting"):
         billing_start = item.last_invoice_override
         if not billing_start:
             last_invoice = item.invoice_items.all().order_by("-invoice__date").first()
@@ -118,7 +119,7 @@ def run_invoicing(_timestamp=None, dry_run=False, console_output=False):
     email_deliveries = 0
     post_deliveries = 0
     sepa_invoices = 0
-    for key, items in tqdm(item_groups.items(), "Invoicing"):
+    for key, items in progress.iterate(item_groups.items(), "Invoicing"):
         # TODO put this in a separate celery task
         account = key[0]
         i, p = create_new_invoice(
@@ -138,6 +139,7 @@ def run_invoicing(_timestamp=None, dry_run=False, console_output=False):
             post_deliveries += 1
         if account.payment_type == account.Types.SEPA:
             sepa_invoices += 1
+    progress.result = {"invoices": invoice_count, "positions": position_count}
     if dry_run:
         print(
             f"Would have created {invoice_count} invoices with {position_count} positions."
@@ -250,7 +252,8 @@ def create_new_invoice(
     return 1, len(invoice_lines)
 
 
-def easybill_sync_invoices(queryset=None):
+def easybill_sync_invoices(queryset=None, progress=None):
+    progress = progress or JobProgress()
     if not queryset:
         queryset = Invoice.objects.filter(number__isnull=True)
 
@@ -261,12 +264,14 @@ def easybill_sync_invoices(queryset=None):
     )
     success = 0
     fails = 0
-    for invoice in queryset:
+    for invoice in progress.iterate(queryset, "easybill sync"):
         try:
             invoice.easybill_sync()
             success += 1
-        except Exception:
+        except Exception as e:
             fails += 1
+            progress.error(f"Invoice ID {invoice.id}: {e}")
+    progress.result = {"synced": success, "failed": fails}
 
     LogEntry.objects.create(
         log_level=LogLevels.INFO,
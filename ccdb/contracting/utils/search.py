@@ -0,0 +1,113 @@
+import threading
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import models, transaction
+from django.db.models import Q
+from django_lifecycle import AFTER_SAVE, LifecycleModel, hook
+
+# Objects whose search documents are rebuilt together
+SEARCH_DOCUMENT_BATCH_SIZE = 1000
+
+_pending = threading.local()
+
+
+def update_search_documents_on_commit(model, pks=(), **lookup):
+    """Rebuilds the search documents of the given objects of the model (or the ones
+    matching the lookup) once the transaction is committed. All updates requested in a
+    transaction (e.g. an invoicing run) are done together, in a few queries."""
+    if getattr(_pending, "pks", None) is None:
+        _pending.pks = defaultdict(set)
+        _pending.lookups = defaultdict(list)
+    _pending.pks[model].update(pk for pk in pks if pk is not None)
+    if lookup:
+        _pending.lookups[model].append(Q(**lookup))
+    # Only the first callback of a transaction finds anything to do
+    transaction.on_commit(_update_pending_search_documents)
+
+
+def _update_pending_search_documents():
+    pending_pks = getattr(_pending, "pks", None) or {}
+    pending_lookups = getattr(_pending, "lookups", None) or {}
+    _pending.pks = _pending.lookups = None
+    for model in {*pending_pks, *pending_lookups}:
+        pks = set(pending_pks.get(model, ()))
+        if pending_lookups.get(model):
+            pks.update(
+                model._base_manager.filter(
+                    reduce(or_, pending_lookups[model])
+                ).values_list("pk", flat=True)
+            )
+        model.update_search_documents(pks)
+
+
+def build_search_documents(model, fields, pks):
+    """pk -> search document made of the values of the fields, for the given pks."""
+    documents = defaultdict(dict)
+    rows = model._base_manager.filter(pk__in=pks).order_by().values_list("pk", *fields)
+    for pk, *values in rows:
+        words = documents[pk]
+        for value in values:
+            if value is not None and value != "":
+                # A dict keeps the order and drops duplicates
+                words[str(value).lower()] = None
+    return {pk: " ".join(words) for pk, words in documents.items()}
+
+
+def update_search_documents(model, fields, pks=None):
+    """Stores the search documents of the objects of the model (a historical model in
+    migrations as well) with the given pks, of all objects without."""
+    if pks is None:
+        pks = model._base_manager.order_by("pk").values_list("pk", flat=True)
+    pks = list(pks)
+    for start in range(0, len(pks), SEARCH_DOCUMENT_BATCH_SIZE):
+        batch = pks[start : start + SEARCH_DOCUMENT_BATCH_SIZE]
+        documents = build_search_documents(model, fields, batch)
+        model._base_manager.bulk_update(
+            [
+                model(pk=pk, search_document=document)
+                for pk, document in documents.items()
+            ],
+            ["search_document"],
+        )
+    return len(pks)
+
+
+class SearchDocumentModel(LifecycleModel):
+    """Keeps the lowercased values of `search_document_fields` (lookups like the admin's
+    search_fields, across relations as well) in `search_document`. It has a trigram index
+    on PostgreSQL, so `search` finds objects by parts of any of the values without joins.
+
+    The document is rebuilt after every save. Models whose values are part of the
+    documents of other models rebuild them with `update_search_documents_on_commit`.
+    """
+
+    search_document_fields = ()
+    history_excluded_fields = ["search_document"]
+
+    search_document = models.TextField(default="", blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def search(cls, queryset, term):
+        """The objects of the queryset containing all words of the term."""
+        for word in term.lower().split():
+            queryset = queryset.filter(search_document__contains=word)
+        return queryset
+
+    @classmethod
+    def build_search_documents(cls, pks):
+        return build_search_documents(cls, cls.search_document_fields, pks)
+
+    @classmethod
+    def update_search_documents(cls, pks=None):
+        """Rebuilds the documents of the objects with the given pks, of all objects
+        without. Returns the number of objects."""
+        return update_search_documents(cls, cls.search_document_fields, pks)
+
+    @hook(AFTER_SAVE)
+    def update_search_document(self):
+        update_search_documents_on_commit(type(self), [self.pk])
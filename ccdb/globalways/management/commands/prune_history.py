@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from globalways.utils.decorators import historified_models, volatile_fields
+
+
+def _redundant_records(model, batch_size):
+    """Yields the history ids of update records that differ from the object's previous
+    record only in volatile fields."""
+    excluded = volatile_fields(model) | set(
+        getattr(model, "history_excluded_fields", ())
+    )
+    compared = [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.name not in excluded
+    ]
+    pk = model._meta.pk.attname
+    records = (
+        model.history.order_by(pk, "history_date", "history_id")
+        .values("history_id", "history_type", *compared)
+        .iterator(chunk_size=batch_size)
+    )
+    previous = None
+    for record in records:
+        if (
+            record["history_type"] == "~"
+            and previous is not None
+            and previous[pk] == record[pk]
+            and all(previous[name] == record[name] for name in compared)
+        ):
+            yield record["history_id"]
+        previous = record
+
+
+class Command(BaseCommand):
+    help = "Delete history entries that only record changes of volatile technical fields (like the easybill sync state)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            help="Only prune these models (app_label.Model), default: all historified models",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Don't delete anything, just count the entries",
+        )
+
+    def handle(self, *args, **options):
+        models = {model._meta.label_lower: model for model in historified_models}
+        labels = [label.lower() for label in options["models"]] or list(models)
+        for label in labels:
+            if label not in models:
+                raise CommandError(f"{label} is not a historified model")
+
+        batch_size = options["batch_size"]
+        for label in labels:
+            model = models[label]
+            # Collect first, deleting while the records are streamed would shift the batches
+            history_ids = list(_redundant_records(model, batch_size))
+            if not options["dry_run"]:
+                for i in range(0, len(history_ids), batch_size):
+                    model.history.filter(
+                        history_id__in=history_ids[i : i + batch_size]
+                    ).delete()
+            self.stdout.write(
+                f"{label}: {len(history_ids)} redundant history entries"
+                + (" (dry run)" if options["dry_run"] else " deleted")
+            )
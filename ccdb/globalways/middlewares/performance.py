@@ -0,0 +1,123 @@
+import logging
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """Execute wrapper (see `connection.execute_wrapper`) collecting the count and time of
+    the queries, grouped by their SQL (without parameters)."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.statements = defaultdict(lambda: [0, 0])
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            statement = self.statements[sql]
+            statement[0] += 1
+            statement[1] += duration
+
+    def repeated(self, limit):
+        """The statements executed more than once, most frequent first."""
+        statements = sorted(
+            self.statements.items(), key=lambda item: item[1][0], reverse=True
+        )
+        return [
+            (sql, n, duration) for sql, (n, duration) in statements[:limit] if n > 1
+        ]
+
+
+class ServerTimingMiddleware:
+    """Measures the requests to `PERFORMANCE_PATH_PREFIX` and reports the timings in a
+    `Server-Timing` header (shown by the browser's developer tools):
+
+    * db: count and time of the queries
+    * view: time in the view (serialization for the API) without the queries
+    * render: time to render the response (e.g. to JSON)
+    * total: time in the middlewares below this one, the view and rendering
+
+    Requests slower than `PERFORMANCE_SLOW_REQUEST_MS` or with more queries than
+    `PERFORMANCE_SLOW_REQUEST_QUERIES` are logged with their most repeated SQL, which
+    points to N+1 queries. Only active with `PERFORMANCE_MONITORING`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_MONITORING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(settings.PERFORMANCE_PATH_PREFIX):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._performance_timings = timings = {}
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        view = timings.get("view")
+        if view is not None:
+            # Queries while rendering are possible (e.g. lazy querysets), but rare
+            timings["view"] = max(view - recorder.duration, 0)
+        metrics = [
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+        ]
+        metrics += [f"{name};dur={value * 1000:.1f}" for name, value in timings.items()]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        response["Server-Timing"] = ", ".join(metrics)
+
+        if (
+            total * 1000 > settings.PERFORMANCE_SLOW_REQUEST_MS
+            or recorder.count > settings.PERFORMANCE_SLOW_REQUEST_QUERIES
+        ):
+            self.log_slow_request(request, response, total, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, "_performance_timings"):
+            request._performance_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called after the view, right before the response is rendered
+        timings = getattr(request, "_performance_timings", None)
+        if timings is None or not hasattr(request, "_performance_start"):
+            return response
+        render_start = time.perf_counter()
+        timings["view"] = render_start - request._performance_start
+
+        def rendered(response):
+            timings["render"] = time.perf_counter() - render_start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def log_slow_request(request, response, total, recorder):
+        lines = [
+            f"Slow request {request.method} {request.get_full_path()} "
+            f"({response.status_code}): {total * 1000:.0f} ms, "
+            f"{recorder.count} queries in {recorder.duration * 1000:.0f} ms"
+        ]
+        for sql, count, duration in recorder.repeated(
+            settings.PERFORMANCE_REPEATED_QUERIES
+        ):
+            lines.append(f"  {count}x in {duration * 1000:.0f} ms: {sql}")
+        logger.warning("\n".join(lines))
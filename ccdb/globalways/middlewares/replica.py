@@ -0,0 +1,70 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from globalways.routers import read_replica
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PIN_COOKIE = "ccdb_primary"
+
+
+def read_from_primary(view):
+    """Answers a view (function, view class or viewset action) from the primary, for views
+    whose responses must not lag behind, e.g. because they are cached."""
+    view.read_replica_safe = False
+    return view
+
+
+def is_read_replica_safe(request, view_func):
+    """False for views marked with `read_from_primary` and for delta syncs
+    (`?modified_since`, see ModifiedSinceMixin): their `sync_timestamp` comes from the
+    clock, changes the replica hasn't received by then would never be synced."""
+    if "modified_since" in request.GET:
+        return False
+    cls = getattr(view_func, "cls", None)
+    action = (getattr(view_func, "actions", None) or {}).get(request.method.lower())
+    views = (view_func, cls, getattr(cls, action, None) if action else None)
+    return all(getattr(view, "read_replica_safe", True) for view in views)
+
+
+class ReadReplicaMiddleware:
+    """Answers safe requests to `READ_REPLICA_PATH_PREFIX` (the API) from the read replica,
+    see `ReplicaRouter`, unless the view isn't `is_read_replica_safe`.
+
+    Other requests may write, their responses set a cookie that sends the reads of the
+    same client to the primary for `READ_REPLICA_PIN_SECONDS` (read-your-writes), longer
+    than the replica is expected to lag behind. Clients without cookies may see their
+    writes with that delay. Only active with `READ_REPLICA_DATABASE`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.READ_REPLICA_DATABASE:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.READ_REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+            return response
+
+        if PIN_COOKIE in request.COOKIES or not request.path.startswith(
+            settings.READ_REPLICA_PATH_PREFIX
+        ):
+            return self.get_response(request)
+        # Entered by process_view, once the view is known
+        with ExitStack() as request.read_replica:
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stack = getattr(request, "read_replica", None)
+        if stack is not None and is_read_replica_safe(request, view_func):
+            stack.enter_context(read_replica())
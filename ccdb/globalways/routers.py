@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_use_replica = ContextVar("use_replica", default=False)
+
+
+@contextmanager
+def read_replica():
+    """Reads inside the block go to `READ_REPLICA_DATABASE` (if configured), until the
+    first write. For read-only work like reports, which may lag behind the primary."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Sends the reads inside `read_replica` blocks to the replica, everything else to the
+    primary. After a write, the following reads of the block go to the primary as well,
+    so they see it (the replica might not have it yet)."""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and settings.READ_REPLICA_DATABASE:
+            return settings.READ_REPLICA_DATABASE
+        # Explicitly, objects loaded from the replica would keep reading from it
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _use_replica.set(False)
+        # Explicitly, saving objects loaded from the replica would write to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same data
+        databases = {DEFAULT_DB_ALIAS, settings.READ_REPLICA_DATABASE}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica follows the migrations of the primary
+        if db == settings.READ_REPLICA_DATABASE:
+            return False
+        return None
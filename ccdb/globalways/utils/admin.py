@@ -0,0 +1,147 @@
+import json
+
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+from django.utils.html import format_html_join
+
+# Results the planner expects to be smaller than this are counted exactly
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """The planner's estimate of the number of rows of the queryset, without reading them.
+    None on databases other than PostgreSQL."""
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def page_links(queryset, per_page, param):
+    """Links to the pages of the queryset (e.g. the `<prefix>_page` of a
+    `PaginatedInlineFormSet`), empty if there is only one."""
+    paginator = Paginator(queryset, per_page)
+    if paginator.num_pages < 2:
+        return ""
+    return format_html_join(
+        " ", '<a href="?{}={}">{}</a>', ((param, n, n) for n in paginator.page_range)
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """Uses the planner's estimate instead of a `COUNT(*)`, which reads the whole table,
+    for large results. The number of pages of those is approximate.
+
+    Use it with `show_full_result_count = False`, or the admin counts the table anyway.
+    """
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "explain"):
+            return super().count
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Takes the labels of the selected objects from `labels` (pk -> label, set by
+    `PaginatedInlineFormSet` for all its forms at once) instead of querying them for each
+    widget. Falls back to the query for values without a label."""
+
+    labels = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = [
+            str(v) for v in value if str(v) not in self.choices.field.empty_values
+        ]
+        if self.labels is None or not all(v in self.labels for v in selected):
+            return super().optgroups(name, value, attr)
+        default = (None, [], 0)
+        if not self.is_required:
+            default[1].append(self.create_option(name, "", "", False, 0))
+        for option_value in selected:
+            default[1].append(
+                self.create_option(
+                    name,
+                    option_value,
+                    self.labels[option_value],
+                    True,
+                    len(default[1]),
+                )
+            )
+        return [default]
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Shows, validates and saves one page of the related objects. The page is selected
+    with the `<prefix>_page` query parameter, which stays in the URL the form posts to.
+    """
+
+    per_page = 50
+    page_number = 1
+
+    @classmethod
+    def page_param(cls):
+        return f"{cls.get_default_prefix()}_page"
+
+    def get_queryset(self):
+        if not hasattr(self, "page"):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.page_number)
+            self.page.object_list = list(self.page.object_list)
+        return self.page.object_list
+
+    @cached_property
+    def forms(self):
+        forms = super().forms
+        for name, labels in self.autocomplete_labels.items():
+            for form in forms:
+                widget = form.fields[name].widget
+                getattr(widget, "widget", widget).labels = labels
+        return forms
+
+    @cached_property
+    def autocomplete_labels(self):
+        """The labels of the objects selected in the `PreloadedAutocompleteSelect` fields
+        of the page, one query per field."""
+        labels = {}
+        for name, field in self.form.base_fields.items():
+            widget = getattr(field.widget, "widget", field.widget)
+            if not isinstance(widget, PreloadedAutocompleteSelect):
+                continue
+            attname = self.model._meta.get_field(name).attname
+            pks = {getattr(obj, attname) for obj in self.get_queryset()} - {None}
+            labels[name] = {
+                str(obj.pk): field.label_from_instance(obj)
+                for obj in field.queryset.filter(pk__in=pks)
+            }
+        return labels
+
+
+class PaginatedInlineMixin:
+    """For inlines with many objects: shows them in pages of `per_page` (see
+    `PaginatedInlineFormSet`), and loads the labels of their autocomplete fields together.
+    """
+
+    formset = PaginatedInlineFormSet
+    per_page = 50
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if "widget" not in kwargs and db_field.name in self.get_autocomplete_fields(
+            request
+        ):
+            kwargs["widget"] = PreloadedAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get("using")
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_number = request.GET.get(formset.page_param(), 1)
+        return formset
@@ -1,16 +1,29 @@
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from collections.abc import Hashable
 
 from celery.utils.log import get_task_logger
+from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models.fields.related_descriptors import (
-    ForwardManyToOneDescriptor,
-    ManyToManyDescriptor,
-)
+from django.db.models.fields.related_descriptors import ManyToManyDescriptor
+from django.db.models.signals import post_init, pre_save
+from django.utils.timezone import now
+from django_lifecycle import LifecycleModelMixin
 from simple_history import register
-from simple_history.utils import update_change_reason
 
-__all__ = ["historify"]
+__all__ = [
+    "historify",
+    "bulk_create_with_history",
+    "bulk_update_with_history",
+    "update_with_history",
+]
+
+BULK_BATCH_SIZE = 500
+
+# Technical fields that never justify a history entry on their own, see `historify`
+ALWAYS_VOLATILE_FIELDS = frozenset(["modified", "modified_by"])
+
+# All models decorated with historify
+historified_models = []
 
 logger = get_task_logger(__name__)
 
@@ -62,64 +75,225 @@ def _history_diff(diff):
     return "; ".join(changes)
 
 
+def _snapshot(instance):
+    return {
+        field.attname: instance.__dict__[field.attname]
+        for field in instance._meta.concrete_fields
+        if field.attname in instance.__dict__
+    }
+
+
+def _initial_field_state(instance):
+    """The field values the instance was loaded with, or saved with last.
+    LifecycleModel already keeps this snapshot, other models get it from `_remember_state`.
+    """
+    state = instance.__dict__.get("_history_state")
+    if state is None:
+        initial_state = instance.__dict__.get("_initial_state")
+        state = initial_state.initial_state if initial_state is not None else {}
+    return state
+
+
+def _remember_state(sender, instance, **kwargs):
+    instance._history_state = _snapshot(instance)
+
+
+def _normalize(field, value):
+    try:
+        return field.to_python(value)
+    except ValidationError:
+        return value
+
+
+def _field_changes(instance, fields=None):
+    state = _initial_field_state(instance)
+    changes = []
+    for field in instance._meta.concrete_fields:
+        if fields is not None and field.name not in fields:
+            continue
+        if field.attname not in state or field.attname not in instance.__dict__:
+            continue  # deferred
+        old = _normalize(field, state[field.attname])
+        new = _normalize(field, instance.__dict__[field.attname])
+        if old != new:
+            changes.append((field, old, new))
+    return changes
+
+
+def volatile_fields(model):
+    return ALWAYS_VOLATILE_FIELDS | set(getattr(model, "history_volatile_fields", ()))
+
+
+def _only_volatile(instance, changes):
+    """Whether all changes are in volatile fields, also True without changes."""
+    volatile = volatile_fields(type(instance))
+    return all(field.name in volatile for field, old, new in changes)
+
+
+def _database_changes(instance, update_fields=None):
+    """Changes of the fields that are neither volatile nor excluded from the history
+    compared to the database row, i.e. what saving a stale instance would revert.
+    Costs one query."""
+    model = type(instance)
+    ignored = volatile_fields(model) | set(
+        getattr(model, "history_excluded_fields", ())
+    )
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if field.name not in ignored
+        and not field.primary_key
+        and field.attname in instance.__dict__
+        and (update_fields is None or field.name in update_fields)
+    ]
+    if not fields:
+        return []
+    row = (
+        model._base_manager.filter(pk=instance.pk)
+        .values(*(field.attname for field in fields))
+        .first()
+    )
+    if row is None:
+        return []
+    changes = []
+    for field in fields:
+        old = _normalize(field, row[field.attname])
+        new = _normalize(field, instance.__dict__[field.attname])
+        if old != new:
+            changes.append((field, old, new))
+    return changes
+
+
+def _named_changes(changes):
+    """Leaves out changes of relations to models without names (e.g. modified_by)."""
+    return [
+        change
+        for change in changes
+        if not change[0].is_relation or hasattr(change[0].related_model, "get_name")
+    ]
+
+
+def _related_names(changed):
+    """The names of the old and new related objects of the foreign key changes of
+    `changed`, pairs of instance and changes, as (model label, pk) -> name.
+    Related objects already loaded on the instances are used as they are, everything else
+    is fetched with one query per related model. The names are loaded for every save (or
+    bulk call), they may have been changed by another process."""
+    names = {}
+    missing = defaultdict(set)
+    for instance, changes in changed:
+        for field, old, new in changes:
+            if not field.is_relation:
+                continue
+            related = field.get_cached_value(instance, None)
+            if related is not None and related.pk == new:
+                names[(related._meta.label, related.pk)] = related.get_name()
+            for pk in (old, new):
+                if pk is not None:
+                    missing[field.related_model].add(pk)
+    for model, pks in missing.items():
+        pks = {pk for pk in pks if (model._meta.label, pk) not in names}
+        if pks:
+            for obj in model._base_manager.in_bulk(pks).values():
+                names[(model._meta.label, obj.pk)] = obj.get_name()
+    return names
+
+
+def _render_changes(changes, names):
+    """Replaces the primary keys of changed foreign keys by the related objects' names."""
+    diff = []
+    for field, old, new in changes:
+        if field.is_relation:
+            label = field.related_model._meta.label
+            old = names.get((label, old), "-")
+            new = names.get((label, new), "-")
+        diff.append(Change(field.name, old, new))
+    return diff
+
+
 def historify(cls):
-    register(cls, app=cls._meta.app_label)
+    """Registers the model with simple_history and writes a change reason with every update.
+
+    The change reason is computed from the field values the instance was loaded with, so
+    apart from the history INSERT no further queries are needed (changed foreign keys need
+    one for the names of the related objects that are not loaded). Note that JSON values
+    changed in place can't be detected this way, assign a new value instead.
+    Pass `write_history_entry=False` to `save()` to skip the history entry.
+
+    Saves that only change technical fields listed in the model's `history_volatile_fields`
+    (and `modified`/`modified_by`) don't write a history entry at all, unless the other
+    fields differ from the database row (a stale instance), which costs a query. Fields
+    listed in `history_excluded_fields` are not part of the history."""
+    register(
+        cls,
+        app=cls._meta.app_label,
+        excluded_fields=list(getattr(cls, "history_excluded_fields", ())),
+    )
+    historified_models.append(cls)
     old_save = cls.save
+    old_refresh_from_db = cls.refresh_from_db
     differ = getattr(cls, "_history_diff", _history_diff)
 
+    def set_change_reason(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or instance._state.adding:
+            instance.__dict__.pop("_change_reason", None)
+            return
+        if hasattr(instance, "skip_history_when_saving"):
+            return
+        changes = _field_changes(instance)
+        if _only_volatile(instance, changes):
+            # Without changes in memory the save may still overwrite changes made by
+            # other processes since the instance was loaded
+            stale = _database_changes(instance, update_fields)
+            if not stale:
+                instance.skip_history_when_saving = True
+                instance._history_skipped = True
+                return
+            changes = stale + changes
+        changes = _named_changes(changes)
+        names = _related_names([(instance, changes)])
+        # varchar(100)
+        instance._change_reason = differ(_render_changes(changes, names))[:100]
+
     def save(self, **kwargs):
+        write_history_entry = kwargs.pop("write_history_entry", True)
         with transaction.atomic():
-            write_history_entry = kwargs.pop("write_history_entry", True)
-
-            res = old_save(self, **kwargs)
-
-            if write_history_entry:
-                now = self.history.first()
-                before = now.prev_record
-
-                if before:
-                    changes = now.diff_against(before).changes
-                    diff = []
-                    for change in changes:
-                        if isinstance(
-                            getattr(cls, change.field), ForwardManyToOneDescriptor
-                        ):
-                            foreign = getattr(cls, change.field).get_queryset().first()
-                            if not foreign:
-                                diff.append(change)
-                            else:
-                                Foreign = foreign.__class__
-                                new = Foreign.objects.filter(pk=change.new).first()
-                                old = Foreign.objects.filter(pk=change.old).first()
-                                if not (
-                                    hasattr(old, "get_name")
-                                    and hasattr(new, "get_name")
-                                ):
-                                    continue
-                                diff.append(
-                                    Change(
-                                        change.field,
-                                        old.get_name() if old else "-",
-                                        new.get_name() if new else "-",
-                                    )
-                                )
-                        else:
-                            diff.append(change)
-                    update_change_reason(self, differ(diff)[:100])  # varchar(100)
-
-            else:
-                self.history.first().delete()
-
+            if not write_history_entry:
+                self.skip_history_when_saving = True
+            try:
+                res = old_save(self, **kwargs)
+            finally:
+                if not write_history_entry:
+                    del self.skip_history_when_saving
+                elif self.__dict__.pop("_history_skipped", False):
+                    del self.skip_history_when_saving
+            self._history_state = _snapshot(self)
             return res
 
+    def refresh_from_db(self, *args, **kwargs):
+        self.__dict__.pop("_history_state", None)
+        old_refresh_from_db(self, *args, **kwargs)
+        if not isinstance(self, LifecycleModelMixin):
+            self._history_state = _snapshot(self)
+
     @property
     def _history_user(self):
         return self.modified_by
 
     cls.save = save
+    cls.refresh_from_db = refresh_from_db
     if not hasattr(cls, "_history_user"):
         cls._history_user = _history_user
 
+    dispatch_uid = f"historify-{cls._meta.label}"
+    pre_save.connect(
+        set_change_reason, sender=cls, weak=False, dispatch_uid=dispatch_uid
+    )
+    if not issubclass(cls, LifecycleModelMixin):
+        post_init.connect(
+            _remember_state, sender=cls, weak=False, dispatch_uid=dispatch_uid
+        )
+
     # m2m:
     for name in dir(cls):
         attr = getattr(cls, name)
@@ -149,3 +323,126 @@ def historify(cls):
     #         receiver(m2m_changed, sender=attr.through, weak=False)(partial(handle_m2m, name))
 
     return cls
+
+
+def _has_field(model, name):
+    return any(field.name == name for field in model._meta.concrete_fields)
+
+
+def _load_history_users(model, objs):
+    """historify uses modified_by as history user, load them all at once instead of one by one."""
+    field = model._meta.get_field("modified_by")
+    missing = {
+        obj.modified_by_id
+        for obj in objs
+        if obj.modified_by_id and not field.is_cached(obj)
+    }
+    users = field.related_model._base_manager.in_bulk(missing) if missing else {}
+    for obj in objs:
+        if obj.modified_by_id and not field.is_cached(obj):
+            field.set_cached_value(obj, users.get(obj.modified_by_id))
+
+
+def _reset_history_state(objs):
+    for obj in objs:
+        obj._history_state = _snapshot(obj)
+        if isinstance(obj, LifecycleModelMixin):
+            obj._reset_initial_state()
+
+
+def _bulk_history_create(model, objs, fields=None, batch_size=None):
+    if hasattr(model, "history"):
+        differ = getattr(model, "_history_diff", _history_diff)
+        changed = []
+        for obj in objs:
+            changes = _field_changes(obj, fields)
+            if not _only_volatile(obj, changes):
+                changed.append((obj, _named_changes(changes)))
+        # One query per related model for all objects
+        names = _related_names(changed)
+        records = []
+        for obj, changes in changed:
+            obj._change_reason = differ(_render_changes(changes, names))[:100]
+            records.append(obj)
+        if records and _has_field(model, "modified_by"):
+            _load_history_users(model, records)
+        if records:
+            model.history.bulk_history_create(
+                records, batch_size=batch_size or BULK_BATCH_SIZE, update=True
+            )
+    _reset_history_state(objs)
+
+
+def bulk_create_with_history(objs, batch_size=None):
+    """Inserts the objects with `bulk_create` and writes their creation history records with
+    another one. The database needs to return the primary keys of inserted rows (PostgreSQL,
+    SQLite 3.35+). Like `bulk_create`, this does not call `save()`."""
+    objs = list(objs)
+    if not objs:
+        return objs
+    model = type(objs[0])
+    batch_size = batch_size or BULK_BATCH_SIZE
+    with transaction.atomic():
+        model._base_manager.bulk_create(objs, batch_size=batch_size)
+        if hasattr(model, "history"):
+            if _has_field(model, "modified_by"):
+                _load_history_users(model, objs)
+            model.history.bulk_history_create(objs, batch_size=batch_size)
+    _reset_history_state(objs)
+    return objs
+
+
+def bulk_update_with_history(objs, fields, batch_size=None):
+    """Saves the given fields of objects changed in memory with `bulk_update`, and writes
+    the history records of all changed objects with one `bulk_create`.
+
+    Like `bulk_update`, this does not call `save()`, so neither validation nor lifecycle
+    hooks are run. Returns the number of changed objects."""
+    objs = list(objs)
+    if not objs:
+        return 0
+    model = type(objs[0])
+    fields = list(fields)
+    changed = [obj for obj in objs if _field_changes(obj, fields)]
+    if not changed:
+        return 0
+    if _has_field(model, "modified") and "modified" not in fields:
+        _now = now()
+        for obj in changed:
+            obj.modified = _now
+        fields.append("modified")
+    with transaction.atomic():
+        model._base_manager.bulk_update(
+            changed, fields, batch_size=batch_size or BULK_BATCH_SIZE
+        )
+        _bulk_history_create(model, changed, fields, batch_size)
+    return len(changed)
+
+
+def update_with_history(queryset, **changes):
+    """Like `queryset.update(**changes)`, but keeps the audit trail: the affected rows are
+    loaded (and locked) once, rows that already have the new values are left alone, and the
+    history records with change reasons are written with one `bulk_create`.
+
+    Only plain values are supported, no F() expressions. Like `update()`, this does not call
+    `save()`, so neither validation nor lifecycle hooks are run.
+    Returns the number of changed objects."""
+    model = queryset.model
+    fields = list(changes)
+    if _has_field(model, "modified"):
+        changes.setdefault("modified", now())
+    with transaction.atomic():
+        if _has_field(model, "modified_by"):
+            queryset = queryset.select_related("modified_by")
+        objs = list(queryset.select_for_update(of=("self",)))
+        for obj in objs:
+            for field, value in changes.items():
+                setattr(obj, field, value)
+        changed = [obj for obj in objs if _field_changes(obj, fields)]
+        pks = [obj.pk for obj in changed]
+        for i in range(0, len(pks), BULK_BATCH_SIZE):
+            model._base_manager.filter(pk__in=pks[i : i + BULK_BATCH_SIZE]).update(
+                **changes
+            )
+        _bulk_history_create(model, changed, fields)
+    return len(changed)
@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.utils.html import format_html
 
-from main.models import LogEntry
+from api.authentication import ApiKeyAuthentication
+from globalways.utils.admin import EstimatedCountPaginator
+from main.models import ApiKey, Job, LogEntry
 
 
 @admin.register(LogEntry)
@@ -11,9 +14,93 @@ class LogEntryAdmin(admin.ModelAdmin):
     list_editable = []
     list_filter = ["created", "log_level"]
     readonly_fields = [f.name for f in LogEntry._meta.fields]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def has_add_permission(self, request, obj=None):
         return False
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(ApiKey)
+class ApiKeyAdmin(admin.ModelAdmin):
+    """Keys are created with `manage.py create_api_key`, the key is only shown once."""
+
+    list_display = ["name", "prefix", "user", "is_active", "created"]
+    list_filter = ["is_active"]
+    search_fields = ["name", "prefix", "user__username"]
+    readonly_fields = ["prefix", "user", "created", "modified"]
+    fields = ["name", "prefix", "user", "is_active", "created", "modified"]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # At least this process stops accepting a deactivated key right away
+        ApiKeyAuthentication.clear_cache()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        ApiKeyAuthentication.clear_cache()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        ApiKeyAuthentication.clear_cache()
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["name", "state", "phase", "progress", "eta", "created", "finished"]
+    list_filter = ["state", "name"]
+    search_fields = ["name", "object_id"]
+    fields = [
+        "name",
+        "state",
+        "progress",
+        "phase",
+        "phase_started",
+        "throughput",
+        "eta",
+        "content_type",
+        "object_id",
+        "created_by",
+        "created",
+        "started",
+        "finished",
+        "result",
+        "error",
+        "error_count",
+        "errors",
+    ]
+    readonly_fields = fields
+
+    class Media:
+        js = ["js/job_progress.js"]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Progress")
+    def progress(self, obj):
+        text = f"{obj.processed} / {obj.total}" if obj.total else str(obj.processed)
+        if obj.percent is not None:
+            text += f" ({obj.percent} %)"
+        if obj.error_count:
+            text += f", {obj.error_count} errors"
+        # job_progress.js reloads the page while a job is running
+        css_class = "job-done" if obj.is_finished else "job-running"
+        return format_html('<span class="{}">{}</span>', css_class, text)
+
+    @admin.display(description="Entries per second")
+    def throughput(self, obj):
+        return obj.throughput
+
+    @admin.display(description="ETA")
+    def eta(self, obj):
+        return obj.eta
@@ -0,0 +1,108 @@
+"""Progress tracking for long-running operations, see `Job`.
+
+    with run_job("run_invoicing", job_id) as progress:
+        for item in progress.iterate(items, "Invoicing"):
+            ...
+"""
+
+import time
+from contextlib import contextmanager
+
+from django.utils.timezone import now
+from tqdm import tqdm
+
+from main.models import Job
+
+# Seconds between two progress writes of a job
+JOB_PROGRESS_INTERVAL = 2
+# Errors stored with a job, the others are only counted
+MAX_JOB_ERRORS = 100
+
+
+class JobProgress:
+    """Records the progress of a job: the phase, processed and total entries, and errors.
+
+    Changes are written with a single UPDATE at most every `JOB_PROGRESS_INTERVAL`
+    seconds, and at the end of every phase. Inside a transaction, the progress is only
+    visible once it's committed. Without a job, nothing is written, and with `console`
+    the phases are shown with tqdm like before.
+    """
+
+    def __init__(self, job=None, console=False):
+        self.job = job
+        self.console = console
+        self.result = None
+        self.last_write = 0
+
+    def phase(self, name, total=None):
+        if self.job is None:
+            return
+        self.job.phase = name
+        self.job.phase_started = now()
+        self.job.processed = 0
+        self.job.total = total
+        self.flush()
+
+    def advance(self, count=1):
+        if self.job is None:
+            return
+        self.job.processed += count
+        self.flush(force=False)
+
+    def error(self, message):
+        if self.job is None:
+            return
+        self.job.error_count += 1
+        if len(self.job.errors) < MAX_JOB_ERRORS:
+            self.job.errors.append(str(message))
+        self.flush(force=False)
+
+    def iterate(self, iterable, phase, total=None):
+        """Yields the entries of the iterable as a new phase, advancing after each one.
+        Like tqdm, sized iterables (e.g. querysets) are evaluated for the total."""
+        if total is None and hasattr(iterable, "__len__"):
+            total = len(iterable)
+        self.phase(phase, total)
+        if self.console:
+            iterable = tqdm(iterable, phase, total=total)
+        for entry in iterable:
+            yield entry
+            self.advance()
+        self.flush()
+
+    def flush(self, force=True):
+        if self.job is None:
+            return
+        if not force and time.monotonic() - self.last_write < JOB_PROGRESS_INTERVAL:
+            return
+        self.last_write = time.monotonic()
+        Job.objects.filter(pk=self.job.pk).update(
+            phase=self.job.phase,
+            phase_started=self.job.phase_started,
+            processed=self.job.processed,
+            total=self.job.total,
+            error_count=self.job.error_count,
+            errors=self.job.errors,
+            modified=now(),
+        )
+
+
+@contextmanager
+def run_job(name, job_id=None, console=False, created_by=None):
+    """Runs the block as a job, created unless `job_id` is given (e.g. by the view that
+    enqueued the task). The job succeeds with `progress.result`, or fails with the
+    exception, which is raised again. Yields the `JobProgress`."""
+    if job_id:
+        job = Job.objects.get(pk=job_id)
+    else:
+        job = Job.objects.create(name=name, created_by=created_by)
+    job.start()
+    progress = JobProgress(job, console=console)
+    try:
+        yield progress
+    except Exception as e:
+        progress.flush()
+        job.fail(e)
+        raise
+    progress.flush()
+    job.succeed(progress.result)
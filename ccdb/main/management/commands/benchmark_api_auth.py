@@ -0,0 +1,76 @@
+import base64
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import ApiKeyAuthentication
+from main.models import ApiKey
+
+PASSWORD = "benchmark-password"
+
+
+def measure(authenticator, header, iterations, clear_cache=False):
+    """Average milliseconds to authenticate one request."""
+    factory = APIRequestFactory()
+    total = 0
+    for _ in range(iterations):
+        if clear_cache:
+            ApiKeyAuthentication.clear_cache()
+        request = Request(
+            factory.get("/api/v1/", HTTP_AUTHORIZATION=header),
+            authenticators=[authenticator],
+        )
+        start = time.perf_counter()
+        assert request.user.is_authenticated
+        total += time.perf_counter() - start
+    return total / iterations * 1000
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request cost of the API authentication schemes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        # Nothing of the benchmark is kept
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                "api-auth-benchmark", password=PASSWORD
+            )
+            token = Token.objects.create(user=user)
+            _, key = ApiKey.create_key(user, "benchmark")
+            basic = base64.b64encode(f"{user.username}:{PASSWORD}".encode()).decode()
+
+            results = [
+                ("Basic", measure(BasicAuthentication(), f"Basic {basic}", iterations)),
+                (
+                    "Token",
+                    measure(TokenAuthentication(), f"Token {token.key}", iterations),
+                ),
+                (
+                    "Api-Key (not cached)",
+                    measure(
+                        ApiKeyAuthentication(),
+                        f"Api-Key {key}",
+                        iterations,
+                        clear_cache=True,
+                    ),
+                ),
+                (
+                    "Api-Key (cached)",
+                    measure(ApiKeyAuthentication(), f"Api-Key {key}", iterations),
+                ),
+            ]
+            ApiKeyAuthentication.clear_cache()
+            transaction.set_rollback(True)
+
+        for name, milliseconds in results:
+            self.stdout.write(f"{name:<22}{milliseconds:8.3f} ms per request")
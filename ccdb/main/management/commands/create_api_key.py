@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import ApiKey
+
+
+class Command(BaseCommand):
+    help = "Create an API key for a machine client, the key is only printed once"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="User the client acts as")
+        parser.add_argument("name", help="Name of the client, e.g. the integration")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get_by_natural_key(options["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+        _, key = ApiKey.create_key(user, options["name"])
+        self.stdout.write(key)
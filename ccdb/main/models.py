@@ -1,4 +1,13 @@
+import datetime as dt
+import hashlib
+import secrets
+import uuid
+
+from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.utils.timezone import now
 from django_extensions.db.models import TimeStampedModel
 
 
@@ -15,3 +24,128 @@ class LogEntry(TimeStampedModel):
     log_level = models.IntegerField(choices=LogLevels.choices, default=LogLevels.DEBUG)
     origin = models.CharField(max_length=200)
     text = models.TextField()
+
+
+def hash_api_key(key):
+    # The keys are random and long, a fast hash is enough (unlike for passwords)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ApiKey(TimeStampedModel):
+    """Key of a machine client, sent as `Authorization: Api-Key <key>`.
+
+    Only the hash of the key is stored. The key starts with its prefix, which identifies it
+    (e.g. in the admin) without revealing the key.
+    """
+
+    name = models.CharField(max_length=200)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="api_keys"
+    )
+    prefix = models.CharField(max_length=8, unique=True, editable=False)
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix}…)"
+
+    @classmethod
+    def create_key(cls, user, name):
+        """Returns the new ApiKey and the key, which can't be recovered later."""
+        prefix = secrets.token_hex(4)
+        key = f"{prefix}.{secrets.token_urlsafe(32)}"
+        api_key = cls.objects.create(
+            name=name, user=user, prefix=prefix, key_hash=hash_api_key(key)
+        )
+        return api_key, key
+
+
+class Job(TimeStampedModel):
+    """A long-running task (e.g. in celery), whose state clients can poll."""
+
+    class States(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    FINISHED_STATES = (States.SUCCEEDED, States.FAILED)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=200)
+    state = models.CharField(
+        max_length=16, choices=States.choices, default=States.PENDING
+    )
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, null=True, blank=True
+    )
+    object_id = models.CharField(max_length=64, blank=True)
+    target = GenericForeignKey("content_type", "object_id")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    # Progress, written by main.jobs.JobProgress
+    phase = models.CharField(max_length=200, blank=True)
+    phase_started = models.DateTimeField(null=True, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    error_count = models.PositiveIntegerField(default=0)
+    # Only the first errors, see MAX_JOB_ERRORS
+    errors = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_state_display()})"
+
+    @property
+    def is_finished(self):
+        return self.state in self.FINISHED_STATES
+
+    @property
+    def percent(self):
+        if not self.total:
+            return None
+        return round(100 * self.processed / self.total, 1)
+
+    @property
+    def throughput(self):
+        """Processed entries per second in the current phase"""
+        if not self.phase_started or not self.processed:
+            return None
+        end = self.finished or now()
+        seconds = (end - self.phase_started).total_seconds()
+        return round(self.processed / seconds, 2) if seconds > 0 else None
+
+    @property
+    def eta(self):
+        """Estimated end of the current phase"""
+        throughput = self.throughput
+        if self.is_finished or not throughput or self.total is None:
+            return None
+        remaining = max(self.total - self.processed, 0)
+        return now() + dt.timedelta(seconds=remaining / throughput)
+
+    def start(self):
+        self.state = self.States.RUNNING
+        self.started = now()
+        self.save(update_fields=["state", "started", "modified"])
+
+    def succeed(self, result=None):
+        self.state = self.States.SUCCEEDED
+        self.finished = now()
+        self.result = result
+        self.save(update_fields=["state", "finished", "result", "modified"])
+
+    def fail(self, error):
+        self.state = self.States.FAILED
+        self.finished = now()
+        self.error = str(error)
+        self.save(update_fields=["state", "finished", "error", "modified"])
@@ -1,13 +1,15 @@
 import datetime as dt
 import json
 import logging
+import time
 from decimal import Decimal
 
 import pika
 from django.conf import settings
+from django.core.cache import cache
 from django_lifecycle import LifecycleModel, hook
 
-ALLOWED_EXCHANGES = ("billing", "contracts")
+ALLOWED_EXCHANGES = ("billing", "contracts", "customers")
 LOGGER = logging.getLogger(__name__)
 
 
@@ -35,32 +37,175 @@ def send_queue(exchange: str, message_type: str, payload: dict, source: str = No
     CCDB will typically publish to the gw.billing and gw.contracts exchanges, and
     will subscribe to the gw.customers exchange.
     """
+    send_queue_messages(exchange, message_type, [payload], source)
+
+
+def send_queue_messages(
+    exchange: str, message_type: str, payloads: list, source: str = None
+):
+    """Like `send_queue`, but publishes a message per payload over a single connection."""
     exchange = get_exchange_name(exchange)
     if not source:
         source = settings.GLOBALWAYS_QUEUE_SOURCE
     if not source.startswith(settings.GLOBALWAYS_QUEUE_SOURCE):
         source = f"{settings.GLOBALWAYS_QUEUE_SOURCE}.{source}"
 
-    message = {
-        "type": message_type,
-        "source": source,
-        "payload": payload,
-    }
     if not settings.GLOBALWAYS_QUEUE_URL:
-        LOGGER.warning("No queue URL defined, not sending message")
-        LOGGER.debug("Message would have been: %s", json.dumps(payload))
+        LOGGER.warning("No queue URL defined, not sending %s message(s)", len(payloads))
+        for payload in payloads:
+            LOGGER.debug("Message would have been: %s", json.dumps(payload))
         return
 
     properties = pika.BasicProperties(content_type="application/json")
     connection_params = pika.ConnectionParameters(settings.GLOBALWAYS_QUEUE_URL)
     connection = pika.BlockingConnection(connection_params)
     with connection.channel() as channel:
-        channel.basic_publish(
-            exchange=exchange,
-            body=json.dumps(message),
-            properties=properties,
-            routing_key="",
+        for payload in payloads:
+            message = {
+                "type": message_type,
+                "source": source,
+                "payload": payload,
+            }
+            channel.basic_publish(
+                exchange=exchange,
+                body=json.dumps(message),
+                properties=properties,
+                routing_key="",
+            )
+
+
+class BatchConsumer:
+    """
+    Consumes messages from one of the exchanges in batches.
+
+    Up to `prefetch_count` messages are delivered to us unacknowledged. They are collected
+    until `batch_size` messages are pending or no message arrived for `batch_timeout` seconds,
+    then `handle_batch` is called with the decoded messages. Only after `handle_batch` returned
+    (i.e. the data has been committed), the whole batch is acknowledged with a single ack.
+
+    If `handle_batch` raises, the messages of the batch are handled one at a time, so one
+    bad message doesn't hold back the others. Messages that fail on their own are requeued
+    once, and rejected to the dead-letter queue (`<queue>.dead`) when they fail again after
+    their redelivery, instead of blocking the queue.
+
+    Subclasses set `exchange` and implement `handle_batch`.
+    """
+
+    exchange = None
+    prefetch_count = 500
+    batch_size = 200
+    batch_timeout = 2  # seconds
+    retry_delay = 5  # seconds
+
+    def __init__(self, prefetch_count=None, batch_size=None, batch_timeout=None):
+        self.prefetch_count = prefetch_count or self.prefetch_count
+        self.batch_size = min(batch_size or self.batch_size, self.prefetch_count)
+        self.batch_timeout = batch_timeout or self.batch_timeout
+
+    def get_queue_name(self):
+        return f"{get_queue_environment()}.{settings.GLOBALWAYS_QUEUE_SOURCE}.{self.exchange}"
+
+    def handle_batch(self, messages):
+        raise NotImplementedError
+
+    @staticmethod
+    def decode(body):
+        try:
+            message = json.loads(body)
+        except (TypeError, ValueError):
+            LOGGER.warning("Dropping undecodable queue message: %r", body[:200])
+            return None
+        if not isinstance(message, dict):
+            LOGGER.warning("Dropping queue message without an object body: %r", message)
+            return None
+        return message
+
+    def get_dead_letter_name(self):
+        return f"{self.get_queue_name()}.dead"
+
+    def flush(self, channel, deliveries):
+        """Handles the (method, message) pairs of `deliveries` as one batch."""
+        try:
+            self.handle_batch([message for _method, message in deliveries if message])
+        except Exception:
+            LOGGER.exception(
+                "Failed to handle %s messages, retrying them one at a time",
+                len(deliveries),
+            )
+        else:
+            last_tag = deliveries[-1][0].delivery_tag
+            channel.basic_ack(delivery_tag=last_tag, multiple=True)
+            return
+
+        failed = False
+        for method, message in deliveries:
+            try:
+                if message:
+                    self.handle_batch([message])
+            except Exception:
+                failed = True
+                if method.redelivered:
+                    LOGGER.exception("Dead-lettering failed queue message: %r", message)
+                    channel.basic_reject(
+                        delivery_tag=method.delivery_tag, requeue=False
+                    )
+                else:
+                    LOGGER.exception("Requeueing failed queue message: %r", message)
+                    channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            else:
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+        if failed:
+            time.sleep(self.retry_delay)
+
+    def run(self, max_batches=None):
+        if not settings.GLOBALWAYS_QUEUE_URL:
+            raise ValueError("No queue URL defined, can not consume messages")
+
+        connection_params = pika.ConnectionParameters(settings.GLOBALWAYS_QUEUE_URL)
+        connection = pika.BlockingConnection(connection_params)
+        channel = connection.channel()
+        channel.basic_qos(prefetch_count=self.prefetch_count)
+        queue = self.get_queue_name()
+        dead_letter = self.get_dead_letter_name()
+        channel.exchange_declare(
+            exchange=dead_letter, exchange_type="fanout", durable=True
         )
+        channel.queue_declare(queue=dead_letter, durable=True)
+        channel.queue_bind(queue=dead_letter, exchange=dead_letter)
+        channel.queue_declare(
+            queue=queue,
+            durable=True,
+            arguments={"x-dead-letter-exchange": dead_letter},
+        )
+        channel.queue_bind(queue=queue, exchange=get_exchange_name(self.exchange))
+        LOGGER.info("Consuming from %s (prefetch %s)", queue, self.prefetch_count)
+
+        pending = []
+        batch_started = None
+        batches = 0
+        try:
+            for method, _properties, body in channel.consume(
+                queue, inactivity_timeout=self.batch_timeout
+            ):
+                if method is not None:
+                    if not pending:
+                        batch_started = time.monotonic()
+                    pending.append((method, self.decode(body)))
+                if not pending:
+                    continue
+                if (
+                    method is None
+                    or len(pending) >= self.batch_size
+                    or time.monotonic() - batch_started >= self.batch_timeout
+                ):
+                    self.flush(channel, pending)
+                    pending = []
+                    batches += 1
+                    if max_batches and batches >= max_batches:
+                        break
+        finally:
+            channel.cancel()
+            connection.close()
 
 
 class QueueModelMixin(LifecycleModel):
@@ -73,6 +218,8 @@ class QueueModelMixin(LifecycleModel):
     queue_id_field = "id"
     queue_fields = ()
     queue_field_aliases = {}
+    # Cached data derived from this model (like API feeds), dropped whenever it changes
+    queue_cache_keys = ()
 
     @classmethod
     def _serialize_queue_field(cls, obj, field):
@@ -133,16 +280,49 @@ class QueueModelMixin(LifecycleModel):
             payload.update(extra_payload)
         self._send_queue(f"{self.queue_message_type}.{self.queue_create_type}", payload)
 
-    @hook("after_update", has_changed=True)
-    def send_queue_update(self, extra_payload=None):
+    def get_queue_update_payload(self, extra_payload=None):
+        """The payload of the update message, None if there is nothing to send. Needs to be
+        called before the changes are saved."""
         payload = self._serialize_queue_update()
         if extra_payload:
             payload.update(extra_payload)
         if len(payload) == 1 and self.queue_id_field in payload:
             # Not sending an empty ID notification, at least one thing needs to have changed.
-            return
+            return None
+        return payload
+
+    def send_queue_update_payload(self, payload):
         self._send_queue(f"{self.queue_message_type}.{self.queue_update_type}", payload)
 
+    @classmethod
+    def send_queue_update_payloads(cls, payloads):
+        """Sends the update messages of many objects (e.g. after a bulk update, which skips
+        the lifecycle hooks) with a single task and connection."""
+        from main.tasks import send_queue_messages_task
+
+        if not payloads:
+            return
+        send_queue_messages_task.apply_async(
+            kwargs={
+                "exchange": cls.queue_exchange,
+                "message_type": f"{cls.queue_message_type}.{cls.queue_update_type}",
+                "payloads": payloads,
+                "source": cls.queue_source,
+            }
+        )
+
+    @hook("after_update", has_changed=True)
+    def send_queue_update(self, extra_payload=None):
+        payload = self.get_queue_update_payload(extra_payload)
+        if payload is not None:
+            self.send_queue_update_payload(payload)
+
+    @hook("after_save", on_commit=True)
+    @hook("after_delete", on_commit=True)
+    def invalidate_queue_caches(self):
+        if self.queue_cache_keys:
+            cache.delete_many(self.queue_cache_keys)
+
     @hook("after_delete", on_commit=True)
     def send_queue_delete(self):
         self._send_queue(
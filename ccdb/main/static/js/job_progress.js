@@ -0,0 +1,8 @@
+// Reloads the job pages while a shown job is running, so its progress is live
+document.addEventListener("DOMContentLoaded", function () {
+  if (document.querySelector(".job-running")) {
+    setTimeout(function () {
+      window.location.reload();
+    }, 5000);
+  }
+});
@@ -8,3 +8,10 @@ def send_queue_task(exchange, message_type, payload, source=None):
     from main.queue import send_queue
 
     send_queue(exchange, message_type, payload, source)
+
+
+@app.task
+def send_queue_messages_task(exchange, message_type, payloads, source=None):
+    from main.queue import send_queue_messages
+
+    send_queue_messages(exchange, message_type, payloads, source)
@@ -0,0 +1,68 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import ApiKeyAuthentication
+from main.models import ApiKey
+
+
+@pytest.fixture
+def api_key(admin_user):
+    ApiKeyAuthentication.clear_cache()
+    yield ApiKey.create_key(admin_user, "test client")
+    ApiKeyAuthentication.clear_cache()
+
+
+@pytest.mark.django_db
+def test_api_key_authentication(api_key, client):
+    instance, key = api_key
+    assert key.startswith(instance.prefix)
+    assert key not in instance.key_hash
+
+    response = client.get(
+        "/api/v1/contracts/",
+        HTTP_ACCEPT="application/json",
+        HTTP_AUTHORIZATION=f"Api-Key {key}",
+    )
+    assert response.status_code == 200
+
+    # The verified key is cached
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(
+            "/api/v1/contracts/?count=false",
+            HTTP_ACCEPT="application/json",
+            HTTP_AUTHORIZATION=f"Api-Key {key}",
+        )
+    assert response.status_code == 200
+    assert not any("main_apikey" in query["sql"] for query in context.captured_queries)
+
+    response = client.get(
+        "/api/v1/contracts/",
+        HTTP_ACCEPT="application/json",
+        HTTP_AUTHORIZATION=f"Api-Key {key}x",
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_api_key_inactive(api_key, client):
+    instance, key = api_key
+    instance.is_active = False
+    instance.save()
+    response = client.get(
+        "/api/v1/contracts/",
+        HTTP_ACCEPT="application/json",
+        HTTP_AUTHORIZATION=f"Api-Key {key}",
+    )
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.django_db
+def test_benchmark_api_auth():
+    out = StringIO()
+    call_command("benchmark_api_auth", iterations=2, stdout=out)
+    assert "Api-Key (cached)" in out.getvalue()
+    assert not ApiKey.objects.exists()
@@ -1,6 +1,12 @@
+import base64
 import datetime as dt
+import json
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from contracting.models import Contract, ContractItem
 
@@ -141,3 +147,391 @@ def test_contract_terminate_given_date_too_early(contract, admin_client):
 # def test_contract_list_add_child
 # def test_contract_list_remove_parent
 # def test_contract_list_remove_child
+
+
+@pytest.mark.django_db
+def test_contract_history(contract, admin_client):
+    contract.pause()
+    url = f"/api/v1/contracts/{contract.number}/history/?limit=4"
+    response = admin_client.get(url, HTTP_ACCEPT="application/json")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["results"]) == 4
+    assert data["results"][0]["history_change_reason"] == "paused: False -> True"
+    assert data["next"]
+
+    response = admin_client.get(data["next"], HTTP_ACCEPT="application/json")
+    assert response.status_code == 200
+    next_data = response.json()
+    assert next_data["next"] is None
+    records = data["results"] + next_data["results"]
+    # contract, two items and the booking account were created, the items were paused
+    assert len({(r["model"], r["history_id"]) for r in records}) == 6
+    assert [r["history_type"] for r in records].count("~") == 2
+    dates = [r["history_date"] for r in records]
+    assert dates == sorted(dates, reverse=True)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        ["2024-01-01T00:00:00", "x", "abc"],
+        ["2024-01-01T00:00:00", "x", None],
+        ["no date", "x", 1],
+    ],
+)
+def test_contract_history_invalid_cursor(contract, admin_client, cursor):
+    if not isinstance(cursor, str):
+        cursor = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+    response = admin_client.get(
+        f"/api/v1/contracts/{contract.number}/history/",
+        {"cursor": cursor},
+        HTTP_ACCEPT="application/json",
+    )
+    assert response.status_code == 400
+    assert response.json() == {"cursor": "Invalid cursor."}
+
+
+def _add_contract(account):
+    contract = Contract.objects.create(
+        name="Another Contract", booking_account=account, valid_from="2022-09-07"
+    )
+    parent = ContractItem.objects.create(
+        contract=contract,
+        product_code="parent",
+        product_name="Parent",
+        price_recurring=100,
+        accounting_period=1,
+    )
+    predecessor = ContractItem.objects.create(
+        contract=contract,
+        product_code="old",
+        product_name="Old",
+        price_recurring=100,
+        accounting_period=1,
+        parent_item=parent,
+    )
+    ContractItem.objects.create(
+        contract=contract,
+        product_code="new",
+        product_name="New",
+        price_recurring=100,
+        accounting_period=1,
+        parent_item=parent,
+        predecessor=predecessor,
+    )
+    return contract
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ["/api/v1/contracts/", "/api/v1/contract-items/"])
+def test_contract_list_queries(contract, admin_client, url):
+    def count_queries():
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(url, HTTP_ACCEPT="application/json")
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    _add_contract(contract.booking_account)
+    expected = count_queries()
+    _add_contract(contract.booking_account)
+    _add_contract(contract.booking_account)
+    assert count_queries() == expected
+
+
+@pytest.mark.django_db
+def test_contract_item_status(contract):
+    today = dt.date.today()
+    setup = contract.items.first()
+    active = ContractItem.objects.create(
+        contract=contract,
+        product_code="active",
+        product_name="Active",
+        price_recurring=100,
+        accounting_period=1,
+        ready_for_service="https://example.com/rfs",
+    )
+    ended = ContractItem.objects.create(
+        contract=contract,
+        product_code="ended",
+        product_name="Ended",
+        price_recurring=100,
+        accounting_period=1,
+        ready_for_service="https://example.com/rfs",
+        valid_till=today - dt.timedelta(days=1),
+    )
+    paused = ContractItem.objects.create(
+        contract=contract,
+        product_code="paused",
+        product_name="Paused",
+        price_recurring=100,
+        accounting_period=1,
+        ready_for_service="https://example.com/rfs",
+        paused=True,
+    )
+
+    items = ContractItem.objects.with_status().select_related("contract")
+    statuses = {item.pk: item.annotated_status for item in items}
+    assert statuses == {item.pk: item.status for item in items}
+    assert statuses[setup.pk] == ContractItem.Status.IN_DELIVERY
+    assert statuses[active.pk] == ContractItem.Status.ACTIVE
+    assert statuses[ended.pk] == ContractItem.Status.ENDED
+    assert statuses[paused.pk] == ContractItem.Status.PAUSED
+
+
+@pytest.mark.django_db
+def test_contract_item_status_filter(contract, admin_client):
+    response = admin_client.get(
+        "/api/v1/contract-items/?status=delivery", HTTP_ACCEPT="application/json"
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 2
+    assert {item["status"] for item in data["results"]} == {"delivery"}
+
+    response = admin_client.get(
+        "/api/v1/contract-items/?status=active", HTTP_ACCEPT="application/json"
+    )
+    assert response.json()["count"] == 0
+
+    response = admin_client.get(
+        "/api/v1/contracts/?status=delivery", HTTP_ACCEPT="application/json"
+    )
+    assert response.json()["count"] == 1
+    response = admin_client.get(
+        "/api/v1/contracts/?status=ended", HTTP_ACCEPT="application/json"
+    )
+    assert response.json()["count"] == 0
+
+
+def _new_contract_data(contract_data, items=2):
+    data = {
+        key: value
+        for key, value in contract_data.items()
+        if key not in ("number", "items")
+    }
+    item_data = {
+        key: value
+        for key, value in contract_data["items"][1].items()
+        if key not in ("id", "number", "status", "successor", "child_items")
+    }
+    data["items"] = [{**item_data, "product_name": f"Item {i}"} for i in range(items)]
+    return data
+
+
+@pytest.mark.django_db
+def test_contract_bulk(contract, admin_client):
+    response = admin_client.get(
+        f"/api/v1/contracts/{contract.number}/", HTTP_ACCEPT="application/json"
+    )
+    contract_data = response.json()
+    payload = {
+        "contracts": [
+            contract_data,
+            _new_contract_data(contract_data),
+            _new_contract_data(contract_data, items=3),
+        ]
+    }
+    existing_item = contract_data["items"][1]
+    contract_data["name"] = "Renamed"
+    existing_item["price_recurring"] = "250.00"
+    contract_data["items"] = [existing_item]
+
+    response = admin_client.post(
+        "/api/v1/contracts/bulk/",
+        payload,
+        content_type="application/json",
+        HTTP_ACCEPT="application/json",
+    )
+    assert response.status_code == 200, response.json()
+    results = response.json()["results"]
+    assert results[0] == {
+        "number": contract.number,
+        "created": False,
+        "items": [{"number": existing_item["number"], "created": False}],
+    }
+    assert [r["number"] for r in results[1:]] == [
+        contract.number + 1,
+        contract.number + 2,
+    ]
+    new_items = [item["number"] for r in results[1:] for item in r["items"]]
+    assert new_items == list(
+        range(existing_item["number"] + 1, existing_item["number"] + 6)
+    )
+    assert all(item["created"] for r in results[1:] for item in r["items"])
+
+    contract.refresh_from_db()
+    assert contract.name == "Renamed"
+    item = ContractItem.objects.get(number=existing_item["number"])
+    assert item.price_recurring == 250
+    assert (
+        item.history.first().history_change_reason
+        == "price_recurring: 200.00 -> 250.00"
+    )
+    assert (
+        ContractItem.objects.get(number=new_items[0]).history.get().history_type == "+"
+    )
+    assert Contract.objects.get(number=contract.number + 2).items.count() == 3
+
+
+@pytest.mark.django_db
+def test_contract_bulk_invalid(contract, admin_client):
+    response = admin_client.get(
+        f"/api/v1/contracts/{contract.number}/", HTTP_ACCEPT="application/json"
+    )
+    valid = _new_contract_data(response.json())
+    invalid = _new_contract_data(response.json())
+    invalid["items"][1]["valid_from"] = "2022-01-01"
+    invalid["items"][1]["valid_till"] = "2021-01-01"
+    response = admin_client.post(
+        "/api/v1/contracts/bulk/",
+        {"contracts": [valid, invalid]},
+        content_type="application/json",
+        HTTP_ACCEPT="application/json",
+    )
+    assert response.status_code == 400
+    errors = response.json()["contracts"]
+    assert errors[0] == {}
+    assert errors[1]["items"][0] == {}
+    assert errors[1]["items"][1]
+    # Nothing was saved
+    assert Contract.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_contract_items_modified_since(contract, admin_client):
+    setup, recurring = contract.items.order_by("number")
+    response = admin_client.get(
+        "/api/v1/contract-items/?modified_since=2000-01-01T00:00:00Z",
+        HTTP_ACCEPT="application/json",
+    )
+    data = response.json()
+    assert data["count"] == 2
+    assert data["deleted"] == []
+    sync_timestamp = data["sync_timestamp"]
+
+    recurring.product_name = "Renamed"
+    recurring.save()
+    setup.delete()
+    response = admin_client.get(
+        "/api/v1/contract-items/",
+        {"modified_since": sync_timestamp},
+        HTTP_ACCEPT="application/json",
+    )
+    data = response.json()
+    assert [item["number"] for item in data["results"]] == [recurring.number]
+    assert data["deleted"] == [setup.number]
+    assert data["sync_timestamp"] > sync_timestamp
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("pagination", ["", "&pagination=cursor"])
+def test_contract_items_modified_since_pages(contract, admin_client, pagination):
+    response = admin_client.get(
+        f"/api/v1/contract-items/?modified_since=2000-01-01T00:00:00Z&limit=1{pagination}",
+        HTTP_ACCEPT="application/json",
+    )
+    read = timezone.now()
+    data = response.json()
+    sync_timestamp = data["sync_timestamp"]
+    # Overlaps with transactions that were still running
+    assert parse_datetime(sync_timestamp) <= read - dt.timedelta(seconds=60)
+
+    # Changes to the pages already read are in the next poll, as all pages share the
+    # timestamp of the first one
+    first = contract.items.get(number=data["results"][0]["number"])
+    first.product_name = "Renamed"
+    first.save()
+    response = admin_client.get(data["next"], HTTP_ACCEPT="application/json")
+    assert response.status_code == 200
+    assert response.json()["sync_timestamp"] == sync_timestamp
+
+    response = admin_client.get(
+        "/api/v1/contract-items/",
+        {"modified_since": sync_timestamp},
+        HTTP_ACCEPT="application/json",
+    )
+    numbers = [item["number"] for item in response.json()["results"]]
+    assert first.number in numbers
+
+
+@pytest.mark.django_db
+def test_contract_items_invalid_sync_timestamp(admin_client):
+    response = admin_client.get(
+        "/api/v1/contract-items/",
+        {"modified_since": "2000-01-01T00:00:00Z", "sync_timestamp": "nope"},
+        HTTP_ACCEPT="application/json",
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_contract_sparse_fields(contract, admin_client):
+    with CaptureQueriesContext(connection) as context:
+        response = admin_client.get(
+            "/api/v1/contracts/?fields=number,name,items.number",
+            HTTP_ACCEPT="application/json",
+        )
+    data = response.json()["results"][0]
+    assert data.keys() == {"number", "name", "items"}
+    assert [item.keys() for item in data["items"]] == [{"number"}, {"number"}]
+    contract_query = next(
+        q["sql"]
+        for q in context.captured_queries
+        if 'FROM "contracting_contract"' in q["sql"] and "COUNT" not in q["sql"]
+    )
+    assert "billing_data" not in contract_query
+
+    response = admin_client.get(
+        "/api/v1/contracts/?omit=billing_data,imported_data,items",
+        HTTP_ACCEPT="application/json",
+    )
+    data = response.json()["results"][0]
+    assert "number" in data
+    assert not data.keys() & {"billing_data", "imported_data", "items"}
+
+
+@pytest.mark.django_db
+def test_contract_paused_filter(contract, admin_client):
+    contract.items.update(paused=True)
+
+    def numbers(query):
+        response = admin_client.get(
+            f"/api/v1/contracts/?{query}", HTTP_ACCEPT="application/json"
+        )
+        return [c["number"] for c in response.json()["results"]]
+
+    # One row per contract, although both items match
+    assert numbers("paused=true") == [contract.number]
+    assert numbers("paused=false") == []
+
+
+@pytest.mark.django_db
+def test_contract_item_lookup(contract, admin_client):
+    numbers = list(contract.items.values_list("number", flat=True))
+
+    def lookup():
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                "/api/v1/contract-items/lookup/?fields=number,status",
+                {"numbers": numbers + [999999]},
+                content_type="application/json",
+                HTTP_ACCEPT="application/json",
+            )
+        assert response.status_code == 200
+        return response.json(), len(context.captured_queries)
+
+    data, queries = lookup()
+    assert data["missing"] == [999999]
+    assert data["results"] == {
+        str(number): {"number": number, "status": "delivery"} for number in numbers
+    }
+
+    for _ in range(3):
+        new_contract = _add_contract(contract.booking_account)
+        numbers += list(new_contract.items.values_list("number", flat=True))
+    data, more_queries = lookup()
+    assert len(data["results"]) == len(numbers)
+    assert more_queries == queries
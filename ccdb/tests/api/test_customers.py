@@ -1,6 +1,17 @@
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from contracting.models import BookingAccountSepa, Customer
+from contracting.models import (
+    BookingAccount,
+    BookingAccountSepa,
+    Contract,
+    ContractItem,
+    Customer,
+    Invoice,
+)
+from contracting.utils.crm import apply_customer_data
 
 
 @pytest.mark.django_db
@@ -133,3 +144,158 @@ def test_customer_api_update_sepa(account, sepa, admin_client):
 # def test_account_api_update_cutomer_create_account
 # def test_account_api_update_cutomer_update_account
 # from dirty_equals.pytest_plugin import insert_assert
+
+
+@pytest.fixture
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _add_contract_with_invoice(account, number):
+    contract = Contract.objects.create(
+        name="Overview Contract", booking_account=account, valid_from="2022-09-07"
+    )
+    ContractItem.objects.create(
+        contract=contract,
+        product_code="overview",
+        product_name="Overview",
+        price_recurring=100,
+        accounting_period=1,
+    )
+    return Invoice.objects.create(
+        booking_account=account,
+        number=number,
+        date="2022-10-01",
+        billing_start="2022-09-01",
+        billing_end="2022-09-30",
+        total_net=100,
+        total_gross=119,
+    )
+
+
+@pytest.mark.django_db
+def test_customer_overview(
+    account,
+    sepa,
+    contract,
+    admin_client,
+    clear_cache,
+    django_capture_on_commit_callbacks,
+):
+    def get_overview():
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(
+                f"/api/v1/customers/{account.customer.number}/overview/",
+                HTTP_ACCEPT="application/json",
+            )
+        assert response.status_code == 200, response.content.decode()
+        return response.json(), len(context.captured_queries)
+
+    _add_contract_with_invoice(account, number=None)
+    data, queries = get_overview()
+    assert [a["id"] for a in data["booking_accounts"]] == [account.pk]
+    assert data["booking_accounts"][0]["sepa"]["iban"] == sepa.iban
+    assert len(data["contracts"]) == 2
+    assert data["contracts"][0]["items"][0]["status"]
+    assert len(data["invoices"]) == 1
+    assert data["totals"]["outstanding_count"] == 1
+    assert data["totals"]["outstanding_gross"] == "119.00"
+
+    cache.clear()
+    for number in range(3):
+        _add_contract_with_invoice(account, number=number + 1)
+    data, more_queries = get_overview()
+    assert more_queries == queries
+    assert len(data["contracts"]) == 5
+    assert data["totals"]["invoice_count"] == 4
+    assert data["totals"]["invoiced_net"] == "400.00"
+    assert data["totals"]["outstanding_count"] == 1
+
+    # Cached until something shown changes
+    assert get_overview()[1] < queries
+    with django_capture_on_commit_callbacks(execute=True):
+        contract.items.first().save()
+    data, queries = get_overview()
+    assert queries > 2
+    assert len(data["contracts"]) == 5
+
+
+@pytest.mark.django_db
+def test_customer_overview_sparse_fields(contract, admin_client, clear_cache):
+    url = f"/api/v1/customers/{contract.booking_account.customer.number}/overview/"
+    admin_client.get(f"{url}?fields=number", HTTP_ACCEPT="application/json")
+    # The cached overview is complete
+    data = admin_client.get(url, HTTP_ACCEPT="application/json").json()
+    assert data["contracts"][0]["number"] == contract.number
+    assert data["booking_accounts"][0]["id"] == contract.booking_account_id
+
+
+@pytest.mark.django_db
+def test_customer_overview_moved_contract(
+    contract, admin_client, clear_cache, django_capture_on_commit_callbacks
+):
+    old_customer = contract.booking_account.customer
+    other = Customer.objects.create(name="Other Customer", number=10002)
+    other_account = BookingAccount.objects.create(customer=other, address_name="Other")
+
+    def contract_numbers(customer):
+        response = admin_client.get(
+            f"/api/v1/customers/{customer.number}/overview/",
+            HTTP_ACCEPT="application/json",
+        )
+        return [c["number"] for c in response.json()["contracts"]]
+
+    assert contract_numbers(old_customer) == [contract.number]
+    with django_capture_on_commit_callbacks(execute=True):
+        contract.booking_account = other_account
+        contract.save()
+    # Both overviews were dropped
+    assert contract_numbers(old_customer) == []
+    assert contract_numbers(other) == [contract.number]
+
+
+@pytest.mark.django_db
+def test_customer_overview_bulk_writes(
+    contract, admin_client, clear_cache, django_capture_on_commit_callbacks
+):
+    old_customer = contract.booking_account.customer
+    other = Customer.objects.create(name="Other Customer", number=10002)
+    other_account = BookingAccount.objects.create(customer=other, address_name="Other")
+
+    def get_overview(customer):
+        return admin_client.get(
+            f"/api/v1/customers/{customer.number}/overview/",
+            HTTP_ACCEPT="application/json",
+        ).json()
+
+    assert get_overview(old_customer)["contracts"][0]["name"] == contract.name
+    assert get_overview(other)["contracts"] == []
+    contract_data = admin_client.get(
+        f"/api/v1/contracts/{contract.number}/", HTTP_ACCEPT="application/json"
+    ).json()
+    contract_data["name"] = "Renamed"
+    contract_data["booking_account"] = other_account.pk
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin_client.post(
+            "/api/v1/contracts/bulk/",
+            {"contracts": [contract_data]},
+            content_type="application/json",
+            HTTP_ACCEPT="application/json",
+        )
+    assert response.status_code == 200, response.json()
+    assert get_overview(old_customer)["contracts"] == []
+    assert get_overview(other)["contracts"][0]["name"] == "Renamed"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        apply_customer_data({other.number: {"company_name": "CRM Name"}})
+    assert get_overview(other)["name"] == "CRM Name"
+
+
+@pytest.mark.django_db
+def test_customer_overview_unknown(admin_client, clear_cache):
+    response = admin_client.get(
+        "/api/v1/customers/404/overview/", HTTP_ACCEPT="application/json"
+    )
+    assert response.status_code == 404
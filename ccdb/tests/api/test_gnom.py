@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from contracting.models import ContractItem
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_gnom_contracts(contract, client):
+    response = client.get("/api/v1/gnom/contracts/")
+    assert response.status_code == 200
+    data = json.loads(b"".join(response.streaming_content))
+    assert data == [
+        {
+            "customer_number": 10001,
+            "customer_name": "Test Customer",
+            "contract_id": contract.number,
+            "product": "Test-Vertrag",
+            "start_date": "2022-09-07",
+            "end_date": None,
+            "ready_for_service": False,
+        }
+    ]
+
+    # Unchanged feeds are answered from the cached state
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(
+            "/api/v1/gnom/contracts/", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+    assert response.status_code == 304
+    assert not context.captured_queries
+
+
+@pytest.mark.django_db
+def test_gnom_contracts_invalidation(
+    contract, client, django_capture_on_commit_callbacks
+):
+    etag = client.get("/api/v1/gnom/contracts/")["ETag"]
+    with django_capture_on_commit_callbacks(execute=True):
+        ContractItem.objects.create(
+            contract=contract,
+            product_code="ready",
+            product_name="Ready",
+            price_recurring=100,
+            accounting_period=1,
+            ready_for_service="https://example.com/rfs",
+        )
+
+    response = client.get("/api/v1/gnom/contracts/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    data = json.loads(b"".join(response.streaming_content))
+    assert data[0]["ready_for_service"] is True
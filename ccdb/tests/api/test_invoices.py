@@ -0,0 +1,111 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.pagination import ViewCursorPagination
+from contracting.models import BookingAccount, Invoice, InvoiceItem
+
+
+def _add_invoice(account):
+    return Invoice.objects.create(
+        booking_account=account,
+        date="2022-10-01",
+        billing_start="2022-09-01",
+        billing_end="2022-09-30",
+    )
+
+
+@pytest.mark.django_db
+def test_invoice_list_queries(account, sepa, admin_client):
+    def count_queries():
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(
+                "/api/v1/invoices/", HTTP_ACCEPT="application/json"
+            )
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    _add_invoice(account)
+    queries = count_queries()
+    other = BookingAccount.objects.create(
+        customer=account.customer, address_name="Other Account"
+    )
+    for _ in range(3):
+        _add_invoice(account)
+        _add_invoice(other)
+    assert count_queries() == queries
+
+
+@pytest.mark.django_db
+def test_invoice_list_include_booking_accounts(account, sepa, admin_client):
+    other = BookingAccount.objects.create(
+        customer=account.customer, address_name="Other Account"
+    )
+    for _ in range(2):
+        _add_invoice(account)
+        _add_invoice(other)
+
+    response = admin_client.get(
+        "/api/v1/invoices/?include=booking_accounts&fields=number,booking_account.address_name",
+        HTTP_ACCEPT="application/json",
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["results"]) == 4
+    assert {invoice["booking_account"] for invoice in data["results"]} == {
+        account.pk,
+        other.pk,
+    }
+    assert data["included"]["booking_accounts"] == {
+        str(account.pk): {"address_name": "Test Account"},
+        str(other.pk): {"address_name": "Other Account"},
+    }
+
+    # Without the include, the accounts are nested
+    response = admin_client.get(
+        "/api/v1/invoices/?fields=booking_account.address_name",
+        HTTP_ACCEPT="application/json",
+    )
+    data = response.json()
+    assert "included" not in data
+    assert data["results"][0]["booking_account"] == {"address_name": "Test Account"}
+
+
+@pytest.mark.django_db
+def test_invoice_contract_filter(contract, admin_client):
+    invoice = _add_invoice(contract.booking_account)
+    _add_invoice(contract.booking_account)
+    for order, item in enumerate(contract.items.all()):
+        InvoiceItem.objects.create(
+            order=order,
+            invoice=invoice,
+            contract_item=item,
+            description="Test",
+            billing_start="2022-09-01",
+            billing_end="2022-09-30",
+        )
+
+    response = admin_client.get(
+        f"/api/v1/invoices/?contract={contract.number}&fields=id",
+        HTTP_ACCEPT="application/json",
+    )
+    # One row per invoice, although both items match
+    assert response.json()["results"] == [{"id": invoice.pk}]
+
+
+@pytest.mark.django_db
+def test_invoice_cursor_pagination_same_date(account, admin_client, monkeypatch):
+    # More invoices of one date (all of an invoicing run) than the offset_cutoff
+    monkeypatch.setattr(ViewCursorPagination, "offset_cutoff", 5)
+    for _ in range(8):
+        _add_invoice(account)
+    ids = []
+    url = "/api/v1/invoices/?pagination=cursor&limit=3&fields=id"
+    for _ in range(4):
+        data = admin_client.get(url, HTTP_ACCEPT="application/json").json()
+        ids += [invoice["id"] for invoice in data["results"]]
+        url = data["next"]
+        if url is None:
+            break
+    assert url is None
+    assert sorted(ids) == sorted(Invoice.objects.values_list("id", flat=True))
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+import pytest
+from django.utils.timezone import now
+
+from main.models import Job
+
+
+@pytest.mark.django_db
+def test_easybill_sync_job(customer, admin_client, django_capture_on_commit_callbacks):
+    url = f"/api/v1/customers/{customer.number}/easybill-sync/"
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin_client.post(url, HTTP_ACCEPT="application/json")
+    assert response.status_code == 202
+    job = response.json()
+    assert job["state"] == "pending"
+    assert job["target_type"] == "customer"
+    assert response["Location"] == job["url"]
+
+    # Tasks run eagerly in the tests
+    response = admin_client.get(f"{job['url']}?wait=1", HTTP_ACCEPT="application/json")
+    assert response.status_code == 200
+    assert response.json()["state"] == "succeeded"
+    assert response.json()["result"] == {"easybill_sync_state": "unsynced"}
+    # A finished job doesn't block the next sync
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin_client.post(url, HTTP_ACCEPT="application/json")
+    assert response.json()["id"] != job["id"]
+
+
+@pytest.mark.django_db
+def test_easybill_sync_job_deduplication(customer, admin_client):
+    url = f"/api/v1/customers/{customer.number}/easybill-sync/"
+    first = admin_client.post(url, HTTP_ACCEPT="application/json").json()
+    second = admin_client.post(url, HTTP_ACCEPT="application/json").json()
+    assert first["id"] == second["id"]
+    assert Job.objects.count() == 1
+
+    Job.objects.filter(pk=first["id"]).update(state=Job.States.FAILED)
+    third = admin_client.post(url, HTTP_ACCEPT="application/json").json()
+    assert third["id"] != first["id"]
+
+    # Jobs running for too long are considered lost
+    Job.objects.filter(pk=third["id"]).update(created=now() - timedelta(hours=1))
+    fourth = admin_client.post(url, HTTP_ACCEPT="application/json").json()
+    assert fourth["id"] != third["id"]
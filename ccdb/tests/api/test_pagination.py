@@ -0,0 +1,37 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_cursor_pagination(contract, admin_client):
+    numbers = sorted(contract.items.values_list("number", flat=True))
+    response = admin_client.get(
+        "/api/v1/contract-items/?pagination=cursor&limit=1",
+        HTTP_ACCEPT="application/json",
+    )
+    data = response.json()
+    assert "count" not in data
+    assert [item["number"] for item in data["results"]] == numbers[:1]
+
+    response = admin_client.get(data["next"], HTTP_ACCEPT="application/json")
+    data = response.json()
+    assert [item["number"] for item in data["results"]] == numbers[1:]
+    assert data["next"] is None
+    assert data["previous"]
+
+
+@pytest.mark.django_db
+def test_pagination_without_count(contract, admin_client):
+    response = admin_client.get(
+        "/api/v1/contract-items/?count=false&limit=1",
+        HTTP_ACCEPT="application/json",
+    )
+    data = response.json()
+    assert data["count"] is None
+    assert len(data["results"]) == 1
+    assert data["next"]
+
+    response = admin_client.get(data["next"], HTTP_ACCEPT="application/json")
+    data = response.json()
+    assert len(data["results"]) == 1
+    assert data["next"] is None
+    assert data["previous"]
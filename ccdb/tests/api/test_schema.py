@@ -0,0 +1,49 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from api import schema
+
+
+@pytest.mark.django_db
+def test_schema_is_generated_once(client, monkeypatch):
+    cache.clear()
+    generated = []
+    generate_schema = schema.generate_schema
+
+    def counting_generate_schema():
+        generated.append(1)
+        return generate_schema()
+
+    monkeypatch.setattr(schema, "generate_schema", counting_generate_schema)
+
+    response = client.get("/api/v1/swagger.json")
+    assert response.status_code == 200
+    assert "/contracts/" in json.loads(response.content)["paths"]
+    etag = response["ETag"]
+
+    response = client.get("/api/v1/swagger.json", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    response = client.get("/api/v1/swagger/", {"format": "openapi"})
+    assert response.status_code == 200
+    assert response["ETag"] == etag
+    assert len(generated) == 1
+
+    assert client.get("/api/v1/swagger/").status_code == 200
+
+
+@pytest.mark.django_db
+def test_generate_openapi_schema(tmp_path, settings):
+    settings.CCDB_VERSION = "test-version"
+    schema.get_code_version.cache_clear()
+    try:
+        output = tmp_path / "schema.json"
+        call_command("generate_openapi_schema", output=str(output), stdout=StringIO())
+        assert "/contracts/" in json.loads(output.read_text())["paths"]
+        assert cache.get("api:schema:test-version:json")
+    finally:
+        schema.get_code_version.cache_clear()
@@ -0,0 +1,60 @@
+import pytest
+
+from contracting.models import ContractItem, Invoice
+from globalways.utils import admin as admin_utils
+from globalways.utils.admin import EstimatedCountPaginator
+
+
+@pytest.fixture
+def large_contract(contract):
+    first = contract.items.first()
+    ContractItem.objects.bulk_create(
+        ContractItem(
+            contract=contract,
+            number=100000 + i,
+            product_code="test product",
+            product_name=f"Test-Produkt {i}",
+            price_recurring=10,
+            accounting_period=1,
+            parent_item=first,
+        )
+        for i in range(120)
+    )
+    return contract
+
+
+@pytest.mark.django_db
+def test_contract_change_view_pages_items(
+    large_contract, admin_client, django_assert_max_num_queries
+):
+    url = f"/admin/contracting/contract/{large_contract.pk}/change/"
+    # Independent of the number of items on the page and their autocomplete fields
+    with django_assert_max_num_queries(25):
+        response = admin_client.get(url)
+    assert response.status_code == 200
+    assert response.context["inline_admin_formsets"][0].formset.total_form_count() == 20
+    assert b"?items_page=7" in response.content
+
+    # 122 items
+    response = admin_client.get(f"{url}?items_page=7")
+    formset = response.context["inline_admin_formsets"][0].formset
+    assert len(formset.get_queryset()) == 2
+    assert formset.page.number == 7
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator(contract, monkeypatch):
+    queryset = Invoice.objects.all()
+    assert EstimatedCountPaginator(queryset, 10).count == 0
+
+    monkeypatch.setattr(admin_utils, "estimate_count", lambda queryset: 20000)
+    assert EstimatedCountPaginator(queryset, 10).count == 20000
+    # Small estimates are counted exactly
+    monkeypatch.setattr(admin_utils, "estimate_count", lambda queryset: 5)
+    assert EstimatedCountPaginator(queryset, 10).count == 0
+
+
+@pytest.mark.django_db
+def test_estimated_changelists(admin_client):
+    assert admin_client.get("/admin/contracting/invoice/").status_code == 200
+    assert admin_client.get("/admin/main/logentry/").status_code == 200
@@ -0,0 +1,95 @@
+import pytest
+
+from contracting.models import Contract, ContractItem
+from contracting.utils import bulk_actions
+from contracting.utils.bulk_actions import start_bulk_action
+from main import queue
+from main.models import Job
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+    monkeypatch.setattr(
+        queue,
+        "send_queue_messages",
+        lambda exchange, message_type, payloads, source=None: messages.append(
+            (message_type, payloads)
+        ),
+    )
+    return messages
+
+
+@pytest.mark.django_db
+def test_pause_items(contract, sent, django_capture_on_commit_callbacks):
+    items = contract.items.all()
+    with django_capture_on_commit_callbacks(execute=True):
+        assert start_bulk_action("pause_items", items) == 2
+    assert all(item.paused for item in contract.items.all())
+    assert all(item.history.first().paused for item in contract.items.all())
+    # One message with all items of the contract
+    assert len(sent) == 1
+    message_type, payloads = sent[0]
+    assert message_type.endswith(ContractItem.queue_update_type)
+    assert payloads == [
+        {
+            "number": contract.number,
+            "items": [
+                {"number": item.number, "paused": True}
+                for item in contract.items.order_by("pk")
+            ],
+        }
+    ]
+
+    # Unchanged items are skipped
+    with django_capture_on_commit_callbacks(execute=True):
+        assert start_bulk_action("pause_contracts", Contract.objects.all()) == 0
+        assert start_bulk_action("unpause_contracts", Contract.objects.all()) == 2
+    assert not any(item.paused for item in contract.items.all())
+
+
+@pytest.mark.django_db
+def test_cancel_contracts(contract, sent, django_capture_on_commit_callbacks):
+    end = contract.termination_end
+    with django_capture_on_commit_callbacks(execute=True):
+        assert start_bulk_action("cancel_contracts", Contract.objects.all()) == 1
+    contract.refresh_from_db()
+    assert contract.valid_till == end
+    assert contract.termination_date
+    assert contract.history.first().valid_till == end
+    assert sent[0][1] == [
+        {
+            "number": contract.number,
+            "termination_date": contract.termination_date.isoformat(),
+            "valid_till": end.isoformat(),
+        }
+    ]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert start_bulk_action("cancel_items", contract.items.all()) == 2
+    assert all(item.valid_till == end for item in contract.items.all())
+
+
+@pytest.mark.django_db
+def test_bulk_action_job(
+    contract, sent, monkeypatch, django_capture_on_commit_callbacks
+):
+    monkeypatch.setattr(bulk_actions, "BULK_ACTION_JOB_THRESHOLD", 1)
+    with django_capture_on_commit_callbacks(execute=True):
+        job = start_bulk_action("pause_items", contract.items.all())
+    job.refresh_from_db()
+    assert job.state == Job.States.SUCCEEDED
+    assert job.result == {"changed": 2}
+    assert (job.processed, job.total) == (2, 2)
+    assert all(item.paused for item in contract.items.all())
+
+
+@pytest.mark.django_db
+def test_admin_actions(contract, admin_client, sent):
+    response = admin_client.post(
+        "/admin/contracting/contract/",
+        {"action": "pause", "_selected_action": [contract.pk]},
+        follow=True,
+    )
+    assert response.status_code == 200
+    assert all(item.paused for item in contract.items.all())
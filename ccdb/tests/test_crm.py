@@ -0,0 +1,124 @@
+import pytest
+from pika.spec import Basic
+
+from contracting.utils.crm import CustomerEventConsumer, apply_customer_events
+
+
+class FakeChannel:
+    def __init__(self):
+        self.acked = []
+        self.nacked = []
+        self.rejected = []
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked.append((delivery_tag, multiple))
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.nacked.append((delivery_tag, multiple, requeue))
+
+    def basic_reject(self, delivery_tag, requeue=True):
+        self.rejected.append((delivery_tag, requeue))
+
+
+def delivery(delivery_tag, message, redelivered=False):
+    return Basic.Deliver(delivery_tag=delivery_tag, redelivered=redelivered), message
+
+
+@pytest.mark.django_db
+def test_customer_events_deduplicated(customer):
+    messages = [
+        {
+            "type": "customer.update",
+            "payload": {"customerno": 10001, "company_name": "Old"},
+        },
+        {
+            "type": "customer.update",
+            "payload": {"customerno": 99999, "company_name": "Unknown"},
+        },
+        {
+            "type": "customer.update",
+            "payload": {"customerno": "10001", "city": "Berlin"},
+        },
+        {
+            "type": "customer.update",
+            "payload": {"customerno": 10001, "company_name": "New"},
+        },
+        {"type": "customer.delete", "payload": {"customerno": 10001}},
+        {"type": "customer.update", "payload": {}},
+    ]
+    assert apply_customer_events(messages) == 1
+
+    customer.refresh_from_db()
+    assert customer.name == "New"
+    assert customer.crm_last_sync
+    assert customer.crm_data["synced_data"] == {
+        "customerno": 10001,
+        "company_name": "New",
+        "city": "Berlin",
+    }
+
+
+@pytest.mark.django_db
+def test_customer_events_acknowledged_after_commit(customer):
+    channel = FakeChannel()
+    consumer = CustomerEventConsumer(batch_size=10)
+    message = consumer.decode(
+        '{"type": "customer.update", "payload": {"customerno": 10001}}'
+    )
+    consumer.flush(channel, [delivery(6, None), delivery(7, message)])
+    assert channel.acked == [(7, True)]
+    assert not channel.nacked
+
+
+def test_customer_events_requeued_on_error():
+    class FailingConsumer(CustomerEventConsumer):
+        retry_delay = 0
+
+        def handle_batch(self, messages):
+            raise RuntimeError("database is gone")
+
+    channel = FakeChannel()
+    FailingConsumer().flush(channel, [delivery(3, {"payload": {}})])
+    assert channel.nacked == [(3, False, True)]
+    assert not channel.acked
+
+
+@pytest.mark.django_db
+def test_customer_events_dead_lettered(customer):
+    class PoisonedConsumer(CustomerEventConsumer):
+        retry_delay = 0
+
+        def handle_batch(self, messages):
+            if any(message.get("poisoned") for message in messages):
+                raise RuntimeError("bad message")
+            super().handle_batch(messages)
+
+    def update(name):
+        return {
+            "type": "customer.update",
+            "payload": {"customerno": 10001, "company_name": name},
+        }
+
+    consumer = PoisonedConsumer()
+    poisoned = {**update("Poisoned"), "poisoned": True}
+    channel = FakeChannel()
+    consumer.flush(
+        channel,
+        [delivery(1, update("First")), delivery(2, poisoned), delivery(3, None)],
+    )
+    # The other messages are applied, the failing one gets one more chance
+    assert channel.acked == [(1, False), (3, False)]
+    assert channel.nacked == [(2, False, True)]
+    customer.refresh_from_db()
+    assert customer.name == "First"
+
+    # Failing again after the redelivery, it is dead-lettered
+    channel = FakeChannel()
+    consumer.flush(
+        channel, [delivery(2, poisoned, redelivered=True), delivery(4, update("Next"))]
+    )
+    assert channel.rejected == [(2, False)]
+    assert channel.acked == [(4, False)]
+    assert not channel.nacked
+    customer.refresh_from_db()
+    assert customer.name == "Next"
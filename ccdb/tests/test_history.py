@@ -0,0 +1,141 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from contracting.models import BookingAccount, Customer
+from globalways.utils.decorators import bulk_update_with_history, update_with_history
+
+
+def _selects(context):
+    return [q["sql"] for q in context.captured_queries if q["sql"].startswith("SELECT")]
+
+
+@pytest.mark.django_db
+def test_history_change_reason(account):
+    account = BookingAccount.objects.get(pk=account.pk)
+    account.address_name = "New Name"
+    with CaptureQueriesContext(connection) as context:
+        account.save()
+    assert not _selects(context)
+
+    record = account.history.first()
+    assert record.history_type == "~"
+    assert record.history_change_reason == (
+        "easybill_sync_state: unsynced -> dirty; address_name: Test Account -> New Name"
+    )
+
+
+@pytest.mark.django_db
+def test_history_change_reason_foreign_key(account):
+    other = Customer.objects.create(name="Other Customer", number=10002)
+    account = BookingAccount.objects.get(pk=account.pk)
+    account.customer = other
+    with CaptureQueriesContext(connection) as context:
+        account.save()
+    # The old customer's name needs to be looked up once
+    assert len(_selects(context)) == 1
+    assert account.history.first().history_change_reason.endswith(
+        "customer: Test Customer -> Other Customer"
+    )
+
+    # Renamed by another process
+    Customer.objects.filter(pk=other.pk).update(name="Renamed Customer")
+    account.customer_id = Customer.objects.get(number=10001).pk
+    with CaptureQueriesContext(connection) as context:
+        account.save()
+    # The names are looked up for every save, both in one query
+    assert len(_selects(context)) == 1
+    assert account.history.first().history_change_reason.endswith(
+        "customer: Renamed Customer -> Test Customer"
+    )
+
+
+@pytest.mark.django_db
+def test_history_skip_entry(account):
+    account.address_name = "New Name"
+    account.save(write_history_entry=False)
+    assert account.history.count() == 1
+
+
+@pytest.mark.django_db
+def test_update_with_history(contract):
+    with CaptureQueriesContext(connection) as context:
+        contract.pause()
+    # SELECT items, UPDATE, INSERT history
+    queries = [q["sql"] for q in context.captured_queries]
+    assert len([sql for sql in queries if "SAVEPOINT" not in sql]) == 3
+    for item in contract.items.all():
+        assert item.paused
+        record = item.history.first()
+        assert record.history_type == "~"
+        assert record.history_change_reason == "paused: False -> True"
+
+    # Nothing changed, nothing written
+    assert update_with_history(contract.items.all(), paused=True) == 0
+    assert all(item.history.count() == 2 for item in contract.items.all())
+
+
+@pytest.mark.django_db
+def test_bulk_update_with_history(customer):
+    other = Customer.objects.create(name="Other Customer", number=10002)
+    customers = list(Customer.objects.all())
+    for obj in customers:
+        obj.name = f"{obj.name} GmbH"
+    assert bulk_update_with_history(customers, ["name"]) == 2
+
+    assert Customer.objects.get(pk=other.pk).name == "Other Customer GmbH"
+    assert (
+        customer.history.first().history_change_reason
+        == "name: Test Customer -> Test Customer GmbH"
+    )
+    assert bulk_update_with_history(customers, ["name"]) == 0
+
+
+@pytest.mark.django_db
+def test_history_skips_volatile_fields(account):
+    account.easybill_sync_state = BookingAccount.States.SYNCED
+    account.easybill_last_sync = now()
+    account.save()
+    assert account.history.count() == 1
+
+    account.address_name = "New Name"
+    account.save()
+    assert account.history.count() == 2
+
+
+@pytest.mark.django_db
+def test_history_records_saves_without_changes(account):
+    stale = BookingAccount.objects.get(pk=account.pk)
+    BookingAccount.objects.filter(pk=account.pk).update(
+        address_name="Changed elsewhere"
+    )
+    # Writes the stale values back, which needs to be in the history
+    stale.save()
+    assert account.history.count() == 2
+    record = account.history.first()
+    assert record.address_name == "Test Account"
+    assert record.history_change_reason.startswith(
+        "address_name: Changed elsewhere -> Test Account"
+    )
+
+    # Nothing changed compared to the database
+    stale.save()
+    assert account.history.count() == 2
+
+
+@pytest.mark.django_db
+def test_prune_history(account):
+    # Written before volatile fields were skipped
+    account.easybill_sync_state = BookingAccount.States.SYNCED
+    BookingAccount.history.bulk_history_create([account], update=True)
+    account.address_name = "New Name"
+    account.save()
+    assert account.history.count() == 3
+
+    call_command("prune_history", "contracting.BookingAccount", "--dry-run")
+    assert account.history.count() == 3
+    call_command("prune_history", "contracting.BookingAccount")
+    assert [r.history_type for r in account.history.all()] == ["~", "+"]
+    assert account.history.first().address_name == "New Name"
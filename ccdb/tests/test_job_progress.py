@@ -0,0 +1,58 @@
+import pytest
+
+from contracting import tasks
+from main.jobs import MAX_JOB_ERRORS, run_job
+from main.models import Job
+
+
+@pytest.mark.django_db
+def test_run_job_progress(django_assert_max_num_queries):
+    with run_job("test") as progress:
+        # Writes are batched, not one per entry
+        with django_assert_max_num_queries(3):
+            for i in progress.iterate(range(50), "counting"):
+                if i % 10 == 0:
+                    progress.error(f"error {i}")
+        progress.result = {"counted": 50}
+
+    job = Job.objects.get(pk=progress.job.pk)
+    assert job.state == Job.States.SUCCEEDED
+    assert job.phase == "counting"
+    assert (job.processed, job.total, job.percent) == (50, 50, 100)
+    assert job.error_count == 5
+    assert job.errors[0] == "error 0"
+    assert job.throughput
+    assert job.eta is None
+    assert job.result == {"counted": 50}
+
+
+@pytest.mark.django_db
+def test_run_job_failure():
+    with pytest.raises(ValueError):
+        with run_job("test") as progress:
+            for _ in range(MAX_JOB_ERRORS + 1):
+                progress.error("not stored")
+            raise ValueError("failed")
+
+    job = Job.objects.get(pk=progress.job.pk)
+    assert job.state == Job.States.FAILED
+    assert job.error == "failed"
+    assert job.error_count == MAX_JOB_ERRORS + 1
+    assert len(job.errors) == MAX_JOB_ERRORS
+
+
+@pytest.mark.django_db
+def test_run_invoicing_job(contract, admin_client):
+    job = Job.objects.create(name="run_invoicing")
+    tasks.run_invoicing(job_id=str(job.pk))
+    job.refresh_from_db()
+    assert job.state == Job.States.SUCCEEDED
+    assert job.phase == "Invoicing"
+    assert job.result == {"invoices": 0, "positions": 0}
+
+    response = admin_client.get(
+        f"/api/v1/jobs/{job.pk}/", HTTP_ACCEPT="application/json"
+    )
+    assert response.json()["processed"] == 0
+    assert admin_client.get(f"/admin/main/job/{job.pk}/change/").status_code == 200
+    assert admin_client.get("/admin/main/job/").status_code == 200
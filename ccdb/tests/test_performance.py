@@ -0,0 +1,33 @@
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def monitoring(settings):
+    settings.PERFORMANCE_MONITORING = True
+
+
+@pytest.mark.django_db
+def test_server_timing(monitoring, contract, admin_client):
+    response = admin_client.get("/api/v1/contracts/", HTTP_ACCEPT="application/json")
+    assert response.status_code == 200
+    metrics = [metric.split(";")[0] for metric in response["Server-Timing"].split(", ")]
+    assert metrics == ["db", "view", "render", "total"]
+
+    response = admin_client.get("/admin/")
+    assert not response.has_header("Server-Timing")
+
+
+@pytest.mark.django_db
+def test_slow_request_log(monitoring, settings, contract, admin_client, caplog):
+    settings.PERFORMANCE_SLOW_REQUEST_QUERIES = 0
+    with caplog.at_level(logging.WARNING, "globalways.middlewares.performance"):
+        admin_client.get("/api/v1/contracts/", HTTP_ACCEPT="application/json")
+    assert "Slow request GET /api/v1/contracts/ (200)" in caplog.text
+
+
+@pytest.mark.django_db
+def test_server_timing_disabled(contract, admin_client):
+    response = admin_client.get("/api/v1/contracts/", HTTP_ACCEPT="application/json")
+    assert not response.has_header("Server-Timing")
@@ -0,0 +1,106 @@
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from contracting.models import Contract
+from globalways.middlewares.replica import (
+    PIN_COOKIE,
+    ReadReplicaMiddleware,
+    read_from_primary,
+)
+from globalways.routers import ReplicaRouter, read_replica
+
+router = ReplicaRouter()
+
+
+@pytest.fixture
+def replica(settings):
+    settings.READ_REPLICA_DATABASE = "replica"
+
+
+def test_router(replica):
+    assert router.db_for_read(Contract) == "default"
+    with read_replica():
+        assert router.db_for_read(Contract) == "replica"
+        # Reads after a write go to the primary
+        assert router.db_for_write(Contract) == "default"
+        assert router.db_for_read(Contract) == "default"
+    assert router.db_for_read(Contract) == "default"
+    assert router.allow_migrate("replica", "contracting") is False
+
+
+def test_router_without_replica():
+    with read_replica():
+        assert router.db_for_read(Contract) == "default"
+
+
+def test_middleware(replica):
+    databases = []
+
+    def view(request):
+        databases.append(router.db_for_read(Contract))
+        return HttpResponse()
+
+    def get_response(request):
+        middleware.process_view(request, request.view, (), {})
+        return request.view(request)
+
+    middleware = ReadReplicaMiddleware(get_response)
+    factory = RequestFactory()
+
+    def request(method, path, view=view):
+        request = getattr(factory, method)(path)
+        request.view = view
+        return request
+
+    middleware(request("get", "/api/v1/contracts/"))
+    middleware(request("get", "/admin/"))
+    middleware(
+        request("get", "/api/v1/contracts/", read_from_primary(lambda r: view(r)))
+    )
+    response = middleware(request("post", "/api/v1/contracts/"))
+    assert response.cookies[PIN_COOKIE]["max-age"] == 10
+    # The client that wrote reads from the primary
+    pinned = request("get", "/api/v1/contracts/")
+    pinned.COOKIES[PIN_COOKIE] = "1"
+    middleware(pinned)
+    assert databases == ["replica", "default", "default", "default", "default"]
+
+
+@pytest.fixture
+def read_databases(replica, monkeypatch):
+    """The databases the contracting models are read from, the test database stands in
+    for the replica."""
+    databases = set()
+    db_for_read = ReplicaRouter.db_for_read
+
+    def record(self, model, **hints):
+        database = db_for_read(self, model, **hints)
+        if model._meta.app_label == "contracting":
+            databases.add(database)
+        return "default"
+
+    monkeypatch.setattr(ReplicaRouter, "db_for_read", record)
+    return databases
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url, database",
+    [
+        ("/api/v1/contracts/", "replica"),
+        ("/api/v1/contract-items/", "replica"),
+        # Delta syncs and cached responses are read from the primary
+        ("/api/v1/contract-items/?modified_since=2020-01-01T00:00:00Z", "default"),
+        ("/api/v1/customers/?modified_since=2020-01-01T00:00:00Z", "default"),
+        ("/api/v1/customers/{customer}/overview/", "default"),
+        ("/api/v1/gnom/contracts/", "default"),
+    ],
+)
+def test_middleware_views(contract, admin_client, read_databases, url, database):
+    customer = contract.booking_account.customer
+    response = admin_client.get(
+        url.format(customer=customer.number), HTTP_ACCEPT="application/json"
+    )
+    assert response.status_code == 200
+    assert read_databases == {database}
@@ -0,0 +1,100 @@
+from importlib import import_module
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+
+from contracting.models import BookingAccount, Contract, ContractItem, Customer, Invoice
+
+
+@pytest.mark.django_db
+def test_search_documents(contract, django_capture_on_commit_callbacks):
+    assert Contract.objects.get().search_document == ""
+    call_command("rebuild_search_documents", stdout=StringIO())
+    document = Contract.objects.get().search_document
+    assert "test-vertrag" in document
+    assert "test-produkt-setup" in document
+    assert "test account" in document
+
+    # Saving an item rebuilds the document of its contract once the data is committed
+    with django_capture_on_commit_callbacks(execute=True):
+        ContractItem.objects.create(
+            contract=contract,
+            product_code="fiber",
+            product_name="Glasfaser",
+            price_recurring=50,
+            accounting_period=1,
+        )
+    assert Contract.search(Contract.objects.all(), "GLASFASER vertrag").exists()
+    assert not Contract.search(Contract.objects.all(), "glasfaser kupfer").exists()
+
+    # Renaming the account rebuilds the documents containing its name
+    account = contract.booking_account
+    with django_capture_on_commit_callbacks(execute=True):
+        account.address_name = "Renamed Account"
+        account.save()
+    assert "renamed account" in Contract.objects.get().search_document
+    assert "renamed account" in Customer.objects.get().search_document
+    assert "renamed account" in BookingAccount.objects.get().search_document
+
+
+@pytest.mark.django_db
+def test_search_documents_migration(contract, settings):
+    # The tests run without migrations
+    settings.MIGRATION_MODULES = {}
+    migration = import_module("contracting.migrations.0030_search_document")
+    # The documents of the existing objects are filled with the historical models
+    apps = (
+        MigrationLoader(None)
+        .project_state(("contracting", "0030_search_document"))
+        .apps
+    )
+    migration.fill_search_documents(apps, connection.schema_editor())
+    for model in (Customer, BookingAccount, Contract):
+        assert model.search(model.objects.all(), "test account").exists()
+    assert Contract.search(Contract.objects.all(), "test-produkt-setup").exists()
+    # Matching the current search_document_fields
+    documents = {
+        model: list(model.objects.values_list("search_document", flat=True))
+        for model in (Customer, BookingAccount, Contract, Invoice)
+    }
+    call_command("rebuild_search_documents", stdout=StringIO())
+    for model, before in documents.items():
+        assert list(model.objects.values_list("search_document", flat=True)) == before
+
+
+@pytest.mark.django_db
+def test_search_document_batches(account, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        for number in range(3):
+            Invoice.objects.create(
+                booking_account=account,
+                number=4711 + number,
+                date="2022-10-01",
+                billing_start="2022-09-01",
+                billing_end="2022-09-30",
+            )
+    # Only the first callback rebuilds, all invoices together
+    assert len(callbacks) > 1
+    assert Invoice.search(Invoice.objects.all(), "4712").count() == 1
+
+
+@pytest.mark.django_db
+def test_search_api_and_admin(
+    contract, admin_client, django_capture_on_commit_callbacks
+):
+    Contract.update_search_documents()
+    response = admin_client.get(
+        "/api/v1/contracts/?q=test-produkt", HTTP_ACCEPT="application/json"
+    )
+    assert [c["number"] for c in response.json()["results"]] == [contract.number]
+    response = admin_client.get(
+        "/api/v1/contracts/?q=unknown", HTTP_ACCEPT="application/json"
+    )
+    assert response.json()["results"] == []
+
+    response = admin_client.get("/admin/contracting/contract/?q=test-vertrag")
+    assert response.status_code == 200
+    assert list(response.context["cl"].result_list) == [contract]
@@ -0,0 +1,7 @@
+#!/bin/bash
+
+mkdir -p $LOGGING_DIRECTORY
+chown -R ia: $LOGGING_DIRECTORY
+
+cd /code
+exec sudo --preserve-env -u ia /poetry/.venv/bin/python3 manage.py consume_customer_events